@@ -4,14 +4,11 @@ import yaml
 import logging
 import click_log
 
-from sfdata_stream_parser.parser import openpyxl
 from liiatools.datasets.annex_a.lds_annexa_clean import (
     configuration as clean_config,
-    cleaner,
-    degrade,
     logger,
-    populate,
     file_creator,
+    pipeline,
 )
 from liiatools.datasets.annex_a.lds_annexa_la_agg import configuration as agg_config
 from liiatools.datasets.annex_a.lds_annexa_la_agg import process as agg_process
@@ -25,7 +22,6 @@ from liiatools.datasets.shared_functions.common import (
     check_file_type,
     supported_file_types,
 )
-from sfdata_stream_parser.filters.column_headers import promote_first_row
 
 log = logging.getLogger()
 click_log.basic_config(log)
@@ -69,14 +65,21 @@ def annex_a():
     type=str,
     help="A string specifying the output directory location",
 )
+@click.option(
+    "--processes",
+    default=1,
+    type=click.IntRange(min=1),
+    help="The number of worker processes used to clean the sheets of the file concurrently, defaults to 1",
+)
 @click_log.simple_verbosity_option(log)
-def cleanfile(input, la_code, la_log_dir, output):
+def cleanfile(input, la_code, la_log_dir, output, processes):
     """
     Cleans input Annex A xlsx files according to config and outputs cleaned xlsx files.
     :param input: should specify the input file location, including file name and suffix, and be usable by a Path function
     :param la_code: should be a three-letter string for the local authority depositing the file
     :param la_log_dir: should specify the path to the local authority's log folder
     :param output: should specify the path to the output folder
+    :param processes: the number of worker processes used to clean the sheets concurrently
     :return: None
     """
 
@@ -95,22 +98,16 @@ def cleanfile(input, la_code, la_log_dir, output):
     ):
         return
 
-    # Open & Parse file
-    stream = openpyxl.parse_sheets(input)
-    stream = [ev.from_event(ev, la_code=la_code, filename=filename) for ev in stream]
-    stream = promote_first_row(stream)
-
-    # Configure Stream
-    stream = clean_config.configure_stream(stream, config)
-
-    # Clean stream
-    stream = cleaner.clean(stream)
-    stream = degrade.degrade(stream)
-    stream = logger.log_errors(stream)
-    stream = populate.create_la_child_id(stream, la_code=la_code)
+    # Open, parse & clean file
+    if processes > 1:
+        stream = pipeline.clean_workbook_parallel(
+            input, config, la_code, la_name, filename, processes=processes
+        )
+    else:
+        stream = pipeline.clean_workbook(input, config, la_code, la_name, filename)
 
     # Output result
-    stream = file_creator.save_stream(stream, la_name, output)
+    stream = file_creator.save_tables(stream, output=output)
     stream = logger.save_errors_la(stream, la_log_dir=la_log_dir)
     list(stream)
 
@@ -130,11 +127,18 @@ def cleanfile(input, la_code, la_log_dir, output):
     type=str,
     help="A string specifying the output directory location",
 )
-def la_agg(input, output):
+@click.option(
+    "--no_xlsx",
+    is_flag=True,
+    default=False,
+    help="Only update the merged data store, without writing the xlsx file",
+)
+def la_agg(input, output, no_xlsx):
     """
     Joins data from newly cleaned Annex A file (output of cleanfile()) to existing Annex A data for the depositing local authority
     :param input: a string specifying the input file location of the newly cleaned file, including file name and suffix, usable by a Path function
     :param output: a string specifying the local authority's Annex A output directory, usable by a Path function
+    :param no_xlsx: if True only the merged data store is updated and AnnexA_merged.xlsx is not written
     :return: None
     """
 
@@ -144,22 +148,24 @@ def la_agg(input, output):
     # Open cleaned file as dictionary
     aa_dict = agg_process.split_file(input)
 
-    # Merge with existing LA file, if any
-    list_columns = config["sort_order"]
-    aa_dict = agg_process.sort_dict(aa_dict, list_columns=list_columns)
-    aa_dict = agg_process.merge_la_files(output, aa_dict)
+    # Merge with existing LA data, if any
+    sort_order = config["sort_order"]
+    dates = config["dates"]
+    aa_dict = agg_process.sort_dict(aa_dict, sort_order=sort_order)
+    aa_dict = agg_process.convert_datetimes(aa_dict, dates=dates)
+    aa_dict = agg_process.merge_la_files(output, aa_dict, dates=dates)
 
     # Remove duplicate data and data older than retention period
     dedup = config["dedup"]
-    dates = config["dates"]
     index_date = config["index_date"]
     aa_dict = agg_process.deduplicate(aa_dict, dedup=dedup)
-    aa_dict = agg_process.convert_datetimes(aa_dict, dates=dates)
     aa_dict = agg_process.remove_old_data(aa_dict, index_date=index_date)
-    aa_dict = agg_process.convert_dates(aa_dict, dates=dates)
 
     # Output result
-    agg_process.export_file(output, aa_dict)
+    agg_process.save_store(output, aa_dict)
+    if not no_xlsx:
+        aa_dict = agg_process.add_stored_lists(output, aa_dict)
+        agg_process.export_file(output, aa_dict)
 
 
 @annex_a.command()
@@ -183,12 +189,19 @@ def la_agg(input, output):
     type=str,
     help="A string specifying the output directory location",
 )
-def pan_agg(input, la_code, output):
+@click.option(
+    "--no_xlsx",
+    is_flag=True,
+    default=False,
+    help="Only update the merged data store, without writing the xlsx file",
+)
+def pan_agg(input, la_code, output, no_xlsx):
     """
     Merges data from newly merged Annex A file (output of la_agg()) to existing pan-London Annex A data
-    :param input: a string specifying the input file location of the newly merged file, including file name and suffix, usable by a Path function
+    :param input: a string specifying the input file location of the newly merged file, including file name and suffix, or of the LA's merged data store directory, usable by a Path function
     :param la_code: should be a three-letter string for the local authority whose data is to be merged
     :param output: a string specifying the pan-London Annex A output directory, usable by a Path function
+    :param no_xlsx: if True only the pan-London data store is updated and pan_London_Annex_A.xlsx is not written
     :return: None
     """
 
@@ -203,10 +216,13 @@ def pan_agg(input, la_code, output):
     minimise = config["minimise"]
     pan_dict = pan_process.data_minimisation(pan_dict, minimise=minimise)
 
-    # Merge with existing pan-London file, if any
-    pan_dict = pan_process.merge_agg_files(output, pan_dict, la_name)
+    # Replace the LA's partitions of the pan-London data store
+    dates = config["dates"]
+    pan_dict = pan_process.convert_datetimes(pan_dict, dates=dates)
+    pan_process.save_la_partitions(output, pan_dict, la_name, dates=dates)
 
     # Format and write file to folder
-    dates = config["dates"]
-    pan_dict = pan_process.convert_dates(pan_dict, dates=dates)
-    pan_process.export_file(output, pan_dict)
+    if not no_xlsx:
+        pan_dict = pan_process.read_pan_store(output)
+        pan_dict = pan_process.convert_dates(pan_dict, dates=dates)
+        pan_process.export_file(output, pan_dict)
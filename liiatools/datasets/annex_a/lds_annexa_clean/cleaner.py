@@ -7,7 +7,7 @@ from sfdata_stream_parser.checks import type_check
 from liiatools.datasets.annex_a.lds_annexa_clean.converters import to_integer
 from liiatools.datasets.shared_functions.common import check_postcode
 from liiatools.datasets.shared_functions.converters import to_date
-from liiatools.datasets.annex_a.lds_annexa_clean.regex import parse_regex
+from liiatools.datasets.annex_a.lds_annexa_clean.regex import to_pattern
 
 log = logging.getLogger(__name__)
 
@@ -36,7 +36,7 @@ def clean_cell_category(event):
                     )
 
                 for r in c.get("regex", []):
-                    p = parse_regex(r)
+                    p = to_pattern(r)
                     if p.match(str(event.value)) is not None:
                         return event.from_event(
                             event, value=c["code"], formatting_error="0"
@@ -1,11 +1,19 @@
 import datetime
+import hashlib
+import json
 import logging
 import os
+import tempfile
 from pathlib import Path
 import yaml
 from string import Template
 
-from liiatools.datasets.annex_a.lds_annexa_clean.regex import parse_regex
+import decouple
+
+from liiatools.datasets.annex_a.lds_annexa_clean.regex import (
+    compile_config_regex,
+    to_pattern,
+)
 from liiatools.datasets.shared_functions.common import inherit_property
 from liiatools.spec import annex_a as annex_a_asset_dir
 from liiatools.spec import common as common_asset_dir
@@ -25,7 +33,7 @@ def _match_column_name(actual_value, expected_value, expected_expressions=None):
     Returns the expected value if a match is found, or None if no match is found.
     :param actual_value: Value that exists currently
     :param expected_value: Value that we expect
-    :param expected_expressions: Optional list of (regex) expressions to test as well
+    :param expected_expressions: Optional list of (regex) expressions, or compiled regexes, to test as well
     :return: The expected Value or None
     """
     assert actual_value is not None, "Must test a value"
@@ -39,7 +47,7 @@ def _match_column_name(actual_value, expected_value, expected_expressions=None):
 
     if expected_expressions:
         for ptn in expected_expressions:
-            ptn = parse_regex(ptn)
+            ptn = to_pattern(ptn)
             if ptn.match(actual_value):
                 return expected_value
 
@@ -55,17 +63,15 @@ def configure_stream(stream, config):
     """
     sheet_config = config["datasources"]
     cell_config = config["data_config"]
+    header_cache = HeaderMatchCache(
+        sheet_config, cache_file=decouple.config("annex_a_header_cache", default=None)
+    )
     stream = identify_blank_rows(stream)
-    stream = add_sheet_name(stream, config=sheet_config)
+    stream = add_sheet_name(stream, config=sheet_config, cache=header_cache)
     stream = inherit_property(stream, "sheet_name")
     stream = inherit_property(stream, "column_headers")
-    stream = identify_cell_header(stream)
-    stream = convert_column_header_to_match(stream, config=sheet_config)
-    stream = match_property_config_to_cell(
-        stream, config=cell_config, prop_name="category_config"
-    )
-    stream = match_property_config_to_cell(
-        stream, config=sheet_config, prop_name="other_config"
+    stream = apply_column_plan(
+        stream, sheet_config=sheet_config, cell_config=cell_config
     )
     return stream
 
@@ -91,7 +97,7 @@ def identify_blank_rows(stream):
             if blank_row == [None] * len(blank_row):
                 yield from [event.from_event(event, blank_row="1") for event in row]
             else:
-                yield from [event.from_event(event) for event in row]
+                yield from row
             row = None
             blank_row = []
         elif isinstance(event, events.Cell):
@@ -103,23 +109,16 @@ def identify_blank_rows(stream):
             yield event
 
 
-@streamfilter(
-    check=checks.type_check(events.StartTable),
-    fail_function=pass_event,
-    error_function=pass_event,
-)
-def add_sheet_name(event, config):
+def _match_sheet(column_headers, config):
     """
-    Match the loaded table against one of the Annex A sheet names using fuzzy matching with regex
+    Match a set of column headers against one of the Annex A sheet names using fuzzy matching with regex
     the column headers will be matched against the config, building a new list of matched headers
     which is then checked against the expected columns from the config
-    If columns are matched but there are more columns than expected this will save those extra columns
-    as event.extra_columns
-    If no columns are matched for a table this will save the sheet name and column headers as event.match_error
 
-    :param event: A filtered list of event objects of type StartTable
+    :param column_headers: The column headers of the table
     :param config: A dictionary of keys containing sheet names and values containing headers
-    :return: An updated list of event objects
+    :return: A tuple of the sheet name, matched headers and the positions of any extra columns, or None if
+    no sheet matched
     """
     for table_name, table_cfg in config.items():
         matched_names = []
@@ -130,7 +129,7 @@ def add_sheet_name(event, config):
             (name, cfg.get("regex", [])) for name, cfg in table_cfg.items()
         ]
 
-        for actual_column in event.column_headers:
+        for column_index, actual_column in enumerate(column_headers):
             # Check the actual value against each of the configured columns and store values
             header_matches = [
                 _match_column_name(actual_column, c[0], c[1]) for c in header_config
@@ -141,7 +140,7 @@ def add_sheet_name(event, config):
 
             # Check if we have no, one or multiple configurations that match the actual value
             if len(matching_configs) == 0:
-                extra_columns.append(actual_column)
+                extra_columns.append(column_index)
             elif len(matching_configs) == 1:
                 matched_names.append(matching_configs[0])
             else:
@@ -150,12 +149,117 @@ def add_sheet_name(event, config):
                 )
         # If all of the expected columns are present, then we have a match
         if set(table_cfg.keys()) - set(matched_names) == set():
-            return events.StartTable.from_event(
-                event,
-                sheet_name=table_name,
-                extra_columns=extra_columns,
-                matched_column_headers=matched_names,
+            return table_name, matched_names, extra_columns
+    return None
+
+
+class HeaderMatchCache:
+    """
+    Remembers which sheet, if any, each layout of column headers was matched with, as LAs deposit files with the
+    same header rows every quarter. Layouts are keyed on their headers as compared by _match_column_name, i.e.
+    lower case and stripped, so a layout seen before is matched with one dictionary lookup.
+
+    The cache can be persisted to a file, which is only reused if it was created with the same configuration.
+    """
+
+    def __init__(self, config, cache_file=None):
+        """
+        :param config: A dictionary of keys containing sheet names and values containing headers
+        :param cache_file: Optional path to a JSON file used to persist the matches between runs
+        """
+        self.config = config
+        self._fingerprint = hashlib.sha256(
+            json.dumps(config, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        self.cache_file = Path(cache_file) if cache_file else None
+        self._layouts = {}
+        if self.cache_file is not None:
+            self._load_cache()
+
+    def match(self, column_headers):
+        """
+        Match a set of column headers against the sheets in the configuration, using the cached result for this
+        layout if there is one and running _match_sheet otherwise
+
+        :param column_headers: The column headers of the table
+        :return: A tuple of the sheet name, matched headers and the positions of any extra columns, or None if
+        no sheet matched
+        """
+        try:
+            signature = json.dumps([h.lower().strip() for h in column_headers])
+        except AttributeError:  # Raised in case a header is not a string, which _match_sheet reports
+            return _match_sheet(column_headers, self.config)
+
+        try:
+            return self._layouts[signature]
+        except KeyError:
+            match = _match_sheet(column_headers, self.config)
+            self._layouts[signature] = match
+            if self.cache_file is not None:
+                self.save_cache()
+            return match
+
+    def _load_cache(self):
+        if not self.cache_file.is_file():
+            return
+        try:
+            with open(self.cache_file) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            log.warning(f"Could not read header cache file {self.cache_file}, ignoring")
+            return
+        if cache.get("fingerprint") != self._fingerprint:
+            log.info(
+                f"Header cache file {self.cache_file} was created with a different configuration, ignoring"
             )
+            return
+        for signature, match in cache.get("layouts", {}).items():
+            self._layouts[signature] = tuple(match) if match is not None else None
+
+    def save_cache(self):
+        """
+        Write the cached matches to the cache file, replacing it atomically
+        """
+        handle, temp_file = tempfile.mkstemp(
+            suffix=".tmp", prefix=self.cache_file.name, dir=self.cache_file.parent
+        )
+        with os.fdopen(handle, "w") as f:
+            json.dump({"fingerprint": self._fingerprint, "layouts": self._layouts}, f)
+        os.replace(temp_file, self.cache_file)
+
+
+@streamfilter(
+    check=checks.type_check(events.StartTable),
+    fail_function=pass_event,
+    error_function=pass_event,
+)
+def add_sheet_name(event, config, cache=None):
+    """
+    Match the loaded table against one of the Annex A sheet names using fuzzy matching with regex
+    the column headers will be matched against the config, building a new list of matched headers
+    which is then checked against the expected columns from the config
+    If columns are matched but there are more columns than expected this will save those extra columns
+    as event.extra_columns
+    If no columns are matched for a table this will save the sheet name and column headers as event.match_error
+
+    :param event: A filtered list of event objects of type StartTable
+    :param config: A dictionary of keys containing sheet names and values containing headers
+    :param cache: Optional HeaderMatchCache of previously matched header layouts for this config
+    :return: An updated list of event objects
+    """
+    if cache is not None:
+        match = cache.match(event.column_headers)
+    else:
+        match = _match_sheet(event.column_headers, config)
+
+    if match is not None:
+        table_name, matched_names, extra_columns = match
+        return events.StartTable.from_event(
+            event,
+            sheet_name=table_name,
+            extra_columns=[event.column_headers[i] for i in extra_columns],
+            matched_column_headers=list(matched_names),
+        )
     return event
 
 
@@ -191,20 +295,32 @@ def convert_column_header_to_match(event, config):
     :param config: The loaded configuration to use
     :return: An updated list of event objects
     """
-    column_config = config[event.sheet_name]
+    column_header = _resolve_column_header(
+        event.column_header, config[event.sheet_name]
+    )
+    return event.from_event(event, column_header=column_header)
+
+
+def _resolve_column_header(column_header, column_config):
+    """
+    Find the configured column header that an actual column header was matched with e.g. Age -> Age of Child (Years)
+    :param column_header: The column header as it appears in the file
+    :param column_config: The configuration of the columns for the matched sheet
+    :return: The configured column header, or "Unknown" if there is no match
+    """
     for c in column_config:
-        if c in str(event.column_header):
-            return event.from_event(event, column_header=c)
+        if c in str(column_header):
+            return c
 
         else:
             try:
                 for r in column_config[c].get("regex", []):
-                    p = parse_regex(r)
-                    if p.match(str(event.column_header)) is not None:
-                        return event.from_event(event, column_header=c)
+                    p = to_pattern(r)
+                    if p.match(str(column_header)) is not None:
+                        return c
             except AttributeError:  # Raised in case a config item empty which is acceptable
                 pass
-    return event.from_event(event, column_header="Unknown")
+    return "Unknown"
 
 
 @streamfilter(
@@ -231,6 +347,67 @@ def match_property_config_to_cell(event, config, prop_name):
         return event
 
 
+def create_column_plan(column_headers, sheet_name, sheet_config, cell_config):
+    """
+    Resolve, once per table, the properties that every Cell in a column will be given. This is the column_header
+    (converted to the column header it was matched with if the table matched a sheet) and the category_config
+    and other_config for that column, as set per cell by identify_cell_header, convert_column_header_to_match
+    and match_property_config_to_cell
+
+    :param column_headers: The column headers of the table
+    :param sheet_name: The sheet name the table was matched with, or None if it did not match a sheet
+    :param sheet_config: The loaded configuration of the columns for each sheet
+    :param cell_config: The loaded configuration of the categories for each sheet
+    :return: A list with a dictionary of Cell properties for each column index
+    """
+    column_plan = []
+    for column_header in column_headers:
+        column = {"column_header": column_header}
+        if sheet_name is not None:
+            column["column_header"] = _resolve_column_header(
+                column_header, sheet_config[sheet_name]
+            )
+            for prop_name, config in [
+                ("category_config", cell_config),
+                ("other_config", sheet_config),
+            ]:
+                try:
+                    column[prop_name] = config[sheet_name][column["column_header"]]
+                except KeyError:  # Raised in case there is no property item for the given sheet name and cell header
+                    pass
+        column_plan.append(column)
+    return column_plan
+
+
+def apply_column_plan(stream, sheet_config, cell_config):
+    """
+    Create a column plan at each StartTable and use it to give every Cell its column_header, category_config and
+    other_config according to the Cell's column_index, so these are only worked out once per column rather than
+    once per cell
+
+    :param stream: A filtered list of event objects
+    :param sheet_config: The loaded configuration of the columns for each sheet
+    :param cell_config: The loaded configuration of the categories for each sheet
+    :return: An updated list of event objects
+    """
+    column_plan = None
+    for event in stream:
+        if isinstance(event, events.StartTable):
+            column_headers = getattr(event, "column_headers", None)
+            if column_headers:
+                column_plan = create_column_plan(
+                    column_headers,
+                    getattr(event, "sheet_name", None),
+                    sheet_config=sheet_config,
+                    cell_config=cell_config,
+                )
+        elif isinstance(event, events.EndTable):
+            column_plan = None
+        elif column_plan is not None and isinstance(event, events.Cell):
+            event = event.from_event(event, **column_plan[event.column_index])
+        yield event
+
+
 class Config(dict):
     def __init__(self, *config_files):
         super().__init__()
@@ -251,6 +428,9 @@ class Config(dict):
                 file = COMMON_CONFIG_DIR / "LA-codes.yml"
             self.load_config(file, conditional=False)
 
+        # Compile every regex in the configuration once, rather than each time a cell is matched
+        self.regex_registry = compile_config_regex(self)
+
         self["config_date"] = datetime.datetime.now().isoformat()
         try:
             self["username"] = os.getlogin()
@@ -2,6 +2,9 @@ import tablib
 import functools
 import logging
 import os
+import tempfile
+
+import xlsxwriter
 
 from sfdata_stream_parser import events
 from sfdata_stream_parser.filters.generic import streamfilter, pass_event
@@ -22,10 +25,26 @@ def save_stream(stream, la_name, output):
     :param output: Location to write the output
     :return: Updated stream
     """
+    stream = create_table_events(stream, la_name=la_name, stream_rows=True)
+    stream = save_tables(stream, output=output)
+    return stream
+
+
+def create_table_events(stream, la_name, stream_rows=False):
+    """
+    Collect the rows of each table into a TableEvent holding its data, or if stream_rows is True mark up each
+    row to be written by save_tables as it arrives
+    :param stream: The stream to output
+    :param la_name: Full name of the LA
+    :param stream_rows: Whether to mark up rows with create_table_rows rather than collect them with create_tables
+    :return: Updated stream
+    """
     stream = coalesce_row(stream)
     stream = filter_rows(stream)
-    stream = create_tables(stream, la_name=la_name)
-    stream = save_tables(stream, output=output)
+    if stream_rows:
+        stream = create_table_rows(stream, la_name=la_name)
+    else:
+        stream = create_tables(stream, la_name=la_name)
     return stream
 
 
@@ -122,31 +141,139 @@ def create_tables(stream, la_name):
         yield event
 
 
+def create_table_rows(stream, la_name):
+    """
+    Mark up the rows of tables with column headers that matched the config file so they can be written out by
+    save_tables one at a time, rather than collecting them into a TableEvent as create_tables does
+    The StartTable is given the table_headers and each RowEvent that passed filter_rows its table_row values
+    Ignore any tables that did not have column headers matching the config file
+    :param stream: The stream to output
+    :param la_name: The name of the local authority
+    :return: Updated stream
+    """
+    matched = False
+    for event in stream:
+        if isinstance(event, events.StartTable):
+            matched_column_headers = getattr(event, "matched_column_headers", None)
+            matched = matched_column_headers is not None
+            if matched:
+                event = event.from_event(
+                    event, table_headers=matched_column_headers + ["LA"]
+                )
+        elif isinstance(event, events.EndTable):
+            matched = False
+        elif matched and isinstance(event, RowEvent) and event.filter == 0:
+            event = event.from_event(
+                event, table_row=list(event.row.values()) + [la_name]
+            )
+        yield event
+
+
+class _WorkbookWriter:
+    """
+    Writes the clean tables to an xlsx file with XlsxWriter in constant memory mode, so each row is flushed to
+    disk as soon as it is written. The workbook is written to a temporary file in the output directory, which
+    is only moved into place by commit
+    """
+
+    def __init__(self, output):
+        handle, self.temp_file = tempfile.mkstemp(
+            suffix=".xlsx.tmp", prefix=".clean_", dir=output
+        )
+        os.close(handle)
+        self.workbook = xlsxwriter.Workbook(
+            self.temp_file,
+            {
+                "constant_memory": True,
+                "strings_to_urls": False,
+                "default_date_format": "yyyy-mm-dd",
+            },
+        )
+        self.bold = self.workbook.add_format({"bold": True})
+        self.wrap_text = self.workbook.add_format({"text_wrap": True})
+        self.sheet_count = 0
+        self.worksheet = None
+        self.row_number = 0
+
+    def add_sheet(self, sheet_name, headers):
+        # Every matched table counts towards the 11 sheets save_tables expects, even one that is not saved
+        self.sheet_count += 1
+        if self.workbook.get_worksheet_by_name(sheet_name) is not None:
+            log.warning(
+                f"More than one table matched {sheet_name}, only the first is saved"
+            )
+            self.worksheet = None
+            return
+        self.worksheet = self.workbook.add_worksheet(sheet_name)
+        self.worksheet.freeze_panes(1, 0)
+        self.worksheet.write_row(0, 0, headers, self.bold)
+        self.row_number = 1
+
+    def write_row(self, values):
+        if self.worksheet is None:
+            return
+        for column, value in enumerate(values):
+            cell_format = self.wrap_text if "\n" in str(value) else None
+            try:
+                self.worksheet.write(self.row_number, column, value, cell_format)
+            except TypeError:
+                self.worksheet.write(self.row_number, column, str(value), cell_format)
+        self.row_number += 1
+
+    def commit(self, output_file):
+        self.workbook.close()
+        os.replace(self.temp_file, output_file)
+
+    def discard(self):
+        self.workbook.close()
+        os.remove(self.temp_file)
+
+
 def save_tables(stream, output):
     """
-    Save the data events as Excel files in the output directory as long as there are exactly 11 sheets
+    Save the tables as Excel files in the output directory as long as there are exactly 11 sheets
+    Rows are written as they arrive, either from the RowEvents marked up by create_table_rows or from the data
+    of each TableEvent, to a temporary file that is only moved into place when the file is complete
     :param stream: The stream to output
     :param output: The location of the output file
     :return: updated stream object.
     """
-    book = tablib.Databook()
+    writer = None
     sheet_name = ""
-    for event in stream:
-        if isinstance(event, events.StartContainer):
-            book = tablib.Databook()
-        elif isinstance(event, events.EndContainer) and len(book.sheets()) == 11:
-            with open(f"{os.path.join(output, event.filename)}_clean.xlsx", "wb") as f:
-                f.write(book.export("xlsx"))
-        elif isinstance(event, events.StartTable):
-            try:
-                sheet_name = event.sheet_name
-            except AttributeError:
-                sheet_name = ""
-        elif isinstance(event, TableEvent) and event.data is not None:
-            dataset = event.data
-            dataset.title = sheet_name
-            book.add_sheet(dataset)
-        yield event
+    try:
+        for event in stream:
+            if isinstance(event, events.StartContainer):
+                if writer is not None:
+                    writer.discard()
+                writer = _WorkbookWriter(output)
+            elif isinstance(event, events.EndContainer):
+                if writer is not None and writer.sheet_count == 11:
+                    writer.commit(f"{os.path.join(output, event.filename)}_clean.xlsx")
+                elif writer is not None:
+                    writer.discard()
+                writer = None
+            elif isinstance(event, events.StartTable):
+                try:
+                    sheet_name = event.sheet_name
+                except AttributeError:
+                    sheet_name = ""
+                table_headers = getattr(event, "table_headers", None)
+                if table_headers is not None:
+                    writer = writer or _WorkbookWriter(output)
+                    writer.add_sheet(sheet_name, table_headers)
+            elif isinstance(event, RowEvent) and writer is not None:
+                table_row = getattr(event, "table_row", None)
+                if table_row is not None:
+                    writer.write_row(table_row)
+            elif isinstance(event, TableEvent) and event.data is not None:
+                writer = writer or _WorkbookWriter(output)
+                writer.add_sheet(sheet_name, event.data.headers)
+                for row in event.data:
+                    writer.write_row(row)
+            yield event
+    finally:
+        if writer is not None:
+            writer.discard()
 
 
 @functools.cache
@@ -1,4 +1,3 @@
-from collections import Counter
 from datetime import datetime
 import logging
 import os
@@ -7,6 +6,13 @@ from sfdata_stream_parser import events
 from sfdata_stream_parser.filters.generic import streamfilter, pass_event
 from sfdata_stream_parser.checks import type_check
 
+from liiatools.datasets.shared_functions.logger import (
+    ErrorCounter,
+    format_error_counts,
+    error_counts_record,
+    LogSink,
+)
+
 log = logging.getLogger(__name__)
 
 
@@ -63,22 +69,26 @@ def blank_error_check(event):
 
 def create_error_list(stream, error_name):
     """
-    Create a list of the column headers for cells with errors
+    Count the column headers of cells with errors, keeping the spreadsheet row numbers of the first few as examples
 
     :param stream: A filtered list of event objects
     :param error_name: A string containing the error_name to inherit e.g. "blank_error"
     :return: An updated list of event objects
     """
     error_list = None
+    row_number = None
     for event in stream:
         if isinstance(event, events.StartTable):
-            error_list = []
+            error_list = ErrorCounter()
         elif isinstance(event, ErrorTable):
             yield ErrorTable.from_event(event, **{f"{error_name}_list": error_list})
             error_list = None
+        elif isinstance(event, events.StartRow):
+            row_index = getattr(event, "row_index", None)
+            row_number = None if row_index is None else row_index + 1
         elif error_list is not None and isinstance(event, events.Cell):
             if getattr(event, error_name, None) == "1":
-                error_list.append(event.column_header)
+                error_list.add(event.column_header, row=row_number)
         yield event
 
 
@@ -239,104 +249,131 @@ def create_missing_sheet_error(stream):
 def save_errors_la(stream, la_log_dir):
     """
     Count the error events and save them as a text file in the Local Authority Logs directory
-    only save the error events if there is at least one error in said event
+    only save the error events if there is at least one error in said event. The log entries are buffered and
+    written once the whole file has been read, or if processing stops early
 
     :param stream: A filtered list of event objects
     :param la_log_dir: Location to save the gathered error logs
     :return: An updated list of event objects
     """
     start_time = f"{datetime.now():%Y-%m-%dT%H%M%SZ}"
-    for event in stream:
-        try:
-            if isinstance(event, ErrorTable) and (
-                event.formatting_error_list is not None
-                and event.blank_error_list is not None
-                and event.sheet_name is not None
-                and event.extra_columns_error is not None
-                and event.duplicate_columns_error is not None
-            ):
-                if (
-                    event.formatting_error_list
-                    or event.blank_error_list
-                    or event.extra_columns_error
-                    or event.duplicate_columns_error
+    sink = LogSink()
+    try:
+        for event in stream:
+            try:
+                if isinstance(event, ErrorTable) and (
+                    event.formatting_error_list is not None
+                    and event.blank_error_list is not None
+                    and event.sheet_name is not None
+                    and event.extra_columns_error is not None
+                    and event.duplicate_columns_error is not None
                 ):
-                    with open(
-                        f"{os.path.join(la_log_dir, event.filename)}_error_log_{start_time}.txt",
-                        "a",
-                    ) as f:
-                        f.write("\n")
-                        f.write(event.sheet_name)
-                        f.write("\n")
+                    if (
+                        event.formatting_error_list
+                        or event.blank_error_list
+                        or event.extra_columns_error
+                        or event.duplicate_columns_error
+                    ):
+                        text = ["", event.sheet_name]
+                        record = {
+                            "filename": event.filename,
+                            "sheet_name": event.sheet_name,
+                        }
                         if event.formatting_error_list:
-                            f.write(
+                            text.append(
                                 "Number of cells that have been made blank "
                                 "because they could not be formatted correctly"
                             )
-                            f.write("\n")
-                            counter_dict = Counter(event.formatting_error_list)
-                            f.write(
-                                str(counter_dict)[9:-2]
-                            )  # Remove "Counter({" and "})" from string
-                            f.write("\n")
+                            text.append(
+                                format_error_counts(event.formatting_error_list)
+                            )
+                            record["formatting_error"] = error_counts_record(
+                                event.formatting_error_list
+                            )
                         if event.blank_error_list:
-                            f.write(
+                            text.append(
                                 "Number of blank cells that should have contained data"
                             )
-                            f.write("\n")
-                            blank_counter_dict = Counter(event.blank_error_list)
-                            f.write(
-                                str(blank_counter_dict)[9:-2]
-                            )  # Remove "Counter({" and "})" from string
-                            f.write("\n")
+                            text.append(format_error_counts(event.blank_error_list))
+                            record["blank_error"] = error_counts_record(
+                                event.blank_error_list
+                            )
                         if event.extra_columns_error:
                             extra_columns_error_no_none = list(
                                 filter(None, event.extra_columns_error)
                             )
-                            f.write(
+                            text.append(
                                 f"Headers of unexpected columns that have been removed or reformatted: "
                                 f"{extra_columns_error_no_none}"
                             )
-                            f.write("\n")
+                            record["extra_columns_error"] = extra_columns_error_no_none
                         if event.duplicate_columns_error:
-                            f.write(event.duplicate_columns_error)
-                            f.write("\n")
-        except AttributeError:
-            pass
+                            text.append(event.duplicate_columns_error)
+                            record[
+                                "duplicate_columns_error"
+                            ] = event.duplicate_columns_error
+                        sink.write(
+                            f"{os.path.join(la_log_dir, event.filename)}_error_log_{start_time}.txt",
+                            "\n".join(text) + "\n",
+                            record=record,
+                        )
+            except AttributeError:
+                pass
+
+            try:
+                if (
+                    isinstance(event, events.StartTable)
+                    and event.match_error is not None
+                ):
+                    sink.write(
+                        f"{os.path.join(la_log_dir, event.filename)}_error_log_{start_time}.txt",
+                        f"\n{event.match_error}\n",
+                        record={
+                            "filename": event.filename,
+                            "match_error": event.match_error,
+                        },
+                    )
+            except AttributeError:
+                pass
+
+            try:
+                if (
+                    isinstance(event, events.EndContainer)
+                    and event.missing_sheet_error is not None
+                ):
+                    sink.write(
+                        f"{os.path.join(la_log_dir, event.filename)}_error_log_{start_time}.txt",
+                        f"\n{event.missing_sheet_error}\n",
+                        record={
+                            "filename": event.filename,
+                            "missing_sheet_error": event.missing_sheet_error,
+                        },
+                    )
+            except AttributeError:
+                pass
+
+            if isinstance(event, events.EndContainer):
+                sink.flush()
+            yield event
+    finally:
+        sink.flush()
 
-        try:
-            if isinstance(event, events.StartTable) and event.match_error is not None:
-                with open(
-                    f"{os.path.join(la_log_dir, event.filename)}_error_log_{start_time}.txt",
-                    "a",
-                ) as f:
-                    f.write("\n")
-                    f.write(event.match_error)
-                    f.write("\n")
-        except AttributeError:
-            pass
 
-        try:
-            if (
-                isinstance(event, events.EndContainer)
-                and event.missing_sheet_error is not None
-            ):
-                with open(
-                    f"{os.path.join(la_log_dir, event.filename)}_error_log_{start_time}.txt",
-                    "a",
-                ) as f:
-                    f.write("\n")
-                    f.write(event.missing_sheet_error)
-                    f.write("\n")
-        except AttributeError:
-            pass
+def log_errors(stream):
+    """
+    Compile the log error functions
 
-        yield event
+    :param stream: A filtered list of event objects
+    :return: An updated list of event objects
+    """
+    stream = log_table_errors(stream)
+    stream = create_missing_sheet_error(stream)
+    return stream
 
 
-def log_errors(stream):
+def log_table_errors(stream):
     """
-    Compile the log error functions
+    Compile the log error functions that only look at one table at a time
 
     :param stream: A filtered list of event objects
     :return: An updated list of event objects
@@ -349,5 +386,4 @@ def log_errors(stream):
     stream = duplicate_column_check(stream)
     stream = inherit_error(stream, error_name="duplicate_columns")
     stream = create_file_match_error(stream)
-    stream = create_missing_sheet_error(stream)
     return stream
@@ -0,0 +1,140 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from openpyxl import load_workbook
+from sfdata_stream_parser import events
+from sfdata_stream_parser.filters.column_headers import promote_first_row
+
+from liiatools.datasets.annex_a.lds_annexa_clean import (
+    configuration as clean_config,
+    cleaner,
+    degrade,
+    logger,
+    populate,
+    file_creator,
+)
+from liiatools.datasets.shared_functions.parse import parse_xlsx
+
+log = logging.getLogger(__name__)
+
+# Events that are still needed after the tables have been created, for the missing sheet check and for saving
+# the clean tables and error logs
+_TABLE_RESULT_EVENTS = (
+    events.StartTable,
+    events.EndTable,
+    logger.ErrorTable,
+    file_creator.TableEvent,
+)
+
+
+def clean_tables(stream, config, la_code, la_name, stream_rows=False):
+    """
+    Configure, clean, degrade and log the errors of each table in the stream, then collect the rows of each
+    table into a TableEvent. Each table is processed without reference to any other table
+
+    :param stream: A filtered list of event objects, with the first row of each table promoted to column headers
+    :param config: The loaded configuration
+    :param la_code: The 3-character LA code used to identify a local authority
+    :param la_name: Full name of the LA
+    :param stream_rows: Whether to leave the rows to be written one at a time rather than collecting them
+    :return: An updated list of event objects
+    """
+    stream = clean_config.configure_stream(stream, config)
+    stream = cleaner.clean(stream)
+    stream = degrade.degrade(stream)
+    stream = logger.log_table_errors(stream)
+    stream = populate.create_la_child_id(stream, la_code=la_code)
+    stream = file_creator.create_table_events(
+        stream, la_name=la_name, stream_rows=stream_rows
+    )
+    return stream
+
+
+def clean_workbook(input, config, la_code, la_name, filename):
+    """
+    Clean every sheet of an Annex A workbook in turn
+
+    :param input: Location of file to be cleaned
+    :param config: The loaded configuration
+    :param la_code: The 3-character LA code used to identify a local authority
+    :param la_name: Full name of the LA
+    :param filename: Name of the file, without suffix, used to name the output files
+    :return: A list of event objects with an ErrorTable for each sheet and the rows to write
+    """
+    stream = parse_xlsx(input, la_code=la_code, filename=filename)
+    stream = promote_first_row(stream)
+    stream = clean_tables(
+        stream, config, la_code=la_code, la_name=la_name, stream_rows=True
+    )
+    stream = logger.create_missing_sheet_error(stream)
+    return stream
+
+
+def _clean_sheet(sheet_index, input, config, la_code, la_name, filename):
+    """
+    Clean a single sheet of an Annex A workbook. Run in a worker process by clean_workbook_parallel
+
+    Events cannot be pickled, and every event refers back to the event it was created from, so only the
+    events needed to save the output are returned, as their type and properties
+
+    :param sheet_index: Position of the sheet in the workbook
+    :param input: Location of file to be cleaned
+    :param config: The loaded configuration
+    :param la_code: The 3-character LA code used to identify a local authority
+    :param la_name: Full name of the LA
+    :param filename: Name of the file, without suffix, used to name the output files
+    :return: A list of (event type, event properties) tuples
+    """
+    workbook = load_workbook(input, read_only=True, data_only=True)
+    try:
+        stream = parse_xlsx(
+            workbook.worksheets[sheet_index], la_code=la_code, filename=filename
+        )
+        stream = promote_first_row(stream)
+        stream = clean_tables(stream, config, la_code=la_code, la_name=la_name)
+        return [
+            (type(event), {k: v for k, v in event.as_dict().items() if k != "source"})
+            for event in stream
+            if isinstance(event, _TABLE_RESULT_EVENTS)
+        ]
+    finally:
+        workbook.close()
+
+
+def clean_workbook_parallel(input, config, la_code, la_name, filename, processes):
+    """
+    Clean the sheets of an Annex A workbook concurrently, one sheet per task in a pool of worker processes.
+    The results are put back together in the original sheet order, so the output is the same as that of
+    clean_workbook
+
+    :param input: Location of file to be cleaned
+    :param config: The loaded configuration
+    :param la_code: The 3-character LA code used to identify a local authority
+    :param la_name: Full name of the LA
+    :param filename: Name of the file, without suffix, used to name the output files
+    :param processes: Number of worker processes to use
+    :return: A list of event objects with a TableEvent and ErrorTable for each sheet
+    """
+    workbook = load_workbook(input, read_only=True, data_only=True)
+    sheet_count = len(workbook.sheetnames)
+    workbook.close()
+
+    def sheet_events():
+        yield events.StartContainer(name=input, la_code=la_code, filename=filename)
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = pool.map(
+                _clean_sheet,
+                range(sheet_count),
+                repeat(input),
+                repeat(config),
+                repeat(la_code),
+                repeat(la_name),
+                repeat(filename),
+            )
+            for sheet in results:
+                for event_type, properties in sheet:
+                    yield event_type(**properties)
+        yield events.EndContainer(la_code=la_code, filename=filename)
+
+    return logger.create_missing_sheet_error(sheet_events())
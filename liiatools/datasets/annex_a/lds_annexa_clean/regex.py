@@ -1,8 +1,12 @@
 import re
+from functools import lru_cache
 from typing import Pattern
 
 __flag_resolved = dict(i=re.I, m=re.M, s=re.S, u=re.U, l=re.L, x=re.X)
 
+# Compiled regexes indexed by their '/{pattern}/{modifiers}' expression
+__registry = {}
+
 
 def resolve_flags(flags: str) -> int:
     flag_expr = 0
@@ -12,6 +16,20 @@ def resolve_flags(flags: str) -> int:
     return flag_expr
 
 
+@lru_cache(maxsize=None)
+def _wrapper_pattern(separator: str) -> Pattern:
+    """
+    Compile the pattern used to split '/{pattern}/{modifiers}' for a given separator
+
+    :param separator: The first character of the regex expression
+    :return: Compiled wrapper regex
+    """
+    separator = re.escape(separator)
+    return re.compile(
+        "{separator}(.+)({separator}([imsulx]+)?)".format(separator=separator)
+    )
+
+
 def parse_regex(regex: str) -> Pattern:
     """
     Parse a regex pattern '/{pattern}/{modifiers}'
@@ -19,11 +37,7 @@ def parse_regex(regex: str) -> Pattern:
     :param regex: regex expression
     :return: Compiled regex
     """
-    separator = re.escape(regex[0])
-    pattern = re.compile(
-        "{separator}(.+)({separator}([imsulx]+)?)".format(separator=separator)
-    )
-    match = pattern.match(regex)
+    match = _wrapper_pattern(regex[0]).match(regex)
     if match is None:
         raise Exception("Failed to parse regular expression: '{}'".format(regex))
 
@@ -32,3 +46,41 @@ def parse_regex(regex: str) -> Pattern:
     flags = resolve_flags(flags)
 
     return re.compile(pattern, flags)
+
+
+def to_pattern(regex) -> Pattern:
+    """
+    Return the compiled regex for a '/{pattern}/{modifiers}' expression from the registry, compiling and
+    registering it first if it has not been seen before. Compiled regexes are returned unchanged.
+
+    :param regex: Regex expression or compiled regex
+    :return: Compiled regex
+    """
+    try:
+        return __registry[regex]
+    except KeyError:
+        if isinstance(regex, re.Pattern):
+            return regex
+        pattern = __registry[regex] = parse_regex(regex)
+        return pattern
+
+
+def compile_config_regex(config) -> dict:
+    """
+    Compile every regex expression held under a "regex" key of the configuration into the registry, so
+    matching cells against the configuration never has to compile a regex
+
+    :param config: A loaded configuration, or any part of it
+    :return: The registry of regex expression to compiled regex
+    """
+    if isinstance(config, dict):
+        for key, value in config.items():
+            if key == "regex" and isinstance(value, list):
+                for expression in value:
+                    to_pattern(expression)
+            else:
+                compile_config_regex(value)
+    elif isinstance(config, list):
+        for value in config:
+            compile_config_regex(value)
+    return __registry
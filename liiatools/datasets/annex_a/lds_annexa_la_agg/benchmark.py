@@ -0,0 +1,103 @@
+"""
+Benchmark for Annex A la_agg. Generates a merged workbook with the configured Lists and columns, split evenly
+between the Lists, and times reading it, the typed date, de-duplication and retention steps, and writing
+AnnexA_merged.xlsx. The workbook is generated from a fixed seed, so each run times the same data.
+
+Usage: python -m liiatools.datasets.annex_a.lds_annexa_la_agg.benchmark [rows]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from liiatools.datasets.annex_a.lds_annexa_la_agg import configuration as agg_config
+from liiatools.datasets.annex_a.lds_annexa_la_agg import process as agg_process
+
+DEFAULT_ROWS = [1000000]
+
+
+def generate_merged(rows, config, seed=0):
+    """
+    Generates merged Annex A data as a dictionary of DataFrames, one per List, as read from a merged workbook.
+    Dates are written as dd/mm/yyyy text from the last ten years, so some fall outside the retention period, and
+    about one Child Unique ID in ten is repeated so there are duplicates to remove
+
+    :param rows: The total number of rows, split evenly between the Lists
+    :param config: The la_agg configuration
+    :param seed: The seed for the random values
+    :return: Dictionary of List name to DataFrame
+    """
+    rng = np.random.default_rng(seed)
+    lists = list(config["sort_order"])
+    today = pd.Timestamp("today").normalize()
+    aa_dict = {}
+    for number, k in enumerate(lists):
+        size = rows // len(lists) + (number < rows % len(lists))
+        columns = {}
+        for column in config["sort_order"][k]:
+            if column in config["dates"][k]:
+                days = rng.integers(0, 3650, size)
+                columns[column] = (today - pd.to_timedelta(days, unit="D")).strftime(
+                    "%d/%m/%Y"
+                )
+            elif column == "Child Unique ID":
+                columns[column] = rng.integers(0, max(size * 9 // 10, 1), size).astype(
+                    str
+                )
+            elif column == "LA":
+                columns[column] = np.full(size, "Barnet")
+            else:
+                columns[column] = rng.choice(["a", "b", "c", "d"], size)
+        aa_dict[k] = pd.DataFrame(columns)
+    return aa_dict
+
+
+def benchmark(rows):
+    """
+    Runs the la_agg steps on a generated merged workbook
+
+    :param rows: The number of rows in the merged workbook
+    :return: Dictionary of step name to the time it took, in seconds, and the number of rows kept after retention
+    """
+    config = agg_config.Config()
+    timings = {}
+    with tempfile.TemporaryDirectory() as directory:
+        input_file = Path(directory, "merged.xlsx")
+        with pd.ExcelWriter(input_file) as writer:
+            for k, df in generate_merged(rows, config, seed=rows).items():
+                df.to_excel(writer, sheet_name=k, index=False)
+
+        start = time.perf_counter()
+        aa_dict = agg_process.split_file(input_file)
+        timings["read"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        aa_dict = agg_process.sort_dict(aa_dict, sort_order=config["sort_order"])
+        aa_dict = agg_process.convert_datetimes(aa_dict, dates=config["dates"])
+        aa_dict = agg_process.deduplicate(aa_dict, dedup=config["dedup"])
+        aa_dict = agg_process.remove_old_data(aa_dict, index_date=config["index_date"])
+        timings["process"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        agg_process.export_file(directory, aa_dict)
+        timings["write"] = time.perf_counter() - start
+    kept = sum(len(df) for df in aa_dict.values())
+    return timings, kept
+
+
+def main(sizes):
+    print(f"{'rows':>10} {'kept':>10} {'read s':>10} {'process s':>10} {'write s':>10}")
+    for rows in sizes:
+        timings, kept = benchmark(rows)
+        print(
+            f"{rows:>10} {kept:>10} {timings['read']:>10.2f} {timings['process']:>10.2f} "
+            f"{timings['write']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or DEFAULT_ROWS)
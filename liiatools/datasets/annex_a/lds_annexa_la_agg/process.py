@@ -3,6 +3,12 @@ import pandas as pd
 from datetime import date
 import logging
 
+from liiatools.datasets.shared_functions.store import (
+    read_store,
+    store_tables,
+    write_store,
+)
+
 log = logging.getLogger(__name__)
 
 
@@ -23,6 +29,8 @@ def sort_dict(aa_dict, sort_order):
 
 def _merge_dfs(aa_dict, old_dict):
     for k in aa_dict.keys():
+        if k not in old_dict:
+            continue
         new_df = aa_dict[k]
         old_df = old_dict[k]
         merged_df = pd.concat([new_df, old_df], axis=0, ignore_index=True)
@@ -30,12 +38,24 @@ def _merge_dfs(aa_dict, old_dict):
     return aa_dict
 
 
-def merge_la_files(output, aa_dict):
+def merge_la_files(output, aa_dict, dates=None):
+    """
+    Merges the new data with the existing merged data for the LA, if any. The existing data is read from the
+    merged data store, only for the Lists in the new data, or from AnnexA_merged.xlsx if the LA has no store
+    yet, in which case any date fields given are converted to datetimes to match the new data
+    """
+    store_dir = Path(output, "AnnexA_merged")
     output_file = Path(output, f"AnnexA_merged.xlsx")
-    if output_file.is_file():
+    if store_dir.is_dir():
+        stored = store_tables(store_dir)
+        old_dict = read_store(store_dir, [k for k in aa_dict if k in stored])
+        _merge_dfs(aa_dict, old_dict)
+    elif output_file.is_file():
         old_dict = pd.read_excel(
             output_file, sheet_name=None, index_col=None, dtype=object
         )
+        if dates is not None:
+            old_dict = convert_datetimes(old_dict, dates=dates)
         _merge_dfs(aa_dict, old_dict)
     return aa_dict
 
@@ -49,61 +69,76 @@ def deduplicate(aa_dict, dedup):
 
 
 def convert_datetimes(aa_dict, dates):
+    """
+    Parses the date fields of each List as datetime64, once, so they can be compared and written without
+    converting each value. Fields that are already datetime64, e.g. read from the merged data store, are left
+    as they are
+    """
     for k in aa_dict.keys():
         df = aa_dict[k]
         for date_field in dates[k]:
-            df[date_field] = pd.to_datetime(df[date_field], format="%d/%m/%Y")
+            if not pd.api.types.is_datetime64_any_dtype(df[date_field]):
+                df[date_field] = pd.to_datetime(df[date_field], format="%d/%m/%Y")
         aa_dict[k] = df
     return aa_dict
 
 
-def _remove_years(years):
-    d = pd.to_datetime("today")
+def _remove_years(years, today=None):
+    d = pd.to_datetime("today") if today is None else today
     try:
         return d.replace(year=d.year - years)
     except ValueError:
         return d + (date(d.year - years, 1, 1) - date(d.year, 1, 1))
 
 
-def remove_old_data(aa_dict, index_date):
+def remove_old_data(aa_dict, index_date, today=None):
+    """
+    Removes the rows of each List whose index date is older than the List's retention period. The cutoff date of
+    each List is worked out once, from the same reference time for every List, and compared against the whole
+    datetime64 index date column at once
+    """
+    today = pd.to_datetime("today") if today is None else today
     for k in aa_dict.keys():
         index_date_key = index_date[k]
         df = aa_dict[k]
+        ref_dates = df[index_date_key["ref_date"]]
+        in_period = ref_dates >= _remove_years(index_date_key["years"], today=today)
         if k == "List 9":
-            df = df[
-                df[index_date_key["ref_date"]] >= _remove_years(index_date_key["years"])
-            ]
+            df = df[in_period]
         elif k == "List 10":
-            df = df[
-                (
-                    df[index_date_key["ref_date"]]
-                    >= _remove_years(index_date_key["years"])
-                ).any(axis=1)
-            ]
+            df = df[in_period.any(axis=1)]
         else:
-            df = df[
-                (
-                    df[index_date_key["ref_date"]]
-                    >= _remove_years(index_date_key["years"])
-                )
-                | (df[index_date_key["ref_date"]].isnull())
-            ]
+            df = df[in_period | ref_dates.isnull()]
         aa_dict[k] = df
     return aa_dict
 
 
-def convert_dates(aa_dict, dates):
-    for k in aa_dict.keys():
-        df = aa_dict[k]
-        for date_field in dates[k]:
-            df[date_field] = pd.to_datetime(df[date_field], format="%d/%m/%Y").dt.date
-        aa_dict[k] = df
-    return aa_dict
+def add_stored_lists(output, aa_dict):
+    """
+    Adds the Lists held in the LA's merged data store that are not in the new data, so the whole merged data
+    can be exported. Only those Lists are read from the store
+    """
+    store_dir = Path(output, "AnnexA_merged")
+    stored = store_tables(store_dir) if store_dir.is_dir() else []
+    old_dict = read_store(store_dir, [k for k in stored if k not in aa_dict])
+    names = stored + [k for k in aa_dict if k not in stored]
+    return {k: aa_dict[k] if k in aa_dict else old_dict[k] for k in names}
 
 
 def export_file(output, aa_dict):
+    """
+    Writes the merged data to AnnexA_merged.xlsx. Date fields stay as datetime64 until this point and are only
+    formatted as dates, without a time, as they are written
+    """
     output_path = Path(output, f"AnnexA_merged.xlsx")
-    with pd.ExcelWriter(output_path) as writer:
+    with pd.ExcelWriter(
+        output_path, date_format="YYYY-MM-DD", datetime_format="YYYY-MM-DD"
+    ) as writer:
         for k in aa_dict.keys():
             df = aa_dict[k]
             df.to_excel(writer, sheet_name=k, index=False)
+
+
+def save_store(output, aa_dict):
+    """Writes the merged data to the LA's merged data store, one file per List, replacing only the Lists given"""
+    write_store(Path(output, "AnnexA_merged"), aa_dict)
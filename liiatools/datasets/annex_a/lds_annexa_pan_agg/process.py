@@ -1,12 +1,23 @@
 import logging
+import os
+import shutil
 import pandas as pd
 from pathlib import Path
 
+from liiatools.datasets.shared_functions.process import la_partitions
+from liiatools.datasets.shared_functions.store import (
+    natural_key,
+    read_store,
+    write_store,
+)
+
 log = logging.getLogger(__name__)
 
 
 def split_file(input):
-    """Reads merged LA xlsx file as dictionary of dataframes"""
+    """Reads merged LA xlsx file, or merged LA data store directory, as dictionary of dataframes"""
+    if Path(input).is_dir():
+        return read_store(input)
     pan_dict = pd.read_excel(input, sheet_name=None, index_col=None, dtype=object)
     return pan_dict
 
@@ -23,27 +34,54 @@ def data_minimisation(pan_dict, minimise):
     return pan_dict
 
 
-def _merge_dfs(pan_dict, old_dict, la_name):
-    """Deletes existing data for new LA from pan file
-    Merges new LA data to pan file"""
-    for k in pan_dict.keys():
-        new_df = pan_dict[k]
-        old_df = old_dict[k]
-        old_df = old_df.drop(old_df[old_df["LA"] == la_name].index)
-        merged_df = pd.concat([new_df, old_df], axis=0, ignore_index=True)
-        pan_dict[k] = merged_df
-    return pan_dict
+def _pan_store_dir(output):
+    return Path(output, "pan_London_Annex_A")
 
 
-def merge_agg_files(output, pan_dict, la_name):
-    """Checks if pan file exists
-    Passes old and new file to function to be merged"""
+def save_la_partitions(output, pan_dict, la_name, dates=None):
+    """Writes the new LA data to the pan-London data store, which holds one partition per List and LA, so only
+    this LA's partitions are replaced
+    If there is no store yet but there is a pan file, the pan file is first split into a partition per List and
+    LA, with any rows without an LA kept in a partition of their own, and its date fields converted to datetimes
+    if dates are given"""
+    store_dir = _pan_store_dir(output)
     output_file = Path(output, f"pan_London_Annex_A.xlsx")
-    if output_file.is_file():
+    if not store_dir.is_dir() and output_file.is_file():
+        temp_dir = Path(output, f"{store_dir.name}.tmp")
+        shutil.rmtree(temp_dir, ignore_errors=True)
         old_dict = pd.read_excel(
             output_file, sheet_name=None, index_col=None, dtype=object
         )
-        _merge_dfs(pan_dict, old_dict, la_name)
+        if dates is not None:
+            old_dict = convert_datetimes(old_dict, dates=dates)
+        for k, old_df in old_dict.items():
+            write_store(Path(temp_dir, k), la_partitions(old_df))
+        os.replace(temp_dir, store_dir)
+    for k, df in pan_dict.items():
+        write_store(Path(store_dir, k), {la_name: df.reset_index(drop=True)})
+
+
+def read_pan_store(output):
+    """Reads the pan-London data store as dictionary of dataframes, one per List, with the LAs of each List in
+    alphabetical order"""
+    store_dir = _pan_store_dir(output)
+    pan_dict = {}
+    list_dirs = [d for d in store_dir.iterdir() if d.is_dir()]
+    for list_dir in sorted(list_dirs, key=lambda d: natural_key(d.name)):
+        partitions = read_store(list_dir)
+        if partitions:
+            pan_dict[list_dir.name] = pd.concat(
+                partitions.values(), axis=0, ignore_index=True
+            )
+    return pan_dict
+
+
+def convert_datetimes(pan_dict, dates):
+    for k in pan_dict.keys():
+        df = pan_dict[k]
+        for date_field in dates[k]:
+            df[date_field] = pd.to_datetime(df[date_field], format="%d/%m/%Y")
+        pan_dict[k] = df
     return pan_dict
 
 
@@ -82,14 +82,30 @@ def cleanfile(input, la_code, la_log_dir, output):
     type=str,
     help="A string specifying the output directory location",
 )
-def la_agg(input, output):
+@click.option(
+    "--incremental",
+    is_flag=True,
+    default=False,
+    help="Merge the file into the merged data store kept in the output directory, only comparing the new records with the existing ones",
+)
+@click.option(
+    "--chunksize",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Read and merge the existing merged file this number of records at a time, to limit memory use. Cannot be used with --incremental",
+)
+def la_agg(input, output, incremental, chunksize):
     """
     Joins data from newly cleaned S251 file (output of cleanfile()) to existing S251 data for the depositing local authority
     :param input: should specify the input file location, including file name and suffix, and be usable by a Path function
     :param output: should specify the path to the output folder
+    :param incremental: if True the file is merged into the LA's store of the merged file, comparing only the new records with an index of the existing ones
+    :param chunksize: if given the existing merged file is read and merged this number of records at a time
     :return: None
     """
-    s251_main_functions.la_agg(input, output)
+    s251_main_functions.la_agg(
+        input, output, incremental=incremental, chunksize=chunksize
+    )
 
 
 @s251.command()
@@ -113,12 +129,28 @@ def la_agg(input, output):
     type=str,
     help="A string specifying the output directory location",
 )
-def pan_agg(input, la_code, output):
+@click.option(
+    "--no_csv",
+    is_flag=True,
+    default=False,
+    help="Only update the local authority's partition of the pan-London data store, without writing the csv file",
+)
+@click.option(
+    "--chunksize",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Read and write the pan-London data this number of records, or one LA, at a time, to limit memory use",
+)
+def pan_agg(input, la_code, output, no_csv, chunksize):
     """
     Joins data from newly merged S251 file (output of la-agg()) to existing pan-London S251 data
     :param input: should specify the input file location, including file name and suffix, and be usable by a Path function
     :param la_code: should be a three-letter string for the local authority depositing the file
     :param output: should specify the path to the output folder
+    :param no_csv: if True only the LA's partition of the pan-London data store is updated and the pan-London csv file is not written
+    :param chunksize: if given the pan-London data is read and written this number of records, or one LA, at a time
     :return: None
     """
-    s251_main_functions.pan_agg(input, la_code, output)
+    s251_main_functions.pan_agg(
+        input, la_code, output, no_csv=no_csv, chunksize=chunksize
+    )
@@ -107,69 +107,139 @@ def cleanfile(input: str, la_code: str, la_log_dir: str, output: str):
     list(stream)
 
 
-def la_agg(input: str, output: str):
+def la_agg(input: str, output: str, incremental: bool = False, chunksize: int = None):
     """
     Joins data from newly cleaned S251 file (output of cleanfile()) to existing S251 data for the depositing local
     authority
     :param input: should specify the input file location, including file name and suffix, and be usable by a Path
     function
     :param output: should specify the path to the output folder
+    :param incremental: if True the file is merged into the LA's store of the merged file, comparing only the new
+    records with an index of the existing ones
+    :param chunksize: if given the existing merged file is read and merged this number of records at a time, rather
+    than all at once
     :return: None
     """
+    if incremental and chunksize:
+        raise ValueError("la_agg cannot be run both incrementally and in chunks")
 
     # Configuration
     config = agg_config.Config()
 
-    # Open file as DataFrame and match file type
-    s251_df = common_process.read_file(input)
+    # Match file type and open file as DataFrame
     table_names = config["table_name"]
-    table_name = common_process.match_load_file(s251_df, table_names)
-
-    # Merge file with existing file of the same type in LA output folder
-    s251_df = common_process.merge_la_files(
-        output, s251_df, table_name, filename="S251"
+    table_name = common_process.match_load_file(
+        common_process.read_header(input), table_names
     )
-
-    # De-duplicate and remove old data according to schema
+    dtypes = config["dtypes"]
     dates = config["dates"]
-    s251_df = common_process.convert_datetimes(s251_df, dates, table_name)
+    s251_df = common_process.read_file(input, table_name, dtypes=dtypes, dates=dates)
+
     sort_order = config["sort_order"]
     dedup = config["dedup"]
-    s251_df = common_process.deduplicate(s251_df, table_name, sort_order, dedup)
-    s251_df = common_process.remove_old_data(
-        s251_df,
+    earliest_year = common_process.earliest_allowed_year(
         num_of_years=YEARS_TO_GO_BACK,
         new_year_start_month=YEAR_START_MONTH,
         as_at_date=REFERENCE_DATE,
-        year_column="Year",
     )
+    if chunksize:
+        # Merge, de-duplicate, remove old data and export a chunk of the existing merged file at a time
+        common_process.merge_la_chunked(
+            output,
+            s251_df,
+            table_name,
+            filename="S251",
+            sort_order=sort_order,
+            dedup=dedup,
+            year_column="Year",
+            earliest_year=earliest_year,
+            chunksize=chunksize,
+            dtypes=dtypes,
+            dates=dates,
+        )
+        return
+    elif incremental:
+        # Merge file into the LA's store of the merged file, de-duplicating and removing old data as it goes
+        s251_df = common_process.merge_la_store(
+            output,
+            s251_df,
+            table_name,
+            filename="S251",
+            sort_order=sort_order,
+            dedup=dedup,
+            year_column="Year",
+            earliest_year=earliest_year,
+            dtypes=dtypes,
+            dates=dates,
+        )
+    else:
+        # Merge file with existing file of the same type in LA output folder
+        s251_df = common_process.merge_la_files(
+            output, s251_df, table_name, filename="S251", dtypes=dtypes, dates=dates
+        )
+
+        # De-duplicate and remove old data according to schema
+        s251_df = common_process.convert_datetimes(s251_df, dates, table_name)
+        s251_df = common_process.deduplicate(s251_df, table_name, sort_order, dedup)
+        s251_df = common_process.remove_old_data(
+            s251_df,
+            num_of_years=YEARS_TO_GO_BACK,
+            new_year_start_month=YEAR_START_MONTH,
+            as_at_date=REFERENCE_DATE,
+            year_column="Year",
+        )
 
     # If file still has data, after removing old data: re-format and export merged file
     if len(s251_df) > 0:
         s251_df = common_process.convert_dates(s251_df, dates, table_name)
         common_process.export_la_file(output, table_name, s251_df, filename="S251")
+        if incremental:
+            common_process.mark_la_store(output, table_name, filename="S251")
 
 
-def pan_agg(input: str, la_code: str, output: str):
+def pan_agg(
+    input: str,
+    la_code: str,
+    output: str,
+    no_csv: bool = False,
+    chunksize: int = None,
+):
     """
     Joins data from newly merged S251 file (output of la-agg()) to existing pan-London S251 data
     :param input: should specify the input file location, including file name and suffix, and be usable by a Path function
     :param la_code: should be a three-letter string for the local authority depositing the file
     :param output: should specify the path to the output folder
+    :param no_csv: if True only the LA's partition of the pan-London data store is updated and the pan-London csv file is not written
+    :param chunksize: if given the pan-London data is read and written this number of records, or one LA, at a time, rather than all at once
     :return: None
     """
 
     # Configuration
     config = pan_config.Config()
 
-    # Read file and match type
-    s251_df = common_process.read_file(input)
+    # Match file type and read file
     table_names = config["table_name"]
-    table_name = common_process.match_load_file(s251_df, table_names)
+    table_name = common_process.match_load_file(
+        common_process.read_header(input), table_names
+    )
+    dtypes = config["dtypes"]
+    dates = config["dates"]
+    s251_df = common_process.read_file(input, table_name, dtypes=dtypes, dates=dates)
 
     # Remove unwanted datasets and merge wanted with existing output
     la_name = common.flip_dict(config["data_codes"])[la_code]
-    s251_df = common_process.merge_agg_files(
-        output, table_name, s251_df, la_name, filename="S251"
+    common_process.save_la_partition(
+        output,
+        table_name,
+        s251_df,
+        la_name,
+        filename="S251",
+        dtypes=dtypes,
+        dates=dates,
+        chunksize=chunksize,
     )
-    common_process.export_pan_file(output, table_name, s251_df, filename="S251")
+    if not no_csv and chunksize:
+        common_process.export_pan_store(output, table_name, filename="S251")
+    elif not no_csv:
+        s251_df = common_process.read_pan_store(output, table_name, filename="S251")
+        common_process.export_pan_file(output, table_name, s251_df, filename="S251")
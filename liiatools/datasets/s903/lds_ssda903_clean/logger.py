@@ -1,4 +1,3 @@
-from collections import Counter
 from datetime import datetime
 import logging
 import os
@@ -13,6 +12,11 @@ from liiatools.datasets.shared_functions.logger import (
     ErrorTable,
     create_below_zero_error_list,
     create_file_match_error,
+    csv_row_number,
+    ErrorCounter,
+    format_error_counts,
+    error_counts_record,
+    LogSink,
 )
 
 log = logging.getLogger(__name__)
@@ -20,7 +24,7 @@ log = logging.getLogger(__name__)
 
 def create_formatting_error_list(stream):
     """
-    Create a list of the column headers for cells with formatting errors (event.error = 1) for each table
+    Count the column headers of cells with formatting errors (event.error = 1) for each table
 
     :param stream: A filtered list of event objects
     :return: An updated list of event objects with error counts
@@ -29,7 +33,7 @@ def create_formatting_error_list(stream):
     table_name = None
     for event in stream:
         if isinstance(event, events.StartTable):
-            formatting_error_list = []
+            formatting_error_list = ErrorCounter()
             try:
                 table_name = event.table_name
             except AttributeError:
@@ -48,7 +52,7 @@ def create_formatting_error_list(stream):
         ):
             try:
                 if event.formatting_error == "1":
-                    formatting_error_list.append(event.header)
+                    formatting_error_list.add(event.header, row=csv_row_number(event))
             except AttributeError:
                 pass
         yield event
@@ -84,86 +88,83 @@ def create_extra_column_error(event):
 def save_errors_la(stream, la_log_dir):
     """
     Count the error events and save them as a text file in the Local Authority Logs directory
-    only save the error events if there is at least one error in said event
+    only save the error events if there is at least one error in said event. The log entries are buffered and
+    written once the whole file has been read, or if processing stops early
 
     :param stream: A filtered list of event objects
     :param la_log_dir: Location to save the gathered error logs
     :return: An updated list of event objects
     """
     start_time = f"{datetime.now():%Y-%m-%dT%H%M%SZ}"
-    for event in stream:
-        try:
-            if isinstance(event, ErrorTable) and (
-                event.formatting_error_list is not None
-                and event.blank_error_list is not None
-                and event.below_zero_error_list is not None
-                and event.table_name is not None
-            ):
-                if (
-                    event.formatting_error_list
-                    or event.blank_error_list
-                    or event.below_zero_error_list
+    sink = LogSink()
+    try:
+        for event in stream:
+            try:
+                if isinstance(event, ErrorTable) and (
+                    event.formatting_error_list is not None
+                    and event.blank_error_list is not None
+                    and event.below_zero_error_list is not None
+                    and event.table_name is not None
                 ):
-                    with open(
-                        f"{os.path.join(la_log_dir, event.filename)}_error_log_{start_time}.txt",
-                        "a",
-                    ) as f:
-                        f.write(event.table_name)
-                        f.write("\n")
+                    if (
+                        event.formatting_error_list
+                        or event.blank_error_list
+                        or event.below_zero_error_list
+                    ):
+                        text = [event.table_name]
+                        record = {"filename": event.filename, "table": event.table_name}
                         if event.formatting_error_list:
-                            f.write(
+                            text.append(
                                 "Number of cells that have been made blank "
                                 "because they could not be formatted correctly"
                             )
-                            f.write("\n")
-                            counter_dict = Counter(event.formatting_error_list)
-                            f.write(
-                                str(counter_dict)[9:-2]
-                            )  # Remove "Counter({" and "})" from string
-                            f.write("\n")
+                            text.append(
+                                format_error_counts(event.formatting_error_list)
+                            )
+                            record["formatting_error"] = error_counts_record(
+                                event.formatting_error_list
+                            )
                         if event.blank_error_list:
-                            f.write(
+                            text.append(
                                 "Number of blank cells that should have contained data"
                             )
-                            f.write("\n")
-                            blank_counter_dict = Counter(event.blank_error_list)
-                            f.write(
-                                str(blank_counter_dict)[9:-2]
-                            )  # Remove "Counter({" and "})" from string
-                            f.write("\n")
+                            text.append(format_error_counts(event.blank_error_list))
+                            record["blank_error"] = error_counts_record(
+                                event.blank_error_list
+                            )
                         if event.below_zero_error_list:
-                            f.write(
+                            text.append(
                                 "Number of cells that have been made blank because they contained values below 0"
                             )
-                            f.write("\n")
-                            below_zero_counter_dict = Counter(
+                            text.append(
+                                format_error_counts(event.below_zero_error_list)
+                            )
+                            record["below_zero_error"] = error_counts_record(
                                 event.below_zero_error_list
                             )
-                            f.write(
-                                str(below_zero_counter_dict)[9:-2]
-                            )  # Remove "Counter({" and "})" from string
-                            f.write("\n")
-        except AttributeError:
-            pass
+                        sink.write(
+                            f"{os.path.join(la_log_dir, event.filename)}_error_log_{start_time}.txt",
+                            "\n".join(text) + "\n",
+                            record=record,
+                        )
+            except AttributeError:
+                pass
 
-        if isinstance(event, events.StartTable):
-            match_error = getattr(event, "match_error", None)
-            if match_error:
-                with open(
-                    f"{os.path.join(la_log_dir, event.filename)}_error_log_{start_time}.txt",
-                    "a",
-                ) as f:
-                    f.write(match_error)
-                    f.write("\n")
-            column_error = getattr(event, "extra_column_error", None)
-            if column_error:
-                with open(
-                    f"{os.path.join(la_log_dir, event.filename)}_error_log_{start_time}.txt",
-                    "a",
-                ) as f:
-                    f.write(column_error)
-                    f.write("\n")
-        yield event
+            if isinstance(event, events.StartTable):
+                for error_name in ["match_error", "extra_column_error"]:
+                    error = getattr(event, error_name, None)
+                    if error:
+                        sink.write(
+                            f"{os.path.join(la_log_dir, event.filename)}_error_log_{start_time}.txt",
+                            f"{error}\n",
+                            record={"filename": event.filename, error_name: error},
+                        )
+
+            if isinstance(event, events.EndContainer):
+                sink.flush()
+            yield event
+    finally:
+        sink.flush()
 
 
 def log_errors(stream):
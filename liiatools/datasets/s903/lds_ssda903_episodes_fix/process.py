@@ -1,30 +1,33 @@
-from datetime import datetime, timedelta
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from itertools import repeat
+
 import numpy as np
 import pandas as pd
 
-__COLUMNS = [
+log = logging.getLogger(__name__)
+
+# Columns of the previous and next episodes read by the stage 1 and stage 2 rules
+__STAGE1_COLUMNS = [
     "DECOM",
     "RNE",
     "LS",
-    "CIN",
     "PLACE",
     "PLACE_PROVIDER",
-    "DEC",
-    "REC",
-    "REASON_PLACE_CHANGE",
-    "HOME_POST",
     "PL_POST",
     "URN",
     "YEAR",
 ]
 
+__STAGE2_COLUMNS = [
+    "DECOM",
+    "YEAR",
+]
+
 __DATES = [
     "DECOM",
     "DEC",
-    "DECOM_previous",
-    "DEC_previous",
-    "DECOM_next",
-    "DEC_next",
 ]
 
 __COLUMNS_TO_KEEP = [
@@ -52,49 +55,68 @@ def create_previous_and_next_episode(
     dataframe: pd.DataFrame, columns: list
 ) -> pd.DataFrame:
     """
-    Add previous and next episode information to each line of a dataframe
+    Add previous and next episode information to each line of a dataframe, sorted by CHILD. The previous and
+    next values keep the type of their column, and are null where the previous or next episode belongs to
+    another child
 
     :param dataframe: Dataframe with SSDA903 Episodes data
     :param columns: List of columns containing required data from previous/next episodes
     :return: Dataframe with columns showing previous and next episodes
     """
+    same_child_as_previous = dataframe["CHILD"].eq(dataframe["CHILD"].shift(1))
+    same_child_as_next = dataframe["CHILD"].eq(dataframe["CHILD"].shift(-1))
     for column in columns:
-        dataframe[column + "_previous"] = np.where(
-            dataframe["CHILD"] == dataframe["CHILD"].shift(1),
-            dataframe[column].shift(1),
-            None,
+        dataframe[column + "_previous"] = (
+            dataframe[column].shift(1).where(same_child_as_previous)
         )
-        dataframe[column + "_next"] = np.where(
-            dataframe["CHILD"] == dataframe["CHILD"].shift(-1),
-            dataframe[column].shift(-1),
-            None,
+        dataframe[column + "_next"] = (
+            dataframe[column].shift(-1).where(same_child_as_next)
         )
     return dataframe
 
 
 def format_datetime(dataframe: pd.DataFrame, date_columns: list) -> pd.DataFrame:
     """
-    Format date columns to datetime type
+    Format date columns to datetime type. Columns that are already datetime are left as they are
 
     :param dataframe: Dataframe with SSDA903 Episodes data
     :param date_columns: List of columns containing dates
     :return: Dataframe with date columns showing as datetime data type
     """
-    dataframe[date_columns] = dataframe[date_columns].apply(
-        pd.to_datetime, format="%Y-%m-%d", errors="raise"
-    )
+    for column in date_columns:
+        if not pd.api.types.is_datetime64_any_dtype(dataframe[column]):
+            dataframe[column] = pd.to_datetime(
+                dataframe[column], format="%Y-%m-%d", errors="raise"
+            )
     return dataframe
 
 
-def add_latest_year_and_source_for_la(dataframe: pd.DataFrame) -> pd.DataFrame:
+def latest_year_for_la(dataframe: pd.DataFrame) -> pd.Series:
+    """
+    Find the latest submission year for each LA
+
+    :param dataframe: Dataframe with SSDA903 Episodes data
+    :return: Series of latest submission year, indexed by LA
+    """
+    return dataframe.groupby("LA")["YEAR"].max()
+
+
+def add_latest_year_and_source_for_la(
+    dataframe: pd.DataFrame, year_latest: pd.Series = None
+) -> pd.DataFrame:
     """
     Add column to containing latest submission year and source for each LA
 
     :param dataframe: Dataframe with SSDA903 Episodes data
+    :param year_latest: Optional latest submission year for each LA, from latest_year_for_la, for when the
+        dataframe only holds some of the children in the dataset
     :return: Dataframe with column showing latest submission year for each LA and column showing episode source
     """
     source_for_episode_row = "Original"
-    dataframe["YEAR_latest"] = dataframe.groupby("LA")["YEAR"].transform("max")
+    if year_latest is None:
+        dataframe["YEAR_latest"] = dataframe.groupby("LA")["YEAR"].transform("max")
+    else:
+        dataframe["YEAR_latest"] = dataframe["LA"].map(year_latest)
     dataframe["Episode_source"] = source_for_episode_row
     return dataframe
 
@@ -106,23 +128,21 @@ def add_stage1_rule_identifier_columns(dataframe: pd.DataFrame) -> pd.DataFrame:
     :param dataframe: Dataframe with SSDA903 Episodes data
     :return: Dataframe with columns showing true if certain conditions are met
     """
-    dataframe = dataframe.assign(
-        Has_open_episode_error=lambda row: (row.DEC.isnull())
-        & (row.YEAR != row.YEAR_latest)
+    dataframe["Has_open_episode_error"] = dataframe["DEC"].isnull() & (
+        dataframe["YEAR"] != dataframe["YEAR_latest"]
     )
     dataframe["Has_next_episode"] = dataframe["DECOM_next"].notnull()
     dataframe["Has_previous_episode"] = dataframe["DECOM_previous"].notnull()
-    dataframe = dataframe.assign(
-        Has_next_episode_with_RNE_equals_S=lambda row: (row.Has_next_episode)
-        & (row.RNE_next == "S")
-    )
-    dataframe = dataframe.assign(Next_episode_is_duplicate=_is_next_episode_duplicate)
-    dataframe = dataframe.assign(
-        Previous_episode_is_duplicate=_is_previous_episode_duplicate
+    dataframe["Has_next_episode_with_RNE_equals_S"] = dataframe["Has_next_episode"] & (
+        dataframe["RNE_next"] == "S"
     )
-    dataframe = dataframe.assign(
-        Previous_episode_submitted_later=_is_previous_episode_submitted_later
+    dataframe["Next_episode_is_duplicate"] = _is_next_episode_duplicate(dataframe)
+    dataframe["Previous_episode_is_duplicate"] = _is_previous_episode_duplicate(
+        dataframe
     )
+    dataframe[
+        "Previous_episode_submitted_later"
+    ] = _is_previous_episode_submitted_later(dataframe)
     return dataframe
 
 
@@ -201,23 +221,45 @@ def _is_previous_episode_submitted_later(row: pd.Series) -> bool:
     )
 
 
-def _stage1_rule_to_apply(row: pd.Series) -> str:
+def _is_true(values: pd.Series) -> pd.Series:
     """
-    Determine which Stage 1 rule should be applied
+    Convert a column of flags, which may contain nulls, to booleans. Nulls count as False
 
-    :param row: Row from dataframe with SSDA903 Episodes data
-    :return: Name of rule to be applied or None if not applicable
+    :param values: Dataframe column of flags
+    :return: Boolean column, True where the flag is truthy
+    """
+    return values.fillna(False).astype(bool)
+
+
+def _stage1_rule_to_apply(dataframe: pd.DataFrame) -> pd.Series:
     """
-    if row["Has_open_episode_error"]:
-        if row["Next_episode_is_duplicate"] | row["Previous_episode_is_duplicate"]:
-            return "RULE_3"  # Duplicate
-        if row["Previous_episode_submitted_later"]:
-            return "RULE_3A"  # Episode replaced in later submission
-        if row["Has_next_episode"] is False:
-            return "RULE_2"  # Ceases LAC
-        if row["Has_next_episode_with_RNE_equals_S"]:
-            return "RULE_1A"  # Ceases LAC, but re-enters care later
-        return "RULE_1"  # Remains LAC, episode changes
+    Determine which Stage 1 rule should be applied to each row
+
+    :param dataframe: Dataframe with SSDA903 Episodes data
+    :return: Column with the name of the rule to be applied or None if not applicable
+    """
+    has_open_episode_error = _is_true(dataframe["Has_open_episode_error"])
+    conditions = [
+        _is_true(dataframe["Next_episode_is_duplicate"])
+        | _is_true(dataframe["Previous_episode_is_duplicate"]),
+        _is_true(dataframe["Previous_episode_submitted_later"]),
+        dataframe["Has_next_episode"].eq(False),
+        _is_true(dataframe["Has_next_episode_with_RNE_equals_S"]),
+        has_open_episode_error,
+    ]
+    choices = [
+        "RULE_3",  # Duplicate
+        "RULE_3A",  # Episode replaced in later submission
+        "RULE_2",  # Ceases LAC
+        "RULE_1A",  # Ceases LAC, but re-enters care later
+        "RULE_1",  # Remains LAC, episode changes
+    ]
+    rule_to_apply = np.select(
+        [has_open_episode_error & condition for condition in conditions],
+        choices,
+        default=None,
+    )
+    return pd.Series(rule_to_apply, index=dataframe.index, dtype=object)
 
 
 def identify_stage1_rule_to_apply(dataframe: pd.DataFrame) -> pd.DataFrame:
@@ -232,69 +274,89 @@ def identify_stage1_rule_to_apply(dataframe: pd.DataFrame) -> pd.DataFrame:
     :param dataframe: Dataframe with SSDA903 Episodes data
     :return: Dataframe with column showing stage 1 rule to be applied
     """
-    dataframe["Rule_to_apply"] = dataframe.apply(_stage1_rule_to_apply, axis=1)
+    dataframe["Rule_to_apply"] = _stage1_rule_to_apply(dataframe)
     return dataframe
 
 
-def _update_dec_stage1(row: pd.Series) -> datetime:
+def _stage1_rule_applies(dataframe: pd.DataFrame, rules: list) -> pd.Series:
     """
-    Determine updated DEC value. Defaults to input DEC if no rule to apply
+    Identify rows with an open episode error and one of the given stage 1 rules to apply
 
-    :param row: Row from dataframe with SSDA903 Episodes data
-    :return: Updated DEC date
+    :param dataframe: Dataframe with SSDA903 Episodes data
+    :param rules: List of rule names
+    :return: Boolean column, True where one of the rules applies
     """
-    end_of_year = datetime(row["YEAR"], 3, 31)
-    if row["Has_open_episode_error"]:
-        if row["Rule_to_apply"] == "RULE_1":
-            return row["DECOM_next"]
-        if row["Rule_to_apply"] == "RULE_1A":
-            day_before_next_decom = row["DECOM_next"] - timedelta(days=1)
-            return min(end_of_year, day_before_next_decom)  # get earliest date
-        if row["Rule_to_apply"] == "RULE_2":
-            return end_of_year
-    return row["DEC"]
+    return _is_true(dataframe["Has_open_episode_error"]) & dataframe[
+        "Rule_to_apply"
+    ].isin(rules)
 
 
-def _update_rec_stage1(row: pd.Series) -> str:
+def _update_dec_stage1(dataframe: pd.DataFrame) -> pd.Series:
     """
-    Determine updated REC value. Defaults to input REC if no rule to apply
+    Determine updated DEC values. Defaults to input DEC if no rule to apply
 
-    :param row: Row from dataframe with SSDA903 Episodes data
-    :return: Updated REC value or the original value if no rule to apply
+    :param dataframe: Dataframe with SSDA903 Episodes data
+    :return: Column of updated DEC dates
     """
-    if row["Has_open_episode_error"]:
-        if row["Rule_to_apply"] == "RULE_1":
-            return "X1"
-        if row["Rule_to_apply"] in ("RULE_1A", "RULE_2"):
-            return "E99"
-    return row["REC"]
+    end_of_year = pd.to_datetime(
+        pd.DataFrame({"year": dataframe["YEAR"], "month": 3, "day": 31})
+    )
+    day_before_next_decom = dataframe["DECOM_next"] - timedelta(days=1)
+    earliest_date = end_of_year.where(
+        end_of_year <= day_before_next_decom, day_before_next_decom
+    )
+    dec = dataframe["DEC"].copy()
+    for rule, updated_dec in [
+        ("RULE_1", dataframe["DECOM_next"]),
+        ("RULE_1A", earliest_date),
+        ("RULE_2", end_of_year),
+    ]:
+        rule_applies = _stage1_rule_applies(dataframe, [rule])
+        dec[rule_applies] = updated_dec[rule_applies]
+    return dec
 
 
-def _update_reason_place_change_stage1(row: pd.Series) -> str:
+def _update_rec_stage1(dataframe: pd.DataFrame) -> pd.Series:
     """
-    Determine updated REASON_PLACE_CHANGE value. Defaults to input value if no rule to apply
+    Determine updated REC values. Defaults to input REC if no rule to apply
 
-    :param row: Row from dataframe with SSDA903 Episodes data
-    :return: Updated REASON_PLACE_CHANGE value or the original value if no rule to apply
+    :param dataframe: Dataframe with SSDA903 Episodes data
+    :return: Column of updated REC values or the original values if no rule to apply
+    """
+    rec = np.select(
+        [
+            _stage1_rule_applies(dataframe, ["RULE_1"]),
+            _stage1_rule_applies(dataframe, ["RULE_1A", "RULE_2"]),
+        ],
+        ["X1", "E99"],
+        default=dataframe["REC"].to_numpy(dtype=object),
+    )
+    return pd.Series(rec, index=dataframe.index, dtype=object)
+
+
+def _update_reason_place_change_stage1(dataframe: pd.DataFrame) -> pd.Series:
+    """
+    Determine updated REASON_PLACE_CHANGE values. Defaults to input value if no rule to apply
+
+    :param dataframe: Dataframe with SSDA903 Episodes data
+    :return: Column of updated REASON_PLACE_CHANGE values or the original values if no rule to apply
     """
-    if row["Has_open_episode_error"]:
-        if (row["Rule_to_apply"] == "RULE_1") & (
-            row["RNE_next"] in ("P", "B", "T", "U")
-        ):
-            return "LIIAF"
-    return row["REASON_PLACE_CHANGE"]
+    rule_applies = _stage1_rule_applies(dataframe, ["RULE_1"]) & dataframe[
+        "RNE_next"
+    ].isin(["P", "B", "T", "U"])
+    return dataframe["REASON_PLACE_CHANGE"].mask(rule_applies, "LIIAF")
 
 
-def _update_episode_source_stage1(row: pd.Series) -> str:
+def _update_episode_source_stage1(dataframe: pd.DataFrame) -> pd.Series:
     """
-    Determine updated Episode_source value. Defaults to input value if no rule to apply
+    Determine updated Episode_source values. Defaults to input value if no rule to apply
 
-    :param row: Row from dataframe with SSDA903 Episodes data
-    :return: Updated Episode_source value or the original value if no rule to apply
+    :param dataframe: Dataframe with SSDA903 Episodes data
+    :return: Column of updated Episode_source values or the original values if no rule to apply
     """
-    if row["Has_open_episode_error"]:
-        return row["Rule_to_apply"]
-    return row["Episode_source"]
+    return dataframe["Episode_source"].mask(
+        _is_true(dataframe["Has_open_episode_error"]), dataframe["Rule_to_apply"]
+    )
 
 
 def apply_stage1_rules(dataframe: pd.DataFrame) -> pd.DataFrame:
@@ -307,68 +369,92 @@ def apply_stage1_rules(dataframe: pd.DataFrame) -> pd.DataFrame:
     RULE_3A: Episode replaced in later submission - delete
 
     :param dataframe: Dataframe with SSDA903 Episodes data
-    :return: Dataframe with stage 1 rules applied
+    :return: Dataframe with stage 1 rules applied, keeping only the columns needed for stage 2
     """
-    # Apply rules 3, 3A to delete rows
-    episodes_to_delete = dataframe["Rule_to_apply"].isin(["RULE_3", "RULE_3A"])
-    dataframe = dataframe.drop(dataframe[episodes_to_delete].index)
-
     # Apply rules 1, 1A, 2
-    dataframe["DEC"] = dataframe.apply(_update_dec_stage1, axis=1)
-    dataframe["REC"] = dataframe.apply(_update_rec_stage1, axis=1)
-    dataframe["REASON_PLACE_CHANGE"] = dataframe.apply(
-        _update_reason_place_change_stage1, axis=1
-    )
-    dataframe["Episode_source"] = dataframe.apply(_update_episode_source_stage1, axis=1)
+    dataframe["DEC"] = _update_dec_stage1(dataframe)
+    dataframe["REC"] = _update_rec_stage1(dataframe)
+    dataframe["REASON_PLACE_CHANGE"] = _update_reason_place_change_stage1(dataframe)
+    dataframe["Episode_source"] = _update_episode_source_stage1(dataframe)
 
-    return dataframe
+    # Apply rules 3, 3A to delete rows. The columns that are not needed for stage 2 are deleted first so
+    # they are not copied
+    episodes_to_keep = ~dataframe["Rule_to_apply"].isin(["RULE_3", "RULE_3A"])
+    for column in dataframe.columns.difference(__COLUMNS_TO_KEEP):
+        del dataframe[column]
+    return dataframe.loc[episodes_to_keep, __COLUMNS_TO_KEEP]
 
 
-def _overlaps_next_episode(row: pd.Series) -> bool:
-    if row["Has_next_episode"]:
-        return (row.YEAR < row.YEAR_next) & (row.DEC > row.DECOM_next)
-    return False
+def _submitted_before_next_episode(dataframe: pd.DataFrame) -> pd.Series:
+    """
+    Identify rows with a next episode that was submitted in a later file YEAR
 
+    :param dataframe: Dataframe with SSDA903 Episodes data
+    :return: Boolean column, True where the next episode was submitted later
+    """
+    return _is_true(dataframe["Has_next_episode"]) & (
+        pd.to_numeric(dataframe["YEAR"]) < pd.to_numeric(dataframe["YEAR_next"])
+    )
 
-def _has_x1_gap_before_next_episode(row: pd.Series) -> bool:
-    if row["Has_next_episode"]:
-        return (
-            (row.YEAR < row.YEAR_next) & (row.DEC < row.DECOM_next) & (row.REC == "X1")
-        )
-    return False
+
+def _overlaps_next_episode(dataframe: pd.DataFrame) -> pd.Series:
+    return _submitted_before_next_episode(dataframe) & (
+        dataframe["DEC"] > dataframe["DECOM_next"]
+    )
 
 
-def _stage2_rule_to_apply(row: pd.Series) -> str:
-    if row["Overlaps_next_episode"]:
-        return "RULE_4"  # Overlaps next episode and next episode was submitted later
-    if row["Has_X1_gap_before_next_episode"]:
-        return "RULE_5"  # Ends before next episode but has reason "X1" - continuous and next ep was submitted later
+def _has_x1_gap_before_next_episode(dataframe: pd.DataFrame) -> pd.Series:
+    return (
+        _submitted_before_next_episode(dataframe)
+        & (dataframe["DEC"] < dataframe["DECOM_next"])
+        & (dataframe["REC"] == "X1")
+    )
+
+
+def _stage2_rule_to_apply(dataframe: pd.DataFrame) -> pd.Series:
+    rule_to_apply = np.select(
+        [
+            _is_true(dataframe["Overlaps_next_episode"]),
+            _is_true(dataframe["Has_X1_gap_before_next_episode"]),
+        ],
+        [
+            "RULE_4",  # Overlaps next episode and next episode was submitted later
+            "RULE_5",  # Ends before next episode but has reason "X1" - continuous and next ep was submitted later
+        ],
+        default=None,
+    )
+    return pd.Series(rule_to_apply, index=dataframe.index, dtype=object)
 
 
-def _update_dec_stage2(row: pd.Series) -> datetime:
+def _update_dec_stage2(dataframe: pd.DataFrame) -> pd.Series:
     """
-    Determine updated DEC value. Defaults to input DEC if no rule to apply
+    Determine updated DEC values. Defaults to input DEC if no rule to apply
 
-    :param row: Row from dataframe with SSDA903 Episodes data
-    :return: Updated DEC date
+    :param dataframe: Dataframe with SSDA903 Episodes data
+    :return: Column of updated DEC dates
     """
-    if (row["Rule_to_apply"] == "RULE_4") | (row["Rule_to_apply"] == "RULE_5"):
-        return row["DECOM_next"]
-    return row["DEC"]
+    rule_applies = dataframe["Rule_to_apply"].isin(["RULE_4", "RULE_5"])
+    return dataframe["DEC"].mask(rule_applies, dataframe["DECOM_next"])
 
 
-def _update_episode_source_stage2(row: pd.Series) -> str:
+def _update_episode_source_stage2(dataframe: pd.DataFrame) -> pd.Series:
     """
-    Determine updated Episode_source value. Defaults to input value if no rule to apply
+    Determine updated Episode_source values. Defaults to input value if no rule to apply
 
-    :param row: Row from dataframe with SSDA903 Episodes data
-    :return: Updated Episode_source value
-    """
-    if (row["Rule_to_apply"] == "RULE_4") | (row["Rule_to_apply"] == "RULE_5"):
-        if row["Episode_source"] == "Original":
-            return row["Rule_to_apply"]
-        return row["Episode_source"] + " | " + row["Rule_to_apply"]
-    return row["Episode_source"]
+    :param dataframe: Dataframe with SSDA903 Episodes data
+    :return: Column of updated Episode_source values
+    """
+    rule_applies = dataframe["Rule_to_apply"].isin(["RULE_4", "RULE_5"])
+    is_original = dataframe["Episode_source"] == "Original"
+    episode_source = np.select(
+        [rule_applies & is_original, rule_applies],
+        [
+            dataframe["Rule_to_apply"],
+            dataframe["Episode_source"] + " | " + dataframe["Rule_to_apply"],
+        ],
+        default=dataframe["Episode_source"].to_numpy(dtype=object),
+    )
+    return pd.Series(episode_source, index=dataframe.index, dtype=object)
 
 
 def add_stage2_rule_identifier_columns(dataframe: pd.DataFrame) -> pd.DataFrame:
@@ -379,9 +465,9 @@ def add_stage2_rule_identifier_columns(dataframe: pd.DataFrame) -> pd.DataFrame:
     :return: Dataframe with columns showing true if certain conditions are met
     """
     dataframe["Has_next_episode"] = dataframe["DECOM_next"].notnull()
-    dataframe["Overlaps_next_episode"] = dataframe.apply(_overlaps_next_episode, axis=1)
-    dataframe["Has_X1_gap_before_next_episode"] = dataframe.apply(
-        _has_x1_gap_before_next_episode, axis=1
+    dataframe["Overlaps_next_episode"] = _overlaps_next_episode(dataframe)
+    dataframe["Has_X1_gap_before_next_episode"] = _has_x1_gap_before_next_episode(
+        dataframe
     )
     return dataframe
 
@@ -395,8 +481,8 @@ def identify_stage2_rule_to_apply(dataframe: pd.DataFrame) -> pd.DataFrame:
     :param dataframe: Dataframe with SSDA903 Episodes data
     :return: Dataframe with column showing stage 2 rule to be applied
     """
-    dataframe["Rule_to_apply"] = dataframe.apply(_stage2_rule_to_apply, axis=1)
-    dataframe["Episode_source"] = dataframe.apply(_update_episode_source_stage2, axis=1)
+    dataframe["Rule_to_apply"] = _stage2_rule_to_apply(dataframe)
+    dataframe["Episode_source"] = _update_episode_source_stage2(dataframe)
     return dataframe
 
 
@@ -410,22 +496,26 @@ def apply_stage2_rules(dataframe: pd.DataFrame) -> pd.DataFrame:
     :return: Dataframe with stage 2 rules applied
     """
     # Apply rules 4, 5
-    dataframe["DEC"] = dataframe.apply(_update_dec_stage2, axis=1)
+    dataframe["DEC"] = _update_dec_stage2(dataframe)
     return dataframe
 
 
-def stage_1(s903_df: pd.DataFrame) -> pd.DataFrame:
+def stage_1(s903_df: pd.DataFrame, year_latest: pd.Series = None) -> pd.DataFrame:
     """
     Accept an s903 episodes dataframe and apply the stage 1 rules
 
     :param s903_df: Dataframe with SSDA903 Episodes data
+    :param year_latest: Optional latest submission year for each LA, for when s903_df only holds some of the
+        children in the dataset
     :return: Dataframe with stage 1 rules identified and applied
     """
     # Add columns to dataframe to identify which rules should be applied at stage 1
-    s903_df = s903_df.sort_values(["CHILD", "DECOM"], ignore_index=True)
-    s903_df_stage1 = create_previous_and_next_episode(s903_df, __COLUMNS)
+    s903_df_stage1 = s903_df.sort_values(["CHILD", "DECOM"], ignore_index=True)
     s903_df_stage1 = format_datetime(s903_df_stage1, __DATES)
-    s903_df_stage1 = add_latest_year_and_source_for_la(s903_df_stage1)
+    s903_df_stage1 = create_previous_and_next_episode(s903_df_stage1, __STAGE1_COLUMNS)
+    s903_df_stage1 = add_latest_year_and_source_for_la(
+        s903_df_stage1, year_latest=year_latest
+    )
     s903_df_stage1 = add_stage1_rule_identifier_columns(s903_df_stage1)
     s903_df_stage1 = identify_stage1_rule_to_apply(s903_df_stage1)
 
@@ -441,9 +531,9 @@ def stage_2(s903_df: pd.DataFrame) -> pd.DataFrame:
     :param s903_df: Dataframe with SSDA903 Episodes data
     :return: Dataframe with stage 2 rules identified and applied
     """
-    s903_df_stage2 = s903_df[__COLUMNS_TO_KEEP]
-    s903_df_stage2 = create_previous_and_next_episode(s903_df_stage2, __COLUMNS)
+    s903_df_stage2 = s903_df[__COLUMNS_TO_KEEP].copy()
     s903_df_stage2 = format_datetime(s903_df_stage2, __DATES)
+    s903_df_stage2 = create_previous_and_next_episode(s903_df_stage2, __STAGE2_COLUMNS)
     s903_df_stage2 = add_stage2_rule_identifier_columns(s903_df_stage2)
     s903_df_stage2 = identify_stage2_rule_to_apply(s903_df_stage2)
 
@@ -453,3 +543,163 @@ def stage_2(s903_df: pd.DataFrame) -> pd.DataFrame:
     s903_df_final = s903_df_stage2_applied[__COLUMNS_TO_KEEP]
     s903_df_final = s903_df_final.sort_values(["CHILD", "DECOM"], ignore_index=True)
     return s903_df_final
+
+
+def _fix_partition(s903_df: pd.DataFrame, year_latest: pd.Series) -> pd.DataFrame:
+    """
+    Apply the stage 1 and stage 2 rules to a partition of the children. Run in a worker process by fix_episodes
+
+    :param s903_df: Dataframe with the SSDA903 Episodes data of some of the children
+    :param year_latest: Latest submission year for each LA in the whole dataset
+    :return: Dataframe with stage 1 and stage 2 rules applied
+    """
+    return stage_2(stage_1(s903_df, year_latest=year_latest))
+
+
+def fix_episodes(
+    s903_df: pd.DataFrame, processes: int = 1, year_latest: pd.Series = None
+) -> pd.DataFrame:
+    """
+    Accept an s903 episodes dataframe and apply the stage 1 and stage 2 rules
+
+    The rules only compare each episode with the previous and next episodes of the same child, and the latest
+    submission year of the child's LA. With more than one process, the latest submission years are found from
+    the whole dataset first, then the children are split between the processes by a hash of CHILD and the
+    results put back together in CHILD and DECOM order, giving the same output as a single process
+
+    :param s903_df: Dataframe with SSDA903 Episodes data
+    :param processes: Number of worker processes to use
+    :param year_latest: Optional latest submission year for each LA, for when s903_df only holds some of the
+        children in the dataset
+    :return: Dataframe with stage 1 and stage 2 rules applied
+    """
+    if processes == 1:
+        return _fix_partition(s903_df, year_latest)
+
+    if year_latest is None:
+        year_latest = latest_year_for_la(s903_df)
+    partition = (
+        pd.util.hash_pandas_object(s903_df["CHILD"], index=False).to_numpy() % processes
+    )
+    partitions = [s903_df[partition == i] for i in range(processes)]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        fixed = pool.map(
+            _fix_partition,
+            [df for df in partitions if not df.empty],
+            repeat(year_latest),
+        )
+        s903_df_final = pd.concat(list(fixed))
+    return s903_df_final.sort_values(["CHILD", "DECOM"], ignore_index=True)
+
+
+def child_fingerprints(s903_df: pd.DataFrame) -> pd.Series:
+    """
+    Fingerprint the episodes of each child, so that children whose episodes have changed can be found. The
+    fingerprint depends on the order of each child's episodes as well as their values, as the fixes keep the
+    order of episodes with the same DECOM
+
+    :param s903_df: Dataframe with SSDA903 Episodes data
+    :return: Series of uint64 fingerprints, indexed by CHILD
+    """
+    row_hashes = pd.util.hash_pandas_object(s903_df, index=False).to_numpy()
+    codes, children = pd.factorize(s903_df["CHILD"])
+    # Episodes without a CHILD are fingerprinted together, as one missing CHILD
+    children = children.insert(len(children), np.nan)
+    codes = np.where(codes < 0, len(children) - 1, codes)
+    order = np.argsort(codes, kind="stable")
+    codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    position = np.arange(len(codes)) - np.repeat(
+        starts, np.diff(np.r_[starts, len(codes)])
+    )
+    episode_hashes = pd.util.hash_pandas_object(
+        pd.DataFrame({"row": row_hashes[order], "position": position}), index=False
+    ).to_numpy()
+    return pd.Series(
+        np.add.reduceat(episode_hashes, starts),
+        index=pd.Index(children[codes[starts]], name="CHILD"),
+        name="fingerprint",
+    )
+
+
+def changed_children(fingerprints: pd.Series, previous: pd.Series) -> pd.Index:
+    """
+    Find the children whose fingerprint is new or differs from their previous fingerprint
+
+    :param fingerprints: Fingerprints from child_fingerprints
+    :param previous: Earlier fingerprints from child_fingerprints
+    :return: Index of the changed children
+    """
+    unchanged = pd.MultiIndex.from_arrays(
+        [fingerprints.index, fingerprints.to_numpy()]
+    ).isin(pd.MultiIndex.from_arrays([previous.index, previous.to_numpy()]))
+    return fingerprints.index[~unchanged]
+
+
+def episodes_schema(s903_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Describe the columns of an episodes dataframe and their types. Cached fixes are only reused for a file
+    with the same schema
+
+    :param s903_df: Dataframe with SSDA903 Episodes data
+    :return: Dataframe of column name and type
+    """
+    return pd.DataFrame(
+        {"column": s903_df.columns, "dtype": s903_df.dtypes.astype(str).to_numpy()}
+    )
+
+
+def fix_episodes_incremental(
+    s903_df: pd.DataFrame, previous: dict = None, processes: int = 1
+) -> tuple:
+    """
+    Accept an s903 episodes dataframe and apply the stage 1 and stage 2 rules, reusing the fixed episodes of
+    the previous run for children whose episodes have not changed. Children whose episodes are new or have
+    changed, and every child with an episode in an LA whose latest submission year has moved, are fixed again
+    and spliced back in CHILD and DECOM order, giving the same output as fix_episodes
+
+    :param s903_df: Dataframe with SSDA903 Episodes data
+    :param previous: The state returned by the previous run, or None to fix every child
+    :param processes: Number of worker processes to use
+    :return: Tuple of the dataframe with stage 1 and stage 2 rules applied, and the state to keep for the next
+        run as a dictionary of dataframes
+    """
+    fingerprints = child_fingerprints(s903_df)
+    year_latest = latest_year_for_la(s903_df)
+    schema = episodes_schema(s903_df)
+
+    if previous is None or not previous["schema"].equals(schema):
+        s903_df_final = fix_episodes(s903_df, processes=processes)
+    else:
+        previous_year_latest = previous["year_latest"]["YEAR_latest"]
+        moved_la = year_latest.index[
+            year_latest.ne(previous_year_latest.reindex(year_latest.index))
+        ]
+        recompute = changed_children(
+            fingerprints, previous["fingerprints"]["fingerprint"]
+        ).union(s903_df.loc[s903_df["LA"].isin(moved_la), "CHILD"].unique())
+        log.info(f"Fixing episodes of {len(recompute)} of {len(fingerprints)} children")
+
+        kept = previous["fixed"][
+            previous["fixed"]["CHILD"].isin(fingerprints.index.difference(recompute))
+        ]
+        s903_df_recompute = s903_df[s903_df["CHILD"].isin(recompute)]
+        s903_df_final = kept
+        if not s903_df_recompute.empty:
+            s903_df_final = pd.concat(
+                [
+                    kept,
+                    fix_episodes(
+                        s903_df_recompute, processes=processes, year_latest=year_latest
+                    ),
+                ]
+            )
+        s903_df_final = s903_df_final.sort_values(["CHILD", "DECOM"], ignore_index=True)
+
+    state = {
+        "fixed": s903_df_final,
+        "fingerprints": fingerprints.to_frame(),
+        "year_latest": year_latest.to_frame("YEAR_latest"),
+        "schema": schema,
+    }
+    return s903_df_final, state
@@ -1,4 +1,5 @@
 from pathlib import Path
+import os
 import pandas as pd
 import logging
 
@@ -23,6 +24,50 @@ def data_min(s903_df, minimise, table_name):
     return s903_df
 
 
+def kept_columns(column_names, minimise, table_name):
+    """
+    Works out the columns of a file type that are kept for pan-London sufficiency analysis, from the schema
+    """
+    dropped = minimise.get(table_name, [])
+    return [column for column in column_names[table_name] if column not in dropped]
+
+
+def read_suff_chunks(input, columns, chunksize=100000):
+    """
+    Reads only the kept columns of the pan-London file, a chunk of rows at a time. The values are read as text so
+    they are written out exactly as they appear in the pan-London file
+    """
+    return pd.read_csv(
+        input,
+        index_col=None,
+        usecols=columns,
+        dtype=str,
+        keep_default_na=False,
+        chunksize=chunksize,
+    )
+
+
+def export_suff_chunks(output, table_name, chunks, columns):
+    """
+    Writes the chunks to a temporary file in the output directory, one after another, with the columns in schema
+    order, then moves it into place. The temporary file is removed if a chunk fails
+    """
+    output_path = Path(output, f"pan_London_SSDA903_{table_name}.csv")
+    temp_path = Path(output, f"pan_London_SSDA903_{table_name}.csv.tmp")
+    header = True
+    try:
+        for chunk in chunks:
+            chunk[columns].to_csv(
+                temp_path, index=False, header=header, mode="w" if header else "a"
+            )
+            header = False
+        if header:
+            pd.DataFrame(columns=columns).to_csv(temp_path, index=False)
+        os.replace(temp_path, output_path)
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+
 def export_suff_file(output, table_name, s903_df):
     """
     Writes file to output directory
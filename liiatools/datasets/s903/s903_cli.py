@@ -80,14 +80,30 @@ def cleanfile(input, la_code, la_log_dir, output):
     type=str,
     help="A string specifying the output directory location",
 )
-def la_agg(input, output):
+@click.option(
+    "--incremental",
+    is_flag=True,
+    default=False,
+    help="Merge the file into the merged data store kept in the output directory, only comparing the new records with the existing ones",
+)
+@click.option(
+    "--chunksize",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Read and merge the existing merged file this number of records at a time, to limit memory use. Cannot be used with --incremental",
+)
+def la_agg(input, output, incremental, chunksize):
     """
     Joins data from newly cleaned SSDA903 file (output of cleanfile()) to existing SSDA903 data for the depositing local authority
     :param input: should specify the input file location, including file name and suffix, and be usable by a Path function
     :param output: should specify the path to the output folder
+    :param incremental: if True the file is merged into the LA's store of the merged file, comparing only the new records with an index of the existing ones
+    :param chunksize: if given the existing merged file is read and merged this number of records at a time
     :return: None
     """
-    s903_main_functions.la_agg(input, output)
+    s903_main_functions.la_agg(
+        input, output, incremental=incremental, chunksize=chunksize
+    )
 
 
 @s903.command()
@@ -105,14 +121,37 @@ def la_agg(input, output):
     type=str,
     help="A string specifying the output directory location",
 )
-def episodes_fix(input, output):
+@click.option(
+    "--processes",
+    default=1,
+    type=click.IntRange(min=1),
+    help="The number of worker processes used to fix the episodes concurrently, splitting the children between them, defaults to 1",
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    default=False,
+    help="Only fix the children whose episodes have changed since the last incremental run, reusing the earlier fixes kept in the output directory",
+)
+@click.option(
+    "--verify",
+    is_flag=True,
+    default=False,
+    help="Run incrementally and also fix every child, logging any children whose fixes differ",
+)
+def episodes_fix(input, output, processes, incremental, verify):
     """
     Applies fixes to la_agg SSDA903 Episodes files
     :param input: should specify the input file location, including file name and suffix, and be usable by a Path function
     :param output: should specify the path to the output folder
+    :param processes: the number of worker processes used to apply the fixes, splitting the children between them
+    :param incremental: if True only the children whose episodes have changed since the last incremental run are fixed again
+    :param verify: if True the incremental fixes are also compared with fixing every child, and the differences logged
     :return: None
     """
-    s903_main_functions.episodes_fix(input, output)
+    s903_main_functions.episodes_fix(
+        input, output, processes=processes, incremental=incremental, verify=verify
+    )
 
 
 @s903.command()
@@ -136,15 +175,31 @@ def episodes_fix(input, output):
     type=str,
     help="A string specifying the output directory location",
 )
-def pan_agg(input, la_code, output):
+@click.option(
+    "--no_csv",
+    is_flag=True,
+    default=False,
+    help="Only update the local authority's partition of the pan-London data store, without writing the csv file",
+)
+@click.option(
+    "--chunksize",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Read and write the pan-London data this number of records, or one LA, at a time, to limit memory use",
+)
+def pan_agg(input, la_code, output, no_csv, chunksize):
     """
     Joins data from newly merged SSDA903 file (output of la-agg()) to existing pan-London SSDA903 data
     :param input: should specify the input file location, including file name and suffix, and be usable by a Path function
     :param la_code: should be a three-letter string for the local authority depositing the file
     :param output: should specify the path to the output folder
+    :param no_csv: if True only the LA's partition of the pan-London data store is updated and the pan-London csv file is not written
+    :param chunksize: if given the pan-London data is read and written this number of records, or one LA, at a time
     :return: None
     """
-    s903_main_functions.pan_agg(input, la_code, output)
+    s903_main_functions.pan_agg(
+        input, la_code, output, no_csv=no_csv, chunksize=chunksize
+    )
 
 
 @s903.command()
@@ -170,3 +225,102 @@ def sufficiency_output(input, output):
     :return: None
     """
     s903_main_functions.sufficiency_output(input, output)
+
+
+@s903.command()
+@click.option(
+    "--i",
+    "inputs",
+    required=True,
+    multiple=True,
+    type=str,
+    help="A string specifying an input file location, including the file name and suffix, usable by a pathlib Path function. Can be given more than once",
+)
+@click.option(
+    "--la_code",
+    required=True,
+    type=click.Choice(la_list, case_sensitive=False),
+    help="A three letter code, specifying the local authority that deposited the files",
+)
+@click.option(
+    "--la_log_dir",
+    required=True,
+    type=str,
+    help="A string specifying the location that the log files for the LA should be output, usable by a pathlib Path function.",
+)
+@click.option(
+    "--o",
+    "output",
+    required=True,
+    type=str,
+    help="A string specifying the local authority's output directory location",
+)
+@click.option(
+    "--pan_o",
+    "pan_output",
+    required=True,
+    type=str,
+    help="A string specifying the pan-London output directory location",
+)
+@click.option(
+    "--suff_o",
+    "suff_output",
+    required=True,
+    type=str,
+    help="A string specifying the Sufficiency analysis output directory location",
+)
+@click.option(
+    "--processes",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="The number of worker processes used to clean the files and fix the episodes",
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    default=False,
+    help="Merge the files into the merged data stores kept in the output directory and only fix the children whose episodes have changed",
+)
+@click.option(
+    "--stage_files",
+    is_flag=True,
+    default=False,
+    help="Also write the cleaned files and the fixed episodes file to the output directory",
+)
+@click_log.simple_verbosity_option(log)
+def run_all(
+    inputs,
+    la_code,
+    la_log_dir,
+    output,
+    pan_output,
+    suff_output,
+    processes,
+    incremental,
+    stage_files,
+):
+    """
+    Runs newly deposited SSDA903 files through cleanfile, la-agg, episodes-fix, pan-agg and sufficiency-output in one go
+    :param inputs: should specify the input file locations, including file name and suffix, and be usable by a Path function
+    :param la_code: should be a three-letter string for the local authority depositing the files
+    :param la_log_dir: should specify the path to the local authority's log folder
+    :param output: should specify the path to the local authority's output folder
+    :param pan_output: should specify the path to the pan-London output folder
+    :param suff_output: should specify the path to the Sufficiency analysis output folder
+    :param processes: the number of worker processes used to clean the files and fix the episodes
+    :param incremental: if True the files are merged into the LA's stores of the merged files and only the children whose episodes have changed are fixed again
+    :param stage_files: if True the cleaned files and the fixed episodes file are also written to the output folder
+    :return: None
+    """
+    s903_main_functions.run_all(
+        list(inputs),
+        la_code,
+        la_log_dir,
+        output,
+        pan_output,
+        suff_output,
+        processes=processes,
+        incremental=incremental,
+        stage_files=stage_files,
+    )
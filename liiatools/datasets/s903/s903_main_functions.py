@@ -1,6 +1,10 @@
 from pathlib import Path
 import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
+from io import StringIO
+from itertools import chain, repeat
 import yaml
 import click_log
 
@@ -25,7 +29,12 @@ from liiatools.datasets.s903.lds_ssda903_sufficiency import configuration as suf
 from liiatools.datasets.s903.lds_ssda903_sufficiency import process as suff_process
 
 # dependencies for episodes fix()
-from liiatools.datasets.s903.lds_ssda903_episodes_fix.process import stage_1, stage_2
+from liiatools.datasets.s903.lds_ssda903_episodes_fix.process import (
+    fix_episodes,
+    fix_episodes_incremental,
+    child_fingerprints,
+    changed_children,
+)
 
 from liiatools.spec import common as common_asset_dir
 from liiatools.datasets.shared_functions import (
@@ -34,6 +43,7 @@ from liiatools.datasets.shared_functions import (
     parse,
     process as common_process,
 )
+from liiatools.datasets.shared_functions.store import read_store, write_store
 
 log = logging.getLogger()
 click_log.basic_config(log)
@@ -47,19 +57,18 @@ YEAR_START_MONTH = 1
 REFERENCE_DATE = datetime.now()
 
 
-def cleanfile(input, la_code, la_log_dir, output):
+def _clean_stream(input, la_code, la_log_dir):
     """
-    Cleans input SSDA903 csv files according to config and outputs cleaned csv files.
+    Checks the input SSDA903 csv file and, if it can be cleaned, parses and cleans it according to config
     :param input: should specify the input file location, including file name and suffix, and be usable by a Path function
     :param la_code: should be a three-letter string for the local authority depositing the file
     :param la_log_dir: should specify the path to the local authority's log folder
-    :param output: should specify the path to the output folder
-    :return: None
+    :return: The cleaned stream and the full name of the LA, or None if the file cannot be cleaned
     """
 
     # Prepare file
     if prep.check_blank_file(input, la_log_dir=la_log_dir) == "empty":
-        return
+        return None
     prep.drop_empty_rows(input, input)
 
     # Configuration
@@ -68,7 +77,7 @@ def cleanfile(input, la_code, la_log_dir, output):
         year = common.check_year(filename)
     except (AttributeError, ValueError):
         common.save_year_error(input, la_log_dir)
-        return
+        return None
 
     if (
         common.check_year_within_range(
@@ -79,7 +88,7 @@ def cleanfile(input, la_code, la_log_dir, output):
         common.save_incorrect_year_error(
             input, la_log_dir, retention_period=YEARS_TO_GO_BACK - 1
         )
-        return
+        return None
 
     config = clean_config.Config(year)
     la_name = common.flip_dict(config["data_codes"])[la_code]
@@ -92,7 +101,7 @@ def cleanfile(input, la_code, la_log_dir, output):
         )
         == "incorrect file type"
     ):
-        return
+        return None
 
     # Open & Parse file
     stream = parse.parse_csv(input=input)
@@ -107,78 +116,262 @@ def cleanfile(input, la_code, la_log_dir, output):
     stream = logger.log_errors(stream)
     stream = populate.create_la_child_id(stream, la_code=la_code)
 
+    return stream, la_name
+
+
+def cleanfile(input, la_code, la_log_dir, output):
+    """
+    Cleans input SSDA903 csv files according to config and outputs cleaned csv files.
+    :param input: should specify the input file location, including file name and suffix, and be usable by a Path function
+    :param la_code: should be a three-letter string for the local authority depositing the file
+    :param la_log_dir: should specify the path to the local authority's log folder
+    :param output: should specify the path to the output folder
+    :return: None
+    """
+    cleaned = _clean_stream(input, la_code, la_log_dir)
+    if cleaned is None:
+        return
+    stream, la_name = cleaned
+
     # Output result
     stream = file_creator.save_stream(stream, la_name=la_name, output=output)
     stream = logger.save_errors_la(stream, la_log_dir=la_log_dir)
     list(stream)
 
 
-def la_agg(input, output):
+def _clean_tables(input, la_code, la_log_dir, config, output=None):
+    """
+    Cleans an input SSDA903 csv file for run_all, keeping the clean tables in memory, and reads each with the
+    la_agg column types. The clean tables are built as text, in the same form as the files written by cleanfile,
+    so they are read from csv text, giving the same types and values as la_agg reading the clean files
+    :param input: should specify the input file location, including file name and suffix, and be usable by a Path function
+    :param la_code: should be a three-letter string for the local authority depositing the file
+    :param la_log_dir: should specify the path to the local authority's log folder
+    :param config: The la_agg configuration
+    :param output: optional path to the output folder, to also write the cleaned csv file there
+    :return: List of (filename, file type, DataFrame) tuples, one for each clean table. The file type and
+        DataFrame are None if the table does not match any SSDA903 file type
+    """
+    cleaned = _clean_stream(input, la_code, la_log_dir)
+    if cleaned is None:
+        return []
+    stream, la_name = cleaned
+
+    stream = file_creator.coalesce_row(stream)
+    stream = file_creator.create_tables(stream, la_name=la_name)
+    if output is not None:
+        stream = file_creator.save_tables(stream, output=output)
+    stream = logger.save_errors_la(stream, la_log_dir=la_log_dir)
+    tables = []
+    for event in stream:
+        if not isinstance(event, file_creator.TableEvent) or event.data is None:
+            continue
+        clean_csv = event.data.export("csv")
+        table_name = common_process.match_load_file(
+            common_process.read_header(StringIO(clean_csv)), config["column_names"]
+        )
+        s903_df = None
+        if table_name is not None:
+            s903_df = common_process.read_file(
+                StringIO(clean_csv),
+                table_name,
+                dtypes=config["dtypes"],
+                dates=config["dates"],
+            )
+        tables.append((event.filename, table_name, s903_df))
+    return tables
+
+
+def _merge_la(s903_df, table_name, output, config, incremental=False):
+    """
+    Merges the new SSDA903 data with the existing data of the same type for the depositing LA, then de-duplicates
+    and removes old data according to schema
+    :param s903_df: DataFrame of the new data, read with the la_agg column types and dates
+    :param table_name: The SSDA903 file type
+    :param output: should specify the path to the output folder
+    :param config: The la_agg configuration
+    :param incremental: if True the data is merged into the LA's store of the merged file
+    :return: DataFrame of the merged data
+    """
+    dtypes = config["dtypes"]
+    dates = config["dates"]
+    sort_order = config["sort_order"]
+    dedup = config["dedup"]
+    if incremental:
+        # Merge file into the LA's store of the merged file, de-duplicating and removing old data as it goes
+        earliest_year = common_process.earliest_allowed_year(
+            num_of_years=YEARS_TO_GO_BACK,
+            new_year_start_month=YEAR_START_MONTH,
+            as_at_date=REFERENCE_DATE,
+        )
+        s903_df = common_process.merge_la_store(
+            output,
+            s903_df,
+            table_name,
+            filename="SSDA903",
+            sort_order=sort_order,
+            dedup=dedup,
+            year_column="YEAR",
+            earliest_year=earliest_year,
+            dtypes=dtypes,
+            dates=dates,
+        )
+    else:
+        # Merge file with existing file of the same type in LA output folder
+        s903_df = common_process.merge_la_files(
+            output, s903_df, table_name, filename="SSDA903", dtypes=dtypes, dates=dates
+        )
+
+        # De-duplicate and remove old data according to schema
+        s903_df = common_process.convert_datetimes(s903_df, dates, table_name)
+        s903_df = common_process.deduplicate(s903_df, table_name, sort_order, dedup)
+        s903_df = common_process.remove_old_data(
+            s903_df,
+            num_of_years=YEARS_TO_GO_BACK,
+            new_year_start_month=YEAR_START_MONTH,
+            as_at_date=REFERENCE_DATE,
+            year_column="YEAR",
+        )
+    return s903_df
+
+
+def _export_la(s903_df, table_name, output, config, incremental=False):
+    """
+    Re-formats the dates of the merged data and writes the merged file
+    """
+    s903_df = common_process.convert_dates(s903_df.copy(), config["dates"], table_name)
+    common_process.export_la_file(output, table_name, s903_df, filename="SSDA903")
+    if incremental:
+        common_process.mark_la_store(output, table_name, filename="SSDA903")
+
+
+def la_agg(input, output, incremental=False, chunksize=None):
     """
     Joins data from newly cleaned SSDA903 file (output of cleanfile()) to existing SSDA903 data for the depositing local authority
     :param input: should specify the input file location, including file name and suffix, and be usable by a Path function
     :param output: should specify the path to the output folder
+    :param incremental: if True the file is merged into the LA's store of the merged file, comparing only the new records with an index of the existing ones
+    :param chunksize: if given the existing merged file is read and merged this number of records at a time, rather than all at once
     :return: None
     """
+    if incremental and chunksize:
+        raise ValueError("la_agg cannot be run both incrementally and in chunks")
 
     # Configuration
     config = agg_config.Config()
 
-    # Open file as DataFrame and match file type
-    s903_df = common_process.read_file(input)
+    # Match file type and open file as DataFrame
     column_names = config["column_names"]
-    table_name = common_process.match_load_file(s903_df, column_names)
-
-    # Merge file with existing file of the same type in LA output folder
-    s903_df = common_process.merge_la_files(
-        output, s903_df, table_name, filename="SSDA903"
+    table_name = common_process.match_load_file(
+        common_process.read_header(input), column_names
     )
-
-    # De-duplicate and remove old data according to schema
-    dates = config["dates"]
-    s903_df = common_process.convert_datetimes(s903_df, dates, table_name)
-    sort_order = config["sort_order"]
-    dedup = config["dedup"]
-    s903_df = common_process.deduplicate(s903_df, table_name, sort_order, dedup)
-    s903_df = common_process.remove_old_data(
-        s903_df,
-        num_of_years=YEARS_TO_GO_BACK,
-        new_year_start_month=YEAR_START_MONTH,
-        as_at_date=REFERENCE_DATE,
-        year_column="YEAR",
+    s903_df = common_process.read_file(
+        input, table_name, dtypes=config["dtypes"], dates=config["dates"]
     )
 
+    if chunksize:
+        # Merge, de-duplicate, remove old data and export a chunk of the existing merged file at a time
+        common_process.merge_la_chunked(
+            output,
+            s903_df,
+            table_name,
+            filename="SSDA903",
+            sort_order=config["sort_order"],
+            dedup=config["dedup"],
+            year_column="YEAR",
+            earliest_year=common_process.earliest_allowed_year(
+                num_of_years=YEARS_TO_GO_BACK,
+                new_year_start_month=YEAR_START_MONTH,
+                as_at_date=REFERENCE_DATE,
+            ),
+            chunksize=chunksize,
+            dtypes=config["dtypes"],
+            dates=config["dates"],
+        )
+        return
+
+    # Merge, de-duplicate and remove old data
+    s903_df = _merge_la(s903_df, table_name, output, config, incremental=incremental)
+
     # If file still has data, after removing old data: re-format and export merged file
     if len(s903_df) > 0:
-        s903_df = common_process.convert_dates(s903_df, dates, table_name)
-        common_process.export_la_file(output, table_name, s903_df, filename="SSDA903")
+        _export_la(s903_df, table_name, output, config, incremental=incremental)
 
 
-def pan_agg(input, la_code, output):
+def _merge_pan(s903_df, table_name, la_code, output, config, chunksize=None):
+    """
+    Replaces the depositing LA's data in the pan-London SSDA903 data store, if the file type is kept pan-London
+    :param s903_df: DataFrame of the LA's merged data, read with the pan_agg column types and dates
+    :param table_name: The SSDA903 file type
+    :param la_code: should be a three-letter string for the local authority depositing the file
+    :param output: should specify the path to the output folder
+    :param config: The pan_agg configuration
+    :param chunksize: if given an existing pan-London file is split into the data store this number of records at a time
+    :return: True if the file type is kept pan-London, otherwise False
+    """
+    if table_name not in config["pan_data_kept"]:
+        return False
+    la_name = common.flip_dict(config["data_codes"])[la_code]
+    common_process.save_la_partition(
+        output,
+        table_name,
+        s903_df,
+        la_name,
+        filename="SSDA903",
+        dtypes=config["dtypes"],
+        dates=config["dates"],
+        chunksize=chunksize,
+    )
+    return True
+
+
+def pan_agg(input, la_code, output, no_csv=False, chunksize=None):
     """
     Joins data from newly merged SSDA903 file (output of la-agg()) to existing pan-London SSDA903 data
     :param input: should specify the input file location, including file name and suffix, and be usable by a Path function
     :param la_code: should be a three-letter string for the local authority depositing the file
     :param output: should specify the path to the output folder
+    :param no_csv: if True only the LA's partition of the pan-London data store is updated and the pan-London csv file is not written
+    :param chunksize: if given the pan-London data is read and written this number of records, or one LA, at a time, rather than all at once
     :return: None
     """
 
     # Configuration
     config = pan_config.Config()
 
-    # Read file and match type
-    s903_df = common_process.read_file(input)
+    # Match file type and read file
     column_names = config["column_names"]
-    table_name = common_process.match_load_file(s903_df, column_names)
+    table_name = common_process.match_load_file(
+        common_process.read_header(input), column_names
+    )
+    s903_df = common_process.read_file(
+        input, table_name, dtypes=config["dtypes"], dates=config["dates"]
+    )
 
     # Remove unwanted datasets and merge wanted with existing output
-    pan_data_kept = config["pan_data_kept"]
-    if table_name in pan_data_kept:
-        la_name = common.flip_dict(config["data_codes"])[la_code]
-        s903_df = common_process.merge_agg_files(
-            output, table_name, s903_df, la_name, filename="SSDA903"
-        )
-        common_process.export_pan_file(output, table_name, s903_df, filename="SSDA903")
+    if (
+        _merge_pan(s903_df, table_name, la_code, output, config, chunksize=chunksize)
+        and not no_csv
+    ):
+        if chunksize:
+            common_process.export_pan_store(output, table_name, filename="SSDA903")
+        else:
+            s903_df = common_process.read_pan_store(
+                output, table_name, filename="SSDA903"
+            )
+            common_process.export_pan_file(
+                output, table_name, s903_df, filename="SSDA903"
+            )
+
+
+def _minimise_sufficiency(s903_df, table_name, config):
+    """
+    Applies data minimisation to pan-London SSDA903 data for the Sufficiency analysis, if the file type is kept
+    :return: The minimised DataFrame, or None if the file type is not kept for the Sufficiency analysis
+    """
+    if table_name not in config["suff_data_kept"]:
+        return None
+    return suff_process.data_min(s903_df, config["minimise"], table_name)
 
 
 def sufficiency_output(input, output):
@@ -192,24 +385,70 @@ def sufficiency_output(input, output):
     # Configuration
     config = suff_config.Config()
 
-    # Read file and match type
-    s903_df = common_process.read_file(input)
+    # Read the column headers and match type
     column_names = config["column_names"]
-    table_name = suff_process.match_load_file(s903_df, column_names)
+    table_name = suff_process.match_load_file(
+        common_process.read_header(input), column_names
+    )
+    if table_name not in config["suff_data_kept"]:
+        return
 
-    # Minimises output following schema and exports file
-    suff_data_kept = config["suff_data_kept"]
-    if table_name in suff_data_kept:
-        minimise = config["minimise"]
-        s903_df = suff_process.data_min(s903_df, minimise, table_name)
-        suff_process.export_suff_file(output, table_name, s903_df)
+    # Reads only the columns kept by the schema and exports them a chunk at a time
+    columns = suff_process.kept_columns(column_names, config["minimise"], table_name)
+    chunks = suff_process.read_suff_chunks(input, columns)
+    suff_process.export_suff_chunks(output, table_name, chunks, columns)
 
 
-def episodes_fix(input, output):
+def _fix_episodes(s903_df, output, processes=1, incremental=False, verify=False):
+    """
+    Applies the stage 1 and stage 2 rule fixes to the LA's merged SSDA903 Episodes data
+    :param s903_df: DataFrame of the LA's merged Episodes data
+    :param output: should specify the path to the output folder, where the incremental fixes are kept
+    :param processes: the number of worker processes used to apply the fixes, splitting the children between them
+    :param incremental: if True only the children whose episodes have changed since the last incremental run are fixed again
+    :param verify: if True the incremental fixes are also compared with fixing every child, and the differences logged
+    :return: DataFrame of the fixed episodes
+    """
+    # The rules set new codes in coded fields, so any categorical fields are fixed as plain values
+    categorical = s903_df.select_dtypes("category").columns
+    s903_df = s903_df.astype({column: object for column in categorical})
+
+    if not (incremental or verify):
+        return fix_episodes(s903_df, processes=processes)
+
+    store_dir = Path(output, "SSDA903_episodes_fixed")
+    previous = read_store(store_dir) if store_dir.is_dir() else None
+    s903_df_final, state = fix_episodes_incremental(
+        s903_df, previous=previous, processes=processes
+    )
+    if verify:
+        s903_df_full = fix_episodes(s903_df, processes=processes)
+        incremental_fingerprints = child_fingerprints(s903_df_final)
+        full_fingerprints = child_fingerprints(s903_df_full)
+        differences = changed_children(
+            incremental_fingerprints, full_fingerprints
+        ).union(changed_children(full_fingerprints, incremental_fingerprints))
+        if len(differences) > 0:
+            log.error(
+                f"Incremental episodes fix differs from fixing every child for {len(differences)} children, "
+                f"e.g. {', '.join(map(str, differences[:5]))}. Saving the fixes of every child"
+            )
+            s903_df_final = s903_df_full
+            state["fixed"] = s903_df_full
+        else:
+            log.info("Incremental episodes fix matches fixing every child")
+    write_store(store_dir, state)
+    return s903_df_final
+
+
+def episodes_fix(input, output, processes=1, incremental=False, verify=False):
     """
     Applies fixes to la_agg SSDA903 Episodes files
     :param input: should specify the input file location, including file name and suffix, and be usable by a Path function
     :param output: should specify the path to the output folder
+    :param processes: the number of worker processes used to apply the fixes, splitting the children between them
+    :param incremental: if True only the children whose episodes have changed since the last incremental run are fixed again
+    :param verify: if True the incremental fixes are also compared with fixing every child, and the differences logged
     :return: None
     """
 
@@ -223,10 +462,127 @@ def episodes_fix(input, output):
 
     # Process stage 1 and 2 rule fixes for Episodes table
     if table_name == "Episodes":
-        s903_df_stage1_applied = stage_1(s903_df)
-        s903_df_final = stage_2(s903_df_stage1_applied)
+        s903_df_final = _fix_episodes(
+            s903_df,
+            output,
+            processes=processes,
+            incremental=incremental,
+            verify=verify,
+        )
         output_path = Path(output, "SSDA903_episodes_fixed.csv")
         s903_df_final.to_csv(
             output_path,
             index=False,
         )
+
+
+def run_all(
+    inputs,
+    la_code,
+    la_log_dir,
+    output,
+    pan_output,
+    suff_output,
+    processes=1,
+    incremental=False,
+    stage_files=False,
+):
+    """
+    Runs newly deposited SSDA903 files through cleanfile, la_agg, episodes_fix, pan_agg and sufficiency_output in
+    a single process. The files are cleaned concurrently, then the tables of each file type are passed from stage
+    to stage together, as one DataFrame with the configured column types, and the output files of every stage
+    are written together at the end, without being read back in by the next stage
+    :param inputs: should specify the input file locations, including file name and suffix, usable by a Path function
+    :param la_code: should be a three-letter string for the local authority depositing the files
+    :param la_log_dir: should specify the path to the local authority's log folder
+    :param output: should specify the path to the local authority's output folder, for the merged files
+    :param pan_output: should specify the path to the pan-London output folder
+    :param suff_output: should specify the path to the Sufficiency analysis output folder
+    :param processes: the number of worker processes used to clean the files and fix the episodes, and of threads used to write the output files
+    :param incremental: if True the files are merged into the LA's stores of the merged files and only the children whose episodes have changed are fixed again
+    :param stage_files: if True the cleaned files and the fixed episodes file are also written to the output folder, as by cleanfile and episodes_fix
+    :return: None
+    """
+
+    # Configuration
+    agg = agg_config.Config()
+    pan = pan_config.Config()
+    suff = suff_config.Config()
+
+    # Clean the files concurrently and read the clean tables with the la_agg column types
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        cleaned = list(
+            pool.map(
+                _clean_tables,
+                inputs,
+                repeat(la_code),
+                repeat(la_log_dir),
+                repeat(agg),
+                repeat(output if stage_files else None),
+            )
+        )
+
+    # Group the clean tables by file type, so the files of each type are merged with the LA's data together. The
+    # later files come first, so their records win over those of earlier files, as when la_agg is run on each
+    # file in turn
+    tables = {}
+    for filename, table_name, s903_df in chain.from_iterable(cleaned):
+        if table_name is None:
+            log.warning(f"{filename} does not match any SSDA903 file type, skipping")
+            continue
+        tables.setdefault(table_name, []).insert(0, s903_df)
+
+    writes = []
+    for table_name, s903_dfs in tables.items():
+        s903_df = common_process.concat_dfs(s903_dfs, ignore_index=True)
+
+        # Merge with the LA's existing data
+        s903_df = _merge_la(s903_df, table_name, output, agg, incremental=incremental)
+        if len(s903_df) == 0:
+            continue
+        writes.append(
+            partial(_export_la, s903_df, table_name, output, agg, incremental)
+        )
+
+        # Fix the episodes
+        if table_name == "Episodes":
+            s903_df = _fix_episodes(
+                s903_df, output, processes=processes, incremental=incremental
+            )
+            if stage_files:
+                writes.append(
+                    partial(
+                        s903_df.to_csv,
+                        Path(output, "SSDA903_episodes_fixed.csv"),
+                        index=False,
+                    )
+                )
+
+        # Merge with the pan-London data and minimise for the Sufficiency analysis
+        if not _merge_pan(s903_df, table_name, la_code, pan_output, pan):
+            continue
+        s903_df = common_process.read_pan_store(
+            pan_output, table_name, filename="SSDA903"
+        )
+        writes.append(
+            partial(
+                common_process.export_pan_file,
+                pan_output,
+                table_name,
+                s903_df,
+                filename="SSDA903",
+            )
+        )
+        suff_table_name = suff_process.match_load_file(s903_df, suff["column_names"])
+        s903_df = _minimise_sufficiency(s903_df, suff_table_name, suff)
+        if s903_df is not None:
+            writes.append(
+                partial(
+                    suff_process.export_suff_file, suff_output, suff_table_name, s903_df
+                )
+            )
+
+    # Write the output files of every stage
+    with ThreadPoolExecutor(max_workers=processes) as pool:
+        for future in [pool.submit(write) for write in writes]:
+            future.result()
@@ -1,5 +1,9 @@
+import json
 import logging
+from collections import Counter
+from pathlib import Path
 
+from decouple import config
 from sfdata_stream_parser import events
 from sfdata_stream_parser.filters.generic import streamfilter, pass_event
 from sfdata_stream_parser.checks import type_check
@@ -7,10 +11,130 @@ from sfdata_stream_parser.checks import type_check
 log = logging.getLogger(__name__)
 
 
+ERROR_SAMPLE_SIZE = 5
+
+
 class ErrorTable(events.ParseEvent):
     pass
 
 
+class ErrorCounter(Counter):
+    """
+    Counts the cells with a given error in each column of a table, keeping the row numbers of the first few cells
+    found in each column as examples. Columns are kept in the order their first error was found, so the counts are
+    written to the logs in the same order as a Counter built from a list of every failing column header
+    """
+
+    def __init__(self, *args, sample_size=ERROR_SAMPLE_SIZE, **kwargs):
+        """
+        :param sample_size: The largest number of example row numbers to keep for each column
+        """
+        self.sample_size = sample_size
+        self.example_rows = {}
+        super().__init__(*args, **kwargs)
+
+    def add(self, column, row=None):
+        """
+        Count one error in the given column
+
+        :param column: The header of the column the error was found in
+        :param row: The row number of the cell, if known
+        :return: None
+        """
+        self[column] += 1
+        if row is not None:
+            rows = self.example_rows.setdefault(column, [])
+            if len(rows) < self.sample_size:
+                rows.append(row)
+
+    def __reduce__(self):
+        return self.__class__, (dict(self),), self.__dict__
+
+
+def format_error_counts(error_counts):
+    """
+    Format the number of errors in each column as written to the logs, most common first e.g. 'CHILD': 2, 'AGE': 1
+
+    :param error_counts: A Counter of column header to number of errors
+    :return: A string of the error counts
+    """
+    return str(dict(Counter(error_counts).most_common()))[1:-1]
+
+
+def error_counts_record(error_counts):
+    """
+    Describe the number of errors in each column, and any example row numbers, for a JSONL log record
+
+    :param error_counts: A Counter, or ErrorCounter, of column header to number of errors
+    :return: A dictionary of the error counts, most common first, and the example rows of each column
+    """
+    return {
+        "counts": dict(Counter(error_counts).most_common()),
+        "example_rows": getattr(error_counts, "example_rows", {}),
+    }
+
+
+class LogSink:
+    """
+    Buffers log entries in memory for each log file and writes each file in one go when it is flushed, rather
+    than opening the file for every entry. Entries are always appended, so flushing the same file more than
+    once is safe. Each entry can also carry a record which, if enabled, is written as a line of JSON to a twin
+    of the log file with a .jsonl suffix for monitoring
+
+    Use as a context manager, or call flush in a finally block, so buffered entries are written even if
+    processing fails part way through
+    """
+
+    def __init__(self, jsonl=None):
+        """
+        :param jsonl: Whether to write the JSONL twin of each log file, defaults to the error_log_jsonl setting
+        """
+        self.jsonl = (
+            config("error_log_jsonl", default=False, cast=bool)
+            if jsonl is None
+            else jsonl
+        )
+        self._entries = {}
+
+    def write(self, path, text, record=None):
+        """
+        Add an entry to the buffer of a log file
+
+        :param path: Location of the log file
+        :param text: Text to write to the log file, including any new lines
+        :param record: Optional dictionary to write to the JSONL twin of the log file
+        :return: None
+        """
+        self._entries.setdefault(str(path), []).append((text, record))
+
+    def flush(self, path=None):
+        """
+        Write the buffered entries of a log file, or of every log file, and empty the buffer
+
+        :param path: Location of the log file to write, or None for every log file
+        :return: None
+        """
+        paths = list(self._entries) if path is None else [str(path)]
+        for log_path in paths:
+            entries = self._entries.pop(log_path, None)
+            if not entries:
+                continue
+            with open(log_path, "a") as f:
+                f.write("".join(text for text, _ in entries))
+            records = [record for _, record in entries if record is not None]
+            if self.jsonl and records:
+                with open(Path(log_path).with_suffix(".jsonl"), "a") as f:
+                    for record in records:
+                        f.write(json.dumps(record, default=str))
+                        f.write("\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+
 @streamfilter(
     check=type_check(events.Cell), fail_function=pass_event, error_function=pass_event
 )
@@ -41,41 +165,38 @@ def blank_error_check(event):
 
 def create_blank_error_list(stream):
     """
-    Create a list of the column headers for cells with blank fields that should not be blank (event.blank_error = 1)
+    Count the column headers of cells with blank fields that should not be blank (event.blank_error = 1)
     for each table
 
     :param stream: A filtered list of event objects
-    :return: An updated list of event objects with blank error lists
+    :return: An updated list of event objects with blank error counts
     """
     blank_error_list = None
     for event in stream:
         if isinstance(event, events.StartTable):
-            blank_error_list = []
+            blank_error_list = ErrorCounter()
         elif isinstance(event, events.EndTable):
             blank_error_list = None
         elif isinstance(event, ErrorTable):
             yield ErrorTable.from_event(event, blank_error_list=blank_error_list)
             blank_error_list = None
         elif blank_error_list is not None and isinstance(event, events.Cell):
-            blank_error = getattr(event, "blank_error", "0")
-            if blank_error == "1":
-                blank_error_list.append(event.header)
-            else:
-                pass
+            if getattr(event, "blank_error", "0") == "1":
+                blank_error_list.add(event.header, row=csv_row_number(event))
         yield event
 
 
 def create_below_zero_error_list(stream):
     """
-    Create a list of the column headers for cells with fields below zero for each table
+    Count the column headers of cells with fields below zero for each table
 
     :param stream: A filtered list of event objects
-    :return: An updated list of event objects with blank error lists
+    :return: An updated list of event objects with below zero error counts
     """
     below_zero_error_list = None
     for event in stream:
         if isinstance(event, events.StartTable):
-            below_zero_error_list = []
+            below_zero_error_list = ErrorCounter()
         elif isinstance(event, events.EndTable):
             below_zero_error_list = None
         elif isinstance(event, ErrorTable):
@@ -84,14 +205,22 @@ def create_below_zero_error_list(stream):
             )
             below_zero_error_list = None
         elif below_zero_error_list is not None and isinstance(event, events.Cell):
-            below_zero_error = getattr(event, "below_zero_error", "0")
-            if below_zero_error == "1":
-                below_zero_error_list.append(event.header)
-            else:
-                pass
+            if getattr(event, "below_zero_error", "0") == "1":
+                below_zero_error_list.add(event.header, row=csv_row_number(event))
         yield event
 
 
+def csv_row_number(event):
+    """
+    Return the row number of a cell parsed from a csv file, counting the header row as row 1
+
+    :param event: An event object of type Cell
+    :return: The row number of the cell, or None if the cell has no row index
+    """
+    r_ix = getattr(event, "r_ix", None)
+    return None if r_ix is None else r_ix + 2
+
+
 @streamfilter(
     check=type_check(events.StartTable),
     fail_function=pass_event,
@@ -3,6 +3,7 @@ import logging
 from pathlib import Path
 
 from sfdata_stream_parser import events
+from sfdata_stream_parser.parser import openpyxl
 
 log = logging.getLogger(__name__)
 
@@ -33,3 +34,27 @@ def parse_csv(input):
             yield events.EndRow(filename=filename)
         yield events.EndTable(filename=filename)
         yield events.EndContainer()
+
+
+def parse_xlsx(input, **file_properties):
+    """
+    Parse an Excel workbook lazily, one row at a time, opening it read-only with cell values only.
+    File-level properties, such as the filename, are only set on the StartContainer, StartTable, EndTable
+    and EndContainer events rather than being copied onto every event
+
+    :param input: Location of file to be cleaned, or an openpyxl workbook or worksheet
+    :param file_properties: Properties to set on the container and table events e.g. filename and la_code
+    :return: List of event objects containing container, table, row and cell information
+    """
+    for event in openpyxl.parse_sheets(input):
+        if isinstance(
+            event,
+            (
+                events.StartContainer,
+                events.EndContainer,
+                events.StartTable,
+                events.EndTable,
+            ),
+        ):
+            event = event.from_event(event, **file_properties)
+        yield event
@@ -1,19 +1,70 @@
 from pathlib import Path
+import os
+import shutil
+import numpy as np
 import pandas as pd
 import logging
 
+from liiatools.datasets.shared_functions.store import (
+    read_store,
+    remove_from_store,
+    store_tables,
+    write_store,
+)
+
 log = logging.getLogger(__name__)
 
 
-def read_file(file):
+def read_header(file):
+    """
+    Reads only the column headers of the csv file, as an empty pandas DataFrame, so the file type can be matched
+    before the file is read. The file can be a path or a file-like object
+    """
+    df = pd.read_csv(file, index_col=None, nrows=0)
+    return df
+
+
+def read_file(file, table_name=None, dtypes=None, dates=None):
     """
-    Reads the csv file as a pandas DataFrame
+    Reads the csv file as a pandas DataFrame. If the file type is given, the columns are read with the types
+    configured for it in dtypes, e.g. category for coded fields, Int64 for integers and str for identifiers, and
+    its date fields are parsed as the file is read. The file can be a path or a file-like object
     """
-    filepath = Path(file)
-    df = pd.read_csv(filepath, index_col=None)
+    dtype = dtypes.get(table_name) if dtypes else None
+    df = pd.read_csv(file, index_col=None, dtype=dtype)
+    if dates and table_name in dates:
+        df = convert_datetimes(df, dates, table_name)
     return df
 
 
+def read_file_chunks(file, table_name=None, dtypes=None, dates=None, chunksize=100000):
+    """
+    Reads the csv file as a series of pandas DataFrames of at most chunksize rows, with the same column types and
+    dates as read_file, so a large file never has to be held in memory at once
+    """
+    dtype = dtypes.get(table_name) if dtypes else None
+    for df in pd.read_csv(file, index_col=None, dtype=dtype, chunksize=chunksize):
+        if dates and table_name in dates:
+            df = convert_datetimes(df, dates, table_name)
+        yield df
+
+
+def concat_dfs(dfs, ignore_index=False):
+    """
+    Concatenates DataFrames of the same file type. Columns that are categorical in every DataFrame are given the
+    union of their categories first, so they are still categorical once concatenated
+    """
+    dfs = [df.copy(deep=False) for df in dfs]
+    for column in dfs[0].columns:
+        if all(isinstance(df[column].dtype, pd.CategoricalDtype) for df in dfs):
+            categories = dfs[0][column].cat.categories
+            for df in dfs[1:]:
+                categories = categories.union(df[column].cat.categories)
+            for df in dfs:
+                df[column] = df[column].cat.set_categories(categories)
+    return pd.concat(dfs, axis=0, ignore_index=ignore_index)
+
+
 def match_load_file(df, column_names):
     """
     Matches the columns in the DataFrame against one of the given file types
@@ -23,14 +74,15 @@ def match_load_file(df, column_names):
             return table_name
 
 
-def merge_la_files(output, df, table_name, filename):
+def merge_la_files(output, df, table_name, filename, dtypes=None, dates=None):
     """
-    Looks for existing file of the same type and merges with new file if found
+    Looks for existing file of the same type and merges with new file if found. The existing file is read with
+    the same column types and dates as the new file
     """
     old_file = Path(output, f"{filename}_{table_name}_merged.csv")
     if old_file.is_file():
-        old_df = pd.read_csv(old_file, index_col=None)
-        merged_df = pd.concat([df, old_df], axis=0)
+        old_df = read_file(old_file, table_name, dtypes=dtypes, dates=dates)
+        merged_df = concat_dfs([df, old_df])
     else:
         merged_df = df
     return merged_df
@@ -38,18 +90,23 @@ def merge_la_files(output, df, table_name, filename):
 
 def convert_datetimes(df, dates, table_name):
     """
-    Ensures that all date fields have been parsed as dates
+    Ensures that all date fields have been parsed as dates. Fields that have already been parsed, e.g. when the
+    file was read, are left as they are
     """
     for date_field in dates[table_name]:
-        df[date_field] = pd.to_datetime(df[date_field], format="%Y/%m/%d")
+        if not pd.api.types.is_datetime64_any_dtype(df[date_field]):
+            df[date_field] = pd.to_datetime(df[date_field], format="%Y/%m/%d")
     return df
 
 
 def deduplicate(df, table_name, sort_order, dedup):
     """
-    Sorts and removes duplicate records from merged files following schema
+    Sorts and removes duplicate records from merged files following schema. Where duplicate records have the same
+    sort order values the one that comes first, i.e. from the new file, is kept
     """
-    df = df.sort_values(sort_order[table_name], ascending=False, ignore_index=True)
+    df = df.sort_values(
+        sort_order[table_name], ascending=False, kind="stable", ignore_index=True
+    )
     df = df.drop_duplicates(subset=dedup[table_name], keep="first")
     return df
 
@@ -65,16 +122,29 @@ def remove_old_data(df, num_of_years, new_year_start_month, as_at_date, year_col
     :param year_column: Column name that contains year data
     :return: Dataframe with older years removed
     """
+    earliest_year = earliest_allowed_year(
+        num_of_years, new_year_start_month, as_at_date
+    )
+    df = df[df[year_column] >= earliest_year]
+    return df
+
+
+def earliest_allowed_year(num_of_years, new_year_start_month, as_at_date):
+    """
+    Works out the earliest year of data to keep, going back a specified number of years from the reference date
+
+    :param num_of_years: The number of years to go back
+    :param new_year_start_month: The month which signifies start of a new year for data retention policy
+    :param as_at_date: The reference date against which we are checking the valid range
+    :return: The earliest year to keep
+    """
     current_year = pd.to_datetime(as_at_date).year
     current_month = pd.to_datetime(as_at_date).month
 
     if current_month < new_year_start_month:
-        earliest_allowed_year = current_year - num_of_years
+        return current_year - num_of_years
     else:
-        earliest_allowed_year = current_year - num_of_years + 1  # roll forward one year
-
-    df = df[df[year_column] >= earliest_allowed_year]
-    return df
+        return current_year - num_of_years + 1  # roll forward one year
 
 
 def convert_dates(df, dates, table_name):
@@ -94,26 +164,447 @@ def export_la_file(output, table_name, df, filename):
     df.to_csv(output_path, index=False)
 
 
-def _merge_dfs(df, old_df, la_name):
+def _la_store_dir(output, table_name, filename):
+    return Path(output, f"{filename}_{table_name}_merged")
+
+
+def _key_hashes(df, columns):
     """
-    Deletes existing data for new LA from pan file
-    Merges new LA data to pan file
+    Hashes the dedup key of each record. The hash depends on the column types, so the key columns are first
+    given one type per kind of value: numbers, whether int, float or Int64, are hashed as float64 and
+    categorical columns as their values. The same key then has the same hash whichever types it was read with
     """
-    old_df = old_df.drop(old_df[old_df["LA"] == la_name].index)
-    df = pd.concat([df, old_df], axis=0, ignore_index=True)
-    return df
+    keys = df[columns].copy(deep=False)
+    for column in columns:
+        values = keys[column]
+        categorical = isinstance(values.dtype, pd.CategoricalDtype)
+        dtype = values.cat.categories.dtype if categorical else values.dtype
+        if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(
+            dtype
+        ):
+            keys[column] = values.astype("float64")
+        elif categorical:
+            keys[column] = values.astype(object)
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
 
+def _file_stamp(file):
+    stat = Path(file).stat()
+    return pd.DataFrame({"size": [stat.st_size], "mtime_ns": [stat.st_mtime_ns]})
 
-def merge_agg_files(output, table_name, df, la_name, filename):
+
+def _index_rows(df, sort_columns, dedup_columns, partition):
+    index = df[sort_columns].copy()
+    index["key"] = _key_hashes(df, dedup_columns)
+    index["partition"] = partition
+    return index
+
+
+def _la_store_is_current(store_dir, merged_file):
+    tables = store_tables(store_dir)
+    if "index" not in tables or "stamp" not in tables or not merged_file.is_file():
+        return False
+    return read_store(store_dir, ["stamp"])["stamp"].equals(_file_stamp(merged_file))
+
+
+def _rebuild_la_store(store_dir, df, sort_columns, dedup_columns, year_column):
     """
-    Checks if pan file exists
-    Passes old and new file to function to be merged
+    Replaces the store with the rows of a merged file, split into one partition per year, and its index
     """
+    partitions = {}
+    index = []
+    for year, year_df in df.groupby(year_column, sort=False):
+        name = str(int(year))
+        partitions[name] = year_df.reset_index(drop=True)
+        index.append(_index_rows(year_df, sort_columns, dedup_columns, name))
+    if index:
+        partitions["index"] = concat_dfs(index, ignore_index=True)
+    else:
+        partitions["index"] = _index_rows(df, sort_columns, dedup_columns, "")
+    temp_dir = store_dir.with_name(f"{store_dir.name}.tmp")
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    write_store(temp_dir, partitions)
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.replace(temp_dir, store_dir)
+
+
+def merge_la_store(
+    output,
+    df,
+    table_name,
+    filename,
+    sort_order,
+    dedup,
+    year_column,
+    earliest_year,
+    dtypes=None,
+    dates=None,
+):
+    """
+    Merges the new file into the LA's store of the merged file, which holds the merged records in one partition
+    per year and an index of the dedup key hash, partition and sort order values of every record. Only the new
+    records are compared with the index and only the partitions they change are rewritten, giving the same
+    records, in the same order, as merge_la_files, convert_datetimes, deduplicate and remove_old_data.
+
+    If the store is missing, or the merged file has been written since the store was last marked with
+    mark_la_store, the store is first rebuilt from the merged file
+
+    :param output: Location of the LA output folder
+    :param df: DataFrame of the new file
+    :param table_name: The file type
+    :param filename: The dataset name used to name the merged files, e.g. SSDA903
+    :param sort_order: Dictionary of file type to the columns to sort by, which must include the year column
+    :param dedup: Dictionary of file type to the columns that identify duplicate records
+    :param year_column: Column name that contains year data
+    :param earliest_year: The earliest year of data to keep
+    :param dtypes: Dictionary of file type to column types, used when reading the merged file
+    :param dates: Dictionary of file type to date fields
+    :return: DataFrame of the merged, de-duplicated records
+    """
+    store_dir = _la_store_dir(output, table_name, filename)
+    merged_file = Path(output, f"{filename}_{table_name}_merged.csv")
+    sort_columns = sort_order[table_name]
+    dedup_columns = dedup[table_name]
+    if year_column not in sort_columns:
+        raise ValueError(
+            f"Sort order of {table_name} must include {year_column} to merge incrementally"
+        )
+    if dates and table_name in dates:
+        df = convert_datetimes(df, dates, table_name)
+
+    if not _la_store_is_current(store_dir, merged_file):
+        log.info(f"Building the {store_dir.name} store from the merged file")
+        if merged_file.is_file():
+            old_df = read_file(merged_file, table_name, dtypes=dtypes, dates=dates)
+        else:
+            old_df = df.iloc[:0]
+        _rebuild_la_store(store_dir, old_df, sort_columns, dedup_columns, year_column)
+    remove_from_store(store_dir, ["stamp"])
+    index = read_store(store_dir, ["index"])["index"]
+
+    # Find the new records that win against the records already held with the same key, and the records they
+    # replace, by de-duplicating the new records together with the index entries of the keys they share
+    new_index = _index_rows(df, sort_columns, dedup_columns, None)
+    new_index["position"] = range(len(df))
+    matched = index[index["key"].isin(new_index["key"])]
+    winners = deduplicate(
+        concat_dfs([new_index, matched], ignore_index=True),
+        table_name,
+        sort_order,
+        {table_name: ["key"]},
+    )
+    winners = winners[winners["position"].notna()]
+    replaced = matched[matched["key"].isin(winners["key"])]
+    log.info(
+        f"Merging {len(winners)} new {table_name} records, replacing {len(replaced)}"
+    )
+
+    new_df = df.iloc[winners["position"].astype(int).sort_values()]
+    kept = (new_df[year_column] >= earliest_year).fillna(False).to_numpy(dtype=bool)
+    new_df = new_df[kept]
+    new_partitions = new_df[year_column].map(lambda year: str(int(year))).to_numpy()
+
+    stored_partitions = [
+        name for name in store_tables(store_dir) if name not in ("index", "stamp")
+    ]
+    old_partitions = [name for name in stored_partitions if int(name) < earliest_year]
+    index = index[
+        ~index["key"].isin(replaced["key"]) & ~index["partition"].isin(old_partitions)
+    ]
+
+    changed = {}
+    for name in set(new_partitions).union(replaced["partition"]):
+        if int(name) < earliest_year:
+            continue
+        partition_df = new_df[new_partitions == name]
+        if name in stored_partitions:
+            old_df = read_store(store_dir, [name])[name]
+            old_df = old_df[
+                ~pd.Index(_key_hashes(old_df, dedup_columns)).isin(replaced["key"])
+            ]
+            partition_df = concat_dfs([partition_df, old_df])
+        changed[name] = partition_df.sort_values(
+            sort_columns, ascending=False, kind="stable", ignore_index=True
+        )
+    index = concat_dfs(
+        [_index_rows(new_df, sort_columns, dedup_columns, new_partitions), index],
+        ignore_index=True,
+    )
+
+    empty = [name for name, partition_df in changed.items() if partition_df.empty]
+    remove_from_store(store_dir, old_partitions + empty)
+    write_store(
+        store_dir,
+        {
+            name: partition_df
+            for name, partition_df in changed.items()
+            if not partition_df.empty
+        },
+    )
+    write_store(store_dir, {"index": index})
+
+    unchanged = [
+        name
+        for name in stored_partitions
+        if name not in changed and name not in old_partitions
+    ]
+    partitions = [
+        partition_df
+        for partition_df in list(changed.values())
+        + list(read_store(store_dir, unchanged).values())
+        if not partition_df.empty
+    ]
+    if not partitions:
+        return df.iloc[:0]
+    merged_df = concat_dfs(partitions, ignore_index=True)
+    merged_df = merged_df.sort_values(
+        sort_columns, ascending=False, kind="stable", ignore_index=True
+    )
+    return merged_df[df.columns.union(merged_df.columns, sort=False)]
+
+
+def mark_la_store(output, table_name, filename):
+    """
+    Records the merged file just written from the LA's store, so the next merge_la_store can trust the store
+    rather than rebuilding it from the merged file
+    """
+    store_dir = _la_store_dir(output, table_name, filename)
+    merged_file = Path(output, f"{filename}_{table_name}_merged.csv")
+    write_store(store_dir, {"stamp": _file_stamp(merged_file)})
+
+
+def _sorted_merge(df, chunks, sort_columns, file_name):
+    """
+    Yields the records of the new file and of the chunks of an existing merged file, which is already sorted, in the
+    order deduplicate sorts them together, holding only one chunk and the new records not yet yielded at a time
+    """
+    pending = df.sort_values(
+        sort_columns, ascending=False, kind="stable", ignore_index=True
+    )
+    last = None
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        # The last record of the previous chunk is sorted with this chunk, to check the chunks are in order
+        old_df = chunk if last is None else concat_dfs([last, chunk])
+        combined = concat_dfs([pending, old_df], ignore_index=True)
+        order = combined.sort_values(
+            sort_columns, ascending=False, kind="stable"
+        ).index.to_numpy()
+        is_old = order >= len(pending)
+        if (np.diff(order[is_old]) < 0).any():
+            raise ValueError(
+                f"{file_name} is not sorted by {', '.join(sort_columns)}, so it cannot be merged in chunks"
+            )
+        cut = np.flatnonzero(is_old)[-1] + 1
+        rows = order[:cut]
+        if last is not None:
+            rows = rows[rows != len(pending)]
+        yield combined.iloc[rows]
+        pending = combined.iloc[order[cut:]].reset_index(drop=True)
+        last = chunk.iloc[[-1]]
+    yield pending
+
+
+def merge_la_chunked(
+    output,
+    df,
+    table_name,
+    filename,
+    sort_order,
+    dedup,
+    year_column,
+    earliest_year,
+    chunksize,
+    dtypes=None,
+    dates=None,
+):
+    """
+    Merges the new file with the existing merged file of the same type without reading the merged file into memory
+    at once. The merged file is read in chunks, which are merged in sort order with the new records, de-duplicated
+    against them and filtered by year, and written to a temporary file that then replaces the merged file. This
+    gives the same records, in the same order, as merge_la_files, convert_datetimes, deduplicate and
+    remove_old_data, as long as the merged file was written by them, i.e. is sorted and has no duplicates.
+
+    If no records are left, the merged file is left as it is, as when the merged file is not exported
+
+    :param output: Location of the LA output folder
+    :param df: DataFrame of the new file
+    :param table_name: The file type
+    :param filename: The dataset name used to name the merged files, e.g. SSDA903
+    :param sort_order: Dictionary of file type to the columns to sort by
+    :param dedup: Dictionary of file type to the columns that identify duplicate records
+    :param year_column: Column name that contains year data
+    :param earliest_year: The earliest year of data to keep
+    :param chunksize: The number of records of the merged file to read at a time
+    :param dtypes: Dictionary of file type to column types, used when reading the merged file
+    :param dates: Dictionary of file type to date fields, which are re-formatted as they are written
+    :return: The number of records written to the merged file
+    """
+    merged_file = Path(output, f"{filename}_{table_name}_merged.csv")
+    temp_file = Path(output, f"{filename}_{table_name}_merged.csv.tmp")
+    sort_columns = sort_order[table_name]
+    dedup_columns = dedup[table_name]
+    if dates and table_name in dates:
+        df = convert_datetimes(df, dates, table_name)
+
+    columns = df.columns
+    chunks = []
+    if merged_file.is_file():
+        columns = columns.union(read_header(merged_file).columns, sort=False)
+        chunks = read_file_chunks(
+            merged_file, table_name, dtypes=dtypes, dates=dates, chunksize=chunksize
+        )
+
+    # Only the keys of the new records can appear twice, as the merged file has no duplicates
+    new_keys = _key_hashes(df, dedup_columns)
+    seen = new_keys[:0]
+    written = 0
+    try:
+        for merged_df in _sorted_merge(df, chunks, sort_columns, merged_file.name):
+            keys = _key_hashes(merged_df, dedup_columns)
+            kept = ~pd.Series(keys).duplicated().to_numpy() & ~np.isin(keys, seen)
+            seen = np.concatenate([seen, keys[kept & np.isin(keys, new_keys)]])
+            merged_df = merged_df[kept]
+            merged_df = merged_df[
+                (merged_df[year_column] >= earliest_year)
+                .fillna(False)
+                .to_numpy(dtype=bool)
+            ]
+            if merged_df.empty:
+                continue
+            merged_df = merged_df.reindex(columns=columns)
+            if dates and table_name in dates:
+                merged_df = convert_dates(merged_df, dates, table_name)
+            merged_df.to_csv(
+                temp_file,
+                index=False,
+                header=written == 0,
+                mode="a" if written else "w",
+            )
+            written += len(merged_df)
+        if written:
+            os.replace(temp_file, merged_file)
+    finally:
+        temp_file.unlink(missing_ok=True)
+    log.info(f"Wrote {written} {table_name} records to {merged_file.name}")
+    return written
+
+
+def _pan_store_dir(output, table_name, filename):
+    return Path(output, f"pan_London_{filename}_{table_name}")
+
+
+# Partition of the pan-London data store that holds the records of an existing pan file without an LA
+MISSING_LA = "LA missing"
+
+
+def la_partitions(df):
+    """
+    Splits pan-London data into a DataFrame per LA, in the order the LAs first appear. Records without an LA are
+    kept together in the MISSING_LA partition, rather than being dropped as groupby drops missing keys
+    """
+    missing = df["LA"].isnull().to_numpy()
+    partitions = {
+        str(la): la_df.reset_index(drop=True)
+        for la, la_df in df[~missing].groupby("LA", sort=False, observed=True)
+    }
+    if missing.any():
+        log.warning(
+            f"{missing.sum()} records have no LA, keeping them in the '{MISSING_LA}' partition"
+        )
+        partitions[MISSING_LA] = df[missing].reset_index(drop=True)
+    return partitions
+
+
+def _split_pan_file(output_file, temp_dir, table_name, dtypes, dates, chunksize):
+    """
+    Splits the pan file into a partition per LA in the given directory, reading it in chunks. The records of each
+    chunk are set aside per LA and each LA's partition is put together from them in turn
+    """
+    pieces_dir = Path(temp_dir, "pieces")
+    pieces = {}
+    chunks = read_file_chunks(
+        output_file, table_name, dtypes=dtypes, dates=dates, chunksize=chunksize
+    )
+    for number, old_df in enumerate(chunks):
+        for la, la_df in la_partitions(old_df).items():
+            name = str(number)
+            pieces.setdefault(la, []).append(name)
+            write_store(Path(pieces_dir, la), {name: la_df})
+    for la, names in pieces.items():
+        la_pieces = read_store(Path(pieces_dir, la), names)
+        write_store(
+            temp_dir,
+            {la: concat_dfs([la_pieces[name] for name in names], ignore_index=True)},
+        )
+    shutil.rmtree(pieces_dir, ignore_errors=True)
+
+
+def save_la_partition(
+    output,
+    table_name,
+    df,
+    la_name,
+    filename,
+    dtypes=None,
+    dates=None,
+    chunksize=None,
+):
+    """
+    Writes the new LA data to the pan-London data store for the file type, which holds one parquet partition per
+    LA, so only this LA's partition is replaced. The partitions keep the column types of the data, e.g. category,
+    Int64 and datetime64, and can be read back by any pandas version. If there is no store yet but there is a pan
+    file, the pan file is first split into a partition per LA, with any records without an LA kept in the
+    MISSING_LA partition, reading it with the same column types and dates as the new file, a chunk of chunksize
+    records at a time if chunksize is given
+    """
+    store_dir = _pan_store_dir(output, table_name, filename)
     output_file = Path(output, f"pan_London_{filename}_{table_name}.csv")
-    if output_file.is_file():
-        old_df = pd.read_csv(output_file, index_col=None)
-        df = _merge_dfs(df, old_df, la_name)
-    return df
+    if not store_dir.is_dir() and output_file.is_file():
+        temp_dir = Path(output, f"{store_dir.name}.tmp")
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        if chunksize:
+            _split_pan_file(output_file, temp_dir, table_name, dtypes, dates, chunksize)
+        else:
+            old_df = read_file(output_file, table_name, dtypes=dtypes, dates=dates)
+            write_store(temp_dir, la_partitions(old_df))
+        os.replace(temp_dir, store_dir)
+    write_store(store_dir, {la_name: df.reset_index(drop=True)})
+
+
+def read_pan_store(output, table_name, filename):
+    """
+    Reads every LA partition of the pan-London data store for the file type as a single DataFrame, with the LAs
+    in alphabetical order
+    """
+    partitions = read_store(_pan_store_dir(output, table_name, filename))
+    return concat_dfs(list(partitions.values()), ignore_index=True)
+
+
+def export_pan_store(output, table_name, filename):
+    """
+    Writes the pan-London file from the data store one LA partition at a time, to a temporary file that then
+    replaces the pan file, so the pan-London data never has to be held in memory at once
+    """
+    store_dir = _pan_store_dir(output, table_name, filename)
+    output_path = Path(output, f"pan_London_{filename}_{table_name}.csv")
+    temp_path = Path(output, f"pan_London_{filename}_{table_name}.csv.tmp")
+    columns = None
+    try:
+        for name in store_tables(store_dir):
+            df = read_store(store_dir, [name])[name]
+            if columns is None:
+                columns = df.columns
+                df.to_csv(temp_path, index=False)
+            else:
+                df.reindex(columns=columns).to_csv(
+                    temp_path, index=False, header=False, mode="a"
+                )
+        if columns is not None:
+            os.replace(temp_path, output_path)
+    finally:
+        temp_path.unlink(missing_ok=True)
 
 
 def export_pan_file(output, table_name, df, filename):
@@ -0,0 +1,69 @@
+import hashlib
+from functools import lru_cache
+
+from decouple import config
+
+
+class Pseudonymiser:
+    """
+    Replaces identifiers, such as social worker SWE numbers, with a salted SHA3-256 hash represented in HEX
+
+    The secret used as the salt is loaded once and every hash is memoised, so an identifier that appears in
+    several files (e.g. the same worker in every census year) is only hashed once. The memo is only ever held in
+    memory: a table of identifiers and their hashes would allow the hashes to be reversed, so it is never
+    written to disk.
+    """
+
+    def __init__(self, secret=None):
+        """
+        :param secret: The salt appended to each identifier, defaults to the sec_str setting
+        """
+        self._secret = config("sec_str", default="") if secret is None else secret
+        self._hashes = {}
+
+    def hash(self, value):
+        """
+        Converts a single identifier to a hash code represented in HEX
+
+        :param value: Identifier to be converted
+        :return: Hash code version of the identifier
+        """
+        value = str(value)
+        try:
+            return self._hashes[value]
+        except KeyError:
+            digest = hashlib.sha3_256((value + self._secret).encode()).hexdigest()
+            self._hashes[value] = digest
+            return digest
+
+    def hash_values(self, values):
+        """
+        Hash a batch of identifiers, hashing each distinct identifier once
+
+        :param values: An iterable of identifiers
+        :return: Dictionary of identifier to hash code
+        """
+        return {value: self.hash(value) for value in set(values)}
+
+    def hash_series(self, series):
+        """
+        Replace a column of identifiers with their hash codes, leaving blank values unchanged
+
+        :param series: A pandas Series of identifiers
+        :return: A Series with every non-blank identifier replaced by its hash code
+        """
+        present = series.notna() & series.astype(str).ne("")
+        lookup = self.hash_values(series[present])
+        hashed = series.copy()
+        hashed[present] = series[present].map(lookup)
+        return hashed
+
+
+@lru_cache(maxsize=None)
+def swe_pseudonymiser():
+    """
+    The Pseudonymiser shared by every SWENo hashing step, created on first use
+
+    :return: Pseudonymiser using the sec_str secret
+    """
+    return Pseudonymiser()
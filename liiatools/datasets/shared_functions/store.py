@@ -0,0 +1,151 @@
+import logging
+import os
+import re
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+SUFFIX = ".parquet"
+
+
+def natural_key(name):
+    """
+    Sort key that orders numbered names naturally e.g. List 2 before List 10
+    """
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)]
+
+
+# Types of the values of mixed type columns, in the order they are checked, with how each is written as text and
+# read back
+_VALUE_TYPES = {
+    "bool": ((bool, np.bool_), str, lambda text: text == "True"),
+    "int": ((int, np.integer), str, int),
+    "float": ((float, np.floating), repr, float),
+    "datetime": ((datetime,), lambda value: value.isoformat(), pd.Timestamp),
+    "date": ((date,), lambda value: value.isoformat(), date.fromisoformat),
+    "str": ((str,), str, str),
+}
+
+
+def _type_column(column):
+    return f"__type__:{column}"
+
+
+def _value_type(value):
+    for name, (types, _, _) in _VALUE_TYPES.items():
+        if isinstance(value, types):
+            return name
+    return "str"
+
+
+def _encode_mixed_columns(df):
+    """
+    Parquet columns hold a single type, so each object column mixing types, e.g. numbers and text, is written as
+    text with a column holding the type of each value, so read_store can give each value its type back. Missing
+    values are kept as missing
+    """
+    mixed = [
+        column
+        for column in df.columns
+        if df[column].dtype == object
+        and pd.api.types.infer_dtype(df[column]).startswith("mixed")
+        and pd.api.types.infer_dtype(df[column]) != "mixed-integer-float"
+    ]
+    if not mixed:
+        return df
+    log.debug(f"Storing mixed type columns {mixed} as text with their value types")
+    df = df.copy()
+    for column in mixed:
+        values = df[column]
+        present = values.notnull()
+        types = values[present].map(_value_type)
+        text = pd.Series(None, index=values.index, dtype=object)
+        for name in types.unique():
+            to_text = _VALUE_TYPES[name][1]
+            selected = types.index[types == name]
+            text[selected] = values[selected].map(to_text)
+        df[column] = text
+        df[_type_column(column)] = types.reindex(values.index)
+    return df
+
+
+def _decode_mixed_columns(df):
+    """
+    Gives the values of the mixed type columns written by _encode_mixed_columns their types back. Missing values
+    are read as NaN, as they are by pd.read_excel
+    """
+    for column in [column for column in df.columns if _type_column(column) in df]:
+        types = df.pop(_type_column(column))
+        values = pd.Series(np.nan, index=df.index, dtype=object)
+        for name in types.dropna().unique():
+            from_text = _VALUE_TYPES[name][2]
+            selected = types.index[types == name]
+            values[selected] = df.loc[selected, column].map(from_text)
+        df[column] = values
+    return df
+
+
+def read_store(store_dir, names=None):
+    """
+    Reads the tables held in a store directory, written by write_store, as a dictionary of DataFrames
+
+    :param store_dir: Location of the store directory, usable by a Path function
+    :param names: Optional list of the tables to read, defaults to every table in the store
+    :return: Dictionary of table name to DataFrame, in natural order of table name
+    """
+    files = {file.stem: file for file in Path(store_dir).glob(f"*{SUFFIX}")}
+    if names is not None:
+        files = {name: files[name] for name in names}
+    return {
+        name: _decode_mixed_columns(pd.read_parquet(files[name]))
+        for name in sorted(files, key=natural_key)
+    }
+
+
+def store_tables(store_dir):
+    """
+    Lists the tables held in a store directory, without reading them
+
+    :param store_dir: Location of the store directory, usable by a Path function
+    :return: List of table names, in natural order
+    """
+    return sorted(
+        (file.stem for file in Path(store_dir).glob(f"*{SUFFIX}")), key=natural_key
+    )
+
+
+def write_store(store_dir, frames):
+    """
+    Writes each DataFrame to its own parquet file in the store directory, keeping the column types as they are.
+    Object columns that mix types are written as text with the type of each value, which read_store gives back
+    to each value. Parquet is columnar and does not depend
+    on the pandas version that wrote it, unlike pickle. Each file is written to a temporary file first and then
+    moved into place, so an interrupted run never leaves a partly written table behind
+
+    :param store_dir: Location of the store directory, usable by a Path function
+    :param frames: Dictionary of table name to DataFrame
+    :return: None
+    """
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    for name, df in frames.items():
+        store_file = Path(store_dir, f"{name}{SUFFIX}")
+        temp_file = Path(store_dir, f"{name}{SUFFIX}.tmp")
+        _encode_mixed_columns(df).to_parquet(temp_file)
+        os.replace(temp_file, store_file)
+
+
+def remove_from_store(store_dir, names):
+    """
+    Deletes tables from the store directory, ignoring any that are not there
+
+    :param store_dir: Location of the store directory, usable by a Path function
+    :param names: Iterable of table names
+    :return: None
+    """
+    for name in names:
+        Path(store_dir, f"{name}{SUFFIX}").unlink(missing_ok=True)
@@ -1,13 +1,24 @@
 import os
+from pathlib import Path
+import yaml
 import pandas as pd
 import numpy as np
 from liiatools.datasets.social_work_workforce.SWFtools.dataprocessing.converter import (
+    LEA_DICT,
     ORG_ROLE_DICT,
     SENIORITY_CODE_DICT,
 )
+from liiatools.spec import common as common_asset_dir
 import liiatools.datasets.social_work_workforce.SWFtools.util.work_path as work_path
 import liiatools.datasets.social_work_workforce.SWFtools.util.AppLogs as AppLogs
 
+COMMON_CONFIG_DIR = Path(common_asset_dir.__file__).parent
+# Map the three-letter LA codes to LA names so any LA can be used in the forecast
+with open(f"{COMMON_CONFIG_DIR}/LA-codes.yml") as las:
+    LA_NAME_DICT = {
+        code: name for name, code in yaml.full_load(las)["data_codes"].items()
+    }
+
 
 def seniority():
     """
@@ -117,18 +128,98 @@ def seniority():
     df.to_csv(fileOut, index=False)
 
 
-def seniority_forecast_04():
+def lea_name(lea) -> str:
+    """
+    Normalise an LEA identifier to the LEA name used in the flat files
+
+    Accepts the LEA number used in the census (e.g. "301", see LEA_DICT), the three-letter code from
+    LA-codes.yml (e.g. "BAD") or the LEA name itself
+
+    :param lea: LEA number, three-letter LA code or LEA name
+    :return: The LEA name
+    """
+    lea = str(lea).strip()
+    if lea in LEA_DICT:
+        return LEA_DICT[lea]
+    return LA_NAME_DICT.get(lea.upper(), lea)
+
+
+def growth_table_long(p_df: pd.DataFrame) -> pd.DataFrame:
     """
-    Calculate the seniority forecast for six LEAs from 2020 to 2025.
+    Convert a population growth table to long format with one row per LEA and year
+
+    The table can either be wide, with a LEAName column and one column per year (the layout written by
+    growth_tables), or already long with LEAName, Year and Population columns
+
+    :param p_df: Population growth table
+    :return: Dataframe with columns LEAName, Year and Population
+    """
+    if "Year" in p_df.columns:
+        long_df = p_df[["LEAName", "Year", "Population"]].copy()
+    else:
+        long_df = p_df.melt(id_vars="LEAName", var_name="Year", value_name="Population")
+    long_df["LEAName"] = long_df["LEAName"].map(lea_name)
+    long_df["Year"] = long_df["Year"].astype(int)
+    return long_df
+
+
+def forecast_fte(
+    df: pd.DataFrame,
+    growth_long: pd.DataFrame,
+    base_year: int,
+    horizon: int,
+    value_column: str = "FTESum",
+) -> pd.DataFrame:
+    """
+    Forecast FTE for each row of df by chaining population growth from the base year
+
+    Chaining year on year growth, (FTE / population_before) * population_next, reduces to
+    FTE * population_year / population_base_year, so every year of the horizon is computed in one step.
+    Rows whose LEA has no population data are left blank for the forecast years. Where the growth table has
+    more than one row for the same LEA and year, e.g. one given by LEA number and one by name, the first is used.
+
+    :param df: Dataframe containing LEAName and the FTE values in value_column
+    :param growth_long: Population growth table in long format, see growth_table_long
+    :param base_year: The year of the FTE values in value_column
+    :param horizon: The number of years to forecast after the base year
+    :param value_column: The column containing the FTE values (default FTESum)
+    :return: Dataframe with value_column replaced by one column per year from base_year to base_year + horizon
+    """
+    years = list(range(base_year, base_year + horizon + 1))
+
+    growth = growth_long[growth_long["Year"].isin(years)]
+    growth = growth.drop_duplicates(subset=["LEAName", "Year"], keep="first")
+    factors = growth.pivot(index="LEAName", columns="Year", values="Population")
+    factors = factors.reindex(columns=years)
+    factors = factors.div(factors[base_year], axis=0)
+
+    lea_factors = factors.reindex(df["LEAName"].map(lea_name)).to_numpy()
+    values = df[value_column].to_numpy(dtype=float)
+    forecast = pd.DataFrame(
+        lea_factors * values[:, np.newaxis],
+        columns=[str(year) for year in years],
+        index=df.index,
+    )
+    forecast[str(base_year)] = values
+
+    df = df.drop(columns=[value_column])
+    return pd.concat([df, forecast.round(3)], axis=1)
+
+
+def seniority_forecast_04(base_year: int = 2020, horizon: int = 5):
+    """
+    Calculate the seniority forecast for each LEA from the base year over the given horizon.
 
     Reads two Excel files. The seniority forecast is calculated by multiplying the FTESum from the first file
-    by the population growth rate for each year and LEA from the second file
+    by the population growth since the base year for each year and LEA from the second file
 
+    :param base_year: The year of the FTESum values (default 2020)
+    :param horizon: The number of years to forecast (default 5)
     :return: Excel file with the name seniority_forecast_04_clean.xlsx
     """
 
     # ===== Read file ===== #
-    file = "FTESum_2020.xlsx"
+    file = f"FTESum_{base_year}.xlsx"
     requestPath = work_path.request
     pathFile = os.path.join(requestPath, file)
     try:
@@ -139,61 +230,18 @@ def seniority_forecast_04():
 
     if dfSen.empty:
         AppLogs.log(
-            "seniority_forecast_04 error: No data in FTESum_2020.xlsx",
+            f"seniority_forecast_04 error: No data in {file}",
             console_output=True,
         )
     else:
-        # ===== Rename column ===== #
-        dfSen.rename(columns={"FTESum": "2020"}, inplace=True)
-
         # ===== Read file ===== #
         file = "population_growth_table.xlsx"
         requestPath = work_path.request
         pathFile = os.path.join(requestPath, file)
-        p_df = pd.read_excel(pathFile)
-
-        countYearBefore = 2019
-        countYearNext = 2020
-        for count in range(5):
-            countYearBefore = countYearBefore + 1
-            countYearNext = countYearNext + 1
-            # Havering
-            dfSen.loc[dfSen["LEAName"] == "Havering", str(countYearNext)] = (
-                dfSen[str(countYearBefore)] / p_df.loc[0, str(countYearBefore)]
-            ) * p_df.loc[0, str(countYearNext)]
-            # Barking and Dagenham
-            dfSen.loc[
-                dfSen["LEAName"] == "Barking and Dagenham", str(countYearNext)
-            ] = (
-                dfSen[str(countYearBefore)] / p_df.loc[1, str(countYearBefore)]
-            ) * p_df.loc[
-                1, str(countYearNext)
-            ]
-            # Redbridge
-            dfSen.loc[dfSen["LEAName"] == "Redbridge", str(countYearNext)] = (
-                dfSen[str(countYearBefore)] / p_df.loc[2, str(countYearBefore)]
-            ) * p_df.loc[2, str(countYearNext)]
-            # Newham
-            dfSen.loc[dfSen["LEAName"] == "Newham", str(countYearNext)] = (
-                dfSen[str(countYearBefore)] / p_df.loc[3, str(countYearBefore)]
-            ) * p_df.loc[3, str(countYearNext)]
-            # Tower Hamlets
-            dfSen.loc[dfSen["LEAName"] == "Tower Hamlets", str(countYearNext)] = (
-                dfSen[str(countYearBefore)] / p_df.loc[4, str(countYearBefore)]
-            ) * p_df.loc[4, str(countYearNext)]
-            # Waltham Forest
-            dfSen.loc[dfSen["LEAName"] == "Waltham Forest", str(countYearNext)] = (
-                dfSen[str(countYearBefore)] / p_df.loc[5, str(countYearBefore)]
-            ) * p_df.loc[5, str(countYearNext)]
-
-        dfSen["2020"] = dfSen["2020"].round(3)
-        dfSen["2021"] = dfSen["2021"].round(3)
-        dfSen["2022"] = dfSen["2022"].round(3)
-        dfSen["2023"] = dfSen["2023"].round(3)
-        dfSen["2024"] = dfSen["2024"].round(3)
-        dfSen["2025"] = dfSen["2025"].round(3)
+        p_df = growth_table_long(pd.read_excel(pathFile))
 
         dfSen = dfSen.drop(["YearCensus"], axis=1)
+        dfSen = forecast_fte(dfSen, p_df, base_year, horizon)
 
         # ===== Save and export file ===== #
         fileOutN = "seniority_forecast_04_clean.xlsx"
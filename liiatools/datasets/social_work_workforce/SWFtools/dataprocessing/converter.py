@@ -1,9 +1,9 @@
 """This file contains constants and functions used in converting and merging XML data from CSWW folder"""
 
-import hashlib
 import datetime as dt
 from typing import Final, Dict, List
-from decouple import config
+
+from liiatools.datasets.shared_functions.pseudonymise import swe_pseudonymiser
 
 
 # === CONSTANTS === #
@@ -96,18 +96,18 @@ def swe_hash(worker: Dict[str, str]):
     :param worker: A dictionary containing worker data
     :return: None
     """
-    swe_num = worker["SWENo"]
-
-    private_string = config("sec_str", default="")
-
-    private_key = swe_num + private_string
+    worker["SWENo"] = swe_pseudonymiser().hash(worker["SWENo"])
 
-    # Preparing plain text (SWENo) to hash it
-    plaintext = private_key.encode()
 
-    hash_algorithm = hashlib.sha3_256(plaintext)
-
-    worker["SWENo"] = hash_algorithm.hexdigest()
+def swe_hash_workers(workers: List[Dict[str, str]]):
+    """
+    Converts the **SWENo** field of every worker to a hash code represented in HEX, hashing each SWENo once
+    :param workers: A list of dictionaries containing worker data
+    :return: None
+    """
+    hashes = swe_pseudonymiser().hash_values(worker["SWENo"] for worker in workers)
+    for worker in workers:
+        worker["SWENo"] = hashes[worker["SWENo"]]
 
 
 def convert_dates(worker: Dict[str, str]):
@@ -185,8 +185,8 @@ def process_all_input_files():
             # === PROCESSING WORKER DATA === #
             AppLog.log("Processing worker data...", console_output=True)
             AppLog.log("Processing worker data...", la_directory.name)
+            converter.swe_hash_workers(workers)
             for worker in workers:
-                converter.swe_hash(worker)
                 converter.convert_dates(worker)
 
             # === WRITING TO CSV === #
@@ -226,6 +226,8 @@ def process_all_input_files():
 
             processed_files_count = processed_files_count + 1
 
+        AppLog.flush(la_directory.name)
+
     AppLog.log(
         f"Finished processing {processed_files_count} files in {len(la_directories)} directories.",
         console_output=True,
@@ -0,0 +1,53 @@
+"""
+Scaling benchmark for worker validation. Generates sample files of increasing size and times
+get_valid_worker_data over every worker, so that the time per worker can be checked to stay flat.
+
+Usage: python -m liiatools.datasets.social_work_workforce.SWFtools.dataprocessing.validation.benchmark [sizes]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import lxml.etree as etree
+
+import liiatools.datasets.social_work_workforce.SWFtools.dataprocessing.validation.validator as validator
+from liiatools.datasets.social_work_workforce.lds_csww_data_generator.sample_data import (
+    generate_sample_sections,
+)
+from liiatools.datasets.social_work_workforce.lds_csww_data_generator.stream import (
+    write_xml,
+)
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+def benchmark(workers: int) -> float:
+    """
+    Validates every worker of a generated sample file
+
+    :param workers: The number of workers in the sample file
+    :return: The time taken to validate all workers, in seconds
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "benchmark.xml")
+        write_xml(generate_sample_sections(workers=workers, seed=workers), path)
+        parsed_xml = etree.parse(path)
+
+    validation_errors = []
+    start = time.perf_counter()
+    for worker in parsed_xml.iter("CSWWWorker"):
+        validator.get_valid_worker_data(worker, validation_errors)
+    return time.perf_counter() - start
+
+
+def main(sizes):
+    print(f"{'workers':>10} {'seconds':>10} {'us/worker':>10}")
+    for workers in sizes:
+        seconds = benchmark(workers)
+        print(f"{workers:>10} {seconds:>10.3f} {seconds / workers * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or DEFAULT_SIZES)
@@ -1,6 +1,7 @@
 """Functions for validating XML files of LAs and getting validated worker data"""
 
-from typing import List, Dict, Final
+from dataclasses import dataclass
+from typing import Callable, List, Dict, Final
 
 import lxml.etree as etree
 
@@ -15,6 +16,25 @@ from liiatools.datasets.social_work_workforce.SWFtools.dataprocessing.validation
 
 CIN_XML_SCHEMA: Final = xmlschema.XMLSchema11(XML_SCHEMA)
 WORKER_SCHEMA: Final = CIN_XML_SCHEMA.find("//CSWWWorker")
+
+
+def __compile_worker_schema(schema_path: str) -> etree.XMLSchema:
+    """
+    Compiles the workforce schema with libxml2, declaring CSWWWorker as a global element so that a single worker
+    element can be checked on its own. Used as a fast check before the detailed (and much slower) xmlschema
+    validation, which is then only needed for workers that have errors.
+    """
+    schema_document = etree.parse(schema_path)
+    etree.SubElement(
+        schema_document.getroot(),
+        "{http://www.w3.org/2001/XMLSchema}element",
+        name="CSWWWorker",
+        type="workertype",
+    )
+    return etree.XMLSchema(schema_document)
+
+
+WORKER_SCHEMA_COMPILED: Final = __compile_worker_schema(XML_SCHEMA)
 NON_AGENCY_MANDATORY_TAG: Final = [
     "PersonBirthDate",
     "GenderCurrent",
@@ -151,6 +171,79 @@ def __is_message_format_valid(
     return can_continue
 
 
+@dataclass(frozen=True)
+class WorkerRule:
+    """
+    A validation rule evaluated on the children of a single CSWWWorker element.
+
+    :param tag: The tag reported in the validation error
+    :param cause: The cause reported in the validation error
+    :param fails: Takes a dictionary of the worker's child elements by tag and returns 'True' if the rule is broken
+    :param on_tag_line: Report the line of the tag itself rather than the line of the worker element
+    """
+
+    tag: str
+    cause: ERROR_CAUSE
+    fails: Callable[[Dict[str, etree.Element]], bool]
+    on_tag_line: bool = False
+
+
+def __is_agency_worker(children: Dict[str, etree.Element]) -> bool:
+    return "AgencyWorker" in children and children["AgencyWorker"].text == "1"
+
+
+def __is_leaver(children: Dict[str, etree.Element]) -> bool:
+    return "RoleEndDate" in children
+
+
+def __non_agency_mandatory_rule(tag: str) -> WorkerRule:
+    return WorkerRule(
+        tag,
+        ERROR_CAUSE.NON_AGENCY_MANDATORY_MISSING,
+        lambda children: not __is_agency_worker(children) and tag not in children,
+    )
+
+
+def __leaver_rules(tag: str) -> List[WorkerRule]:
+    return [
+        WorkerRule(
+            tag,
+            ERROR_CAUSE.MISSING_TAG,
+            lambda children: __is_leaver(children) and tag not in children,
+        ),
+        WorkerRule(
+            tag,
+            ERROR_CAUSE.LEAVER_UNEXPECTED,
+            lambda children: not __is_leaver(children) and tag in children,
+        ),
+    ]
+
+
+# Worker rules in the order their errors are reported
+WORKER_RULES: Final[List[WorkerRule]] = [
+    # If a worker is a non-agency worker, check that mandatory tags are present
+    *[__non_agency_mandatory_rule(tag) for tag in NON_AGENCY_MANDATORY_TAG],
+    # Starters must have a start origin and only starters can have one (eXclusive OR)
+    WorkerRule(
+        "StartOrigin",
+        ERROR_CAUSE.MISSING_TAG,
+        lambda children: ("RoleStartDate" in children) ^ ("StartOrigin" in children),
+    ),
+    # Leavers must have an FTE of 0
+    WorkerRule(
+        "FTE",
+        ERROR_CAUSE.LEAVER_FTE,
+        lambda children: __is_leaver(children)
+        and "FTE" in children
+        and children["FTE"].text != "0",
+        on_tag_line=True,
+    ),
+    # Leavers must have a reason for leaving and a destination, other workers must not
+    *__leaver_rules("ReasonLeave"),
+    *__leaver_rules("LeaverDestination"),
+]
+
+
 def get_valid_worker_data(
     worker_element: etree.Element, error_list: List[ValidationError]
 ) -> Dict[str, str]:
@@ -158,6 +251,8 @@ def get_valid_worker_data(
     Takes in a worker element (lxml.etree), validates it and returns the worker data as a dictionary
     or **'None'** if the worker data is invalid.
 
+    Only the worker's own child elements are read, so validating a file is linear in the number of workers.
+
     :param worker_element: A tree element (lxml.etree) that has the tag 'CSWWWorker' .
     :param error_list: A list where all validation errors are placed into.
     :return: A dictionary that contains the worker data. Child tags are the keys and
@@ -165,75 +260,26 @@ def get_valid_worker_data(
     """
 
     # === XML SCHEMA VALIDATION ===
-    va: List[ValidationError] = list(
-        map(convert_schema_error, WORKER_SCHEMA.iter_errors(worker_element))
-    )
+    # Detailed errors are only collected for workers that fail the compiled schema check
+    va: List[ValidationError] = []
+    if not WORKER_SCHEMA_COMPILED.validate(worker_element):
+        va.extend(map(convert_schema_error, WORKER_SCHEMA.iter_errors(worker_element)))
 
     # === BUILDING WORKER DATA SET; FURTHER VALIDATION ===
-    worker_data = {}
-
-    for elem in worker_element:
-        worker_data[elem.tag] = elem.text
-
-    is_agency_worker = worker_data["AgencyWorker"] == "1"
-    is_leaver = "RoleEndDate" in worker_data
-    is_starter = "RoleStartDate" in worker_data
-
-    # Validation rules if the worker is a non-agency worker
-    if not is_agency_worker:
-        # If a worker is a non-agency worker, check that mandatory tags are present
-        for tag in NON_AGENCY_MANDATORY_TAG:
-            if tag not in worker_data:
-                va.append(
-                    ValidationError(
-                        ERROR_CAUSE.NON_AGENCY_MANDATORY_MISSING,
-                        tag,
-                        worker_element.sourceline,
-                    )
-                )
-
-    # Validation rules if the worker is a starter (condition checked via eXclusive OR)
-    if is_starter ^ ("StartOrigin" in worker_data):
-        va.append(
-            ValidationError(
-                ERROR_CAUSE.MISSING_TAG, "StartOrigin", worker_element.sourceline
-            )
-        )
-
-    # Validation rules if the worker is a leaver
-    if is_leaver and worker_data["FTE"] != "0":
-        sourceline = worker_element.xpath("//FTE")[0].sourceline
-        va.append(ValidationError(ERROR_CAUSE.LEAVER_FTE, "FTE", sourceline))
-
-    if is_leaver ^ ("ReasonLeave" in worker_data):
-        if is_leaver:
-            va.append(ERROR_CAUSE.MISSING_TAG, "ReasonLeave", worker_element.sourceline)
-        else:
-            va.append(
-                ValidationError(
-                    ERROR_CAUSE.LEAVER_UNEXPECTED,
-                    "ReasonLeave",
-                    worker_element.sourceline,
-                )
-            )
-
-    if is_leaver ^ ("LeaverDestination" in worker_data):
-        if is_leaver:
-            va.append(
-                ERROR_CAUSE.MISSING_TAG, "LeaverDestination", worker_element.sourceline
-            )
-        else:
-            va.append(
-                ValidationError(
-                    ERROR_CAUSE.LEAVER_UNEXPECTED,
-                    "LeaverDestination",
-                    worker_element.sourceline,
-                )
+    children = {elem.tag: elem for elem in worker_element}
+
+    for rule in WORKER_RULES:
+        if rule.fails(children):
+            sourceline = (
+                children[rule.tag].sourceline
+                if rule.on_tag_line
+                else worker_element.sourceline
             )
+            va.append(ValidationError(rule.cause, rule.tag, sourceline))
 
     # If there are any errors the element is invalid, return None and move on
     if len(va) != 0:
         error_list.extend(va)
         return None
 
-    return worker_data
+    return {tag: elem.text for tag, elem in children.items()}
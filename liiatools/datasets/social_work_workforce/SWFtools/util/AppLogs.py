@@ -1,5 +1,6 @@
 """A script to write text to log files and terminal"""
 
+import atexit
 import os
 import platform
 import sys
@@ -8,9 +9,13 @@ from pathlib import Path
 from typing import List, Final, Dict
 
 import liiatools.datasets.social_work_workforce.SWFtools.util.work_path as work_path
+from liiatools.datasets.shared_functions.logger import LogSink
 
 log_paths: Dict[str, str] = {}
 
+# Log entries are buffered and written to each log file when it is flushed, at the latest when the program exits
+log_sink = LogSink()
+
 TIME_FORMAT_FILE_NAME: Final[str] = "%d_%m_%Y_%H_%M_%S"
 TIME_FORMAT_LOG_ENTRY: Final[str] = "%d/%m/%Y at %H:%M:%S"
 
@@ -75,12 +80,10 @@ def log(
         if log_dir_name in log_paths:
             if console_output:
                 __write_to_log_file_verbose(
-                    log_text, entry_time_stamp, "a", log_paths[log_dir_name]
+                    log_text, entry_time_stamp, log_paths[log_dir_name]
                 )
             else:
-                __write_to_log_file(
-                    log_text, entry_time_stamp, "a", log_paths[log_dir_name]
-                )
+                __write_to_log_file(log_text, entry_time_stamp, log_paths[log_dir_name])
 
         # If log_id was not found in log_files dictionary, check if it matches to any LA directories and create
         # it in its respective directory
@@ -95,44 +98,55 @@ def log(
 
             if console_output:
                 __write_to_log_file_verbose(
-                    log_text, entry_time_stamp, "w", log_paths[log_dir_name]
+                    log_text, entry_time_stamp, log_paths[log_dir_name]
                 )
             else:
-                __write_to_log_file(
-                    log_text, entry_time_stamp, "w", log_paths[log_dir_name]
-                )
+                __write_to_log_file(log_text, entry_time_stamp, log_paths[log_dir_name])
 
     except Exception as e:
         print("An error occurred when writing into the log file.\nError message:\n")
         print(e)
 
 
-def __write_to_log_file(
-    log_text: str | List[str], entry_time_stamp: str, mode: str, path: str
-):
-    multiple_lines = type(log_text) is list
+def flush(log_dir_name: str | None = None):
+    """
+    Writes the buffered entries of a log file, or of every log file, to disk.
+    :param log_dir_name: Log id of the log file to write, as passed to log(). If no value is passed every log file
+    is written
+    :return: None
+    """
+    try:
+        if log_dir_name is None:
+            log_sink.flush()
+        elif log_dir_name in log_paths:
+            log_sink.flush(log_paths[log_dir_name])
+    except Exception as e:
+        print("An error occurred when writing into the log file.\nError message:\n")
+        print(e)
+
 
-    with open(path, mode) as file:
-        if multiple_lines:
-            for line in log_text:
-                file.write(f"[{entry_time_stamp}]: {line}\n")
-        else:
-            file.write(f"[{entry_time_stamp}]: {log_text}\n")
+atexit.register(flush)
+
+
+def __write_to_log_file(log_text: str | List[str], entry_time_stamp: str, path: str):
+    lines = log_text if type(log_text) is list else [log_text]
+
+    for line in lines:
+        log_sink.write(
+            path,
+            f"[{entry_time_stamp}]: {line}\n",
+            record={"time": entry_time_stamp, "message": line},
+        )
 
 
 def __write_to_log_file_verbose(
-    log_text: str | List[str], entry_time_stamp: str, mode: str, path: str
+    log_text: str | List[str], entry_time_stamp: str, path: str
 ):
-    multiple_lines = type(log_text) is list
+    __write_to_log_file(log_text, entry_time_stamp, path)
 
-    with open(path, mode) as file:
-        if multiple_lines:
-            for line in log_text:
-                file.write(f"[{entry_time_stamp}]: {line}\n")
-                print(f"[{entry_time_stamp}]: {line}")
-        else:
-            file.write(f"[{entry_time_stamp}]: {log_text}\n")
-            print(f"[{entry_time_stamp}]: {log_text}")
+    lines = log_text if type(log_text) is list else [log_text]
+    for line in lines:
+        print(f"[{entry_time_stamp}]: {line}")
 
 
 def log_footer(total_time: float):
@@ -148,3 +162,4 @@ def log_footer(total_time: float):
     ]
 
     log(text)
+    flush()
@@ -74,15 +74,43 @@ def cleanfile(input, la_code, la_log_dir, output):
     type=str,
     help="A string specifying the output file location, including the file name and suffix",
 )
+@click.option(
+    "--workers",
+    required=False,
+    type=click.IntRange(min=1),
+    help="The number of workers to generate, a random number between 1 and 50 if not given",
+)
+@click.option(
+    "--seed",
+    required=False,
+    type=int,
+    help="Seed for the random number generator, the same seed always produces the same file",
+)
+@click.option(
+    "--lea",
+    required=False,
+    type=str,
+    help="A three digit LEA code to use in the file header, random if not given",
+)
+@click.option(
+    "--year",
+    required=False,
+    type=int,
+    help="The census year to use in the file header, 2022 if not given",
+)
 @click_log.simple_verbosity_option(log)
-def generate_sample(output: str):
+def generate_sample(output: str, workers, seed, lea, year):
     """
     Export a sample file for testing
 
     :param output: string containing the desired location and name of sample file
+    :param workers: number of workers to generate
+    :param seed: seed for the random number generator
+    :param lea: three digit LEA code to use in the header
+    :param year: census year to use in the header
     :return: .xml sample file in desired location
     """
-    output = csww_main_functions.generate_sample(output)
+    output = csww_main_functions.generate_sample(output, workers, seed, lea, year)
     return output
 
 
@@ -101,14 +129,30 @@ def generate_sample(output: str):
     type=str,
     help="A string specifying the output directory location",
 )
-def la_agg(input, output):
+@click.option(
+    "--incremental",
+    is_flag=True,
+    default=False,
+    help="Merge the file into the merged data store kept in the output directory, only comparing the new records with the existing ones",
+)
+@click.option(
+    "--chunksize",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Read and merge the existing merged file this number of records at a time, to limit memory use. Cannot be used with --incremental",
+)
+def la_agg(input, output, incremental, chunksize):
     """
     Joins data from newly cleaned CSWW files (output of cleanfile()) to existing CSWW files data for the depositing local authority
     :param input: should specify the input file location, including file name and suffix, and be usable by a Path function
     :param output: should specify the path to the output folder
+    :param incremental: if True the file is merged into the LA's store of the merged file, comparing only the new records with an index of the existing ones
+    :param chunksize: if given the existing merged file is read and merged this number of records at a time
     :return: None
     """
-    csww_main_functions.la_agg(input, output)
+    csww_main_functions.la_agg(
+        input, output, incremental=incremental, chunksize=chunksize
+    )
 
 
 @csww.command()
@@ -132,12 +176,28 @@ def la_agg(input, output):
     type=str,
     help="A string specifying the output directory location",
 )
-def pan_agg(input, la_code, output):
+@click.option(
+    "--no_csv",
+    is_flag=True,
+    default=False,
+    help="Only update the local authority's partition of the pan-London data store, without writing the csv file",
+)
+@click.option(
+    "--chunksize",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Read and write the pan-London data this number of records, or one LA, at a time, to limit memory use",
+)
+def pan_agg(input, la_code, output, no_csv, chunksize):
     """
     Joins data from newly merged social work workforce file (output of la-agg()) to existing pan-London social work workforce data
     :param input: should specify the input file location, including file name and suffix, and be usable by a Path function
     :param la_code: should be a three-letter string for the local authority depositing the file
     :param output: should specify the path to the output folder
+    :param no_csv: if True only the LA's partition of the pan-London data store is updated and the pan-London csv file is not written
+    :param chunksize: if given the pan-London data is read and written this number of records, or one LA, at a time
     :return: None
     """
-    csww_main_functions.pan_agg(input, la_code, output)
+    csww_main_functions.pan_agg(
+        input, la_code, output, no_csv=no_csv, chunksize=chunksize
+    )
@@ -4,18 +4,14 @@ import yaml
 
 # Dependencies for generate_sample()
 from liiatools.datasets.social_work_workforce.lds_csww_data_generator.sample_data import (
-    generate_sample_csww_file,
+    generate_sample_sections,
 )
 from liiatools.datasets.social_work_workforce.lds_csww_data_generator.stream import (
-    consume,
+    write_xml,
 )
 
 # Dependencies for cleanfile()
-from liiatools.datasets.social_work_workforce.lds_csww_clean.parse import (
-    etree,
-    to_xml,
-    dom_parse,
-)
+from liiatools.datasets.social_work_workforce.lds_csww_clean.parse import dom_parse
 from liiatools.datasets.social_work_workforce.lds_csww_clean.schema import (
     Schema,
     FilePath,
@@ -66,25 +62,28 @@ YEAR_START_MONTH = 1
 REFERENCE_DATE = datetime.now()
 
 
-def generate_sample(output: str):
+def generate_sample(output: str, workers=None, seed=None, lea=None, year=None):
     """
-    Export a sample file for testing
+    Export a sample file for testing. The file is written one worker at a time so memory use stays constant
+    however many workers are generated, and the same seed and options always produce the same file
 
     :param output: string containing the desired location and name of sample file
+    :param workers: number of workers to generate (default: a random number between 1 and 50)
+    :param seed: seed for the random number generator (default: unseeded)
+    :param lea: three digit LEA code to use in the header (default: random)
+    :param year: census year to use in the header (default: 2022)
     :return: .xml sample file in desired location
     """
+    options = {"workers": workers, "seed": seed}
+    if lea is not None:
+        options["lea"] = lea
+    if year is not None:
+        options["year"] = year
 
-    stream = generate_sample_csww_file()
-    builder = etree.TreeBuilder()
-    stream = to_xml(stream, builder)
-    consume(stream)
-
-    element = builder.close()
-    element = etree.tostring(element, encoding="utf-8", pretty_print=True)
+    sections = generate_sample_sections(**options)
     try:
-        with open(output, "wb") as FILE:
-            FILE.write(element)
-    except FileNotFoundError:
+        write_xml(sections, output)
+    except OSError:
         print("The file path provided does not exist")
 
 
@@ -126,7 +125,9 @@ def cleanfile(input, la_code, la_log_dir, output):
         )
         is False
     ):
-        save_incorrect_year_error(input, la_log_dir, retention_period=YEARS_TO_GO_BACK-1)
+        save_incorrect_year_error(
+            input, la_log_dir, retention_period=YEARS_TO_GO_BACK - 1
+        )
         return
 
     # Configure stream
@@ -156,66 +157,126 @@ def cleanfile(input, la_code, la_log_dir, output):
     file_creator.export_file(input, output, data_lalevel, "lalevel")
 
 
-def la_agg(input, output):
+def la_agg(input, output, incremental=False, chunksize=None):
     """
     Joins data from newly cleaned social work workforce census files (output of cleanfile()) to existing social work workforce census files for the depositing local authority
     :param input: should specify the input file location, including file name and suffix, and be usable by a Path function
     :param output: should specify the path to the output folder
+    :param incremental: if True the file is merged into the LA's store of the merged file, comparing only the new records with an index of the existing ones
+    :param chunksize: if given the existing merged file is read and merged this number of records at a time, rather than all at once
     :return: None
     """
+    if incremental and chunksize:
+        raise ValueError("la_agg cannot be run both incrementally and in chunks")
 
     # Configuration
     config = agg_config.Config()
 
-    # Open file as DataFrame and match file type
-    csww_df = agg_process.read_file(input)
+    # Match file type and open file as DataFrame
     column_names = config["column_names"]
-    table_name = agg_process.match_load_file(csww_df, column_names)
-
-    # Merge file with existing file of the same type in LA output folder
-    csww_df = agg_process.merge_la_files(output, csww_df, table_name)
+    table_name = agg_process.match_load_file(
+        agg_process.read_header(input), column_names
+    )
+    dtypes = config["dtypes"]
+    dates = config["dates"]
+    csww_df = agg_process.read_file(input, table_name, dtypes=dtypes, dates=dates)
 
-    # De-duplicate and remove old data according to schema
-    if table_name == "CSWWWorker":
-        dates = config["dates"]
-        csww_df = agg_process.convert_datetimes(csww_df, dates, table_name)
     sort_order = config["sort_order"]
     dedup = config["dedup"]
-    csww_df = agg_process.deduplicate(csww_df, table_name, sort_order, dedup)
-    csww_df = agg_process.remove_old_data(
-        csww_df,
-        num_of_years=YEARS_TO_GO_BACK,
-        new_year_start_month=YEAR_START_MONTH,
-        as_at_date=REFERENCE_DATE,
-    )
+    if chunksize:
+        # Merge, de-duplicate, remove old data and export a chunk of the existing merged file at a time
+        agg_process.merge_la_chunked(
+            output,
+            csww_df,
+            table_name,
+            sort_order,
+            dedup,
+            num_of_years=YEARS_TO_GO_BACK,
+            new_year_start_month=YEAR_START_MONTH,
+            as_at_date=REFERENCE_DATE,
+            chunksize=chunksize,
+            dtypes=dtypes,
+            dates=dates,
+        )
+        return
+    elif incremental:
+        # Merge file into the LA's store of the merged file, de-duplicating and removing old data as it goes
+        csww_df = agg_process.merge_la_store(
+            output,
+            csww_df,
+            table_name,
+            sort_order,
+            dedup,
+            num_of_years=YEARS_TO_GO_BACK,
+            new_year_start_month=YEAR_START_MONTH,
+            as_at_date=REFERENCE_DATE,
+            dtypes=dtypes,
+            dates=dates,
+        )
+    else:
+        # Merge file with existing file of the same type in LA output folder
+        csww_df = agg_process.merge_la_files(
+            output, csww_df, table_name, dtypes=dtypes, dates=dates
+        )
+
+        # De-duplicate and remove old data according to schema
+        if table_name == "CSWWWorker":
+            csww_df = agg_process.convert_datetimes(csww_df, dates, table_name)
+        csww_df = agg_process.deduplicate(csww_df, table_name, sort_order, dedup)
+        csww_df = agg_process.remove_old_data(
+            csww_df,
+            num_of_years=YEARS_TO_GO_BACK,
+            new_year_start_month=YEAR_START_MONTH,
+            as_at_date=REFERENCE_DATE,
+        )
 
     # If file still has data, after removing old data: re-format and export merged file
     if len(csww_df) > 0:
         if table_name == "CSWWWorker":
             csww_df = agg_process.convert_dates(csww_df, dates, table_name)
         agg_process.export_la_file(output, table_name, csww_df)
+        if incremental:
+            agg_process.mark_la_store(output, table_name)
 
 
-def pan_agg(input, la_code, output):
+def pan_agg(input, la_code, output, no_csv=False, chunksize=None):
     """
     Joins data from newly merged social work workforce file (output of la-agg()) to existing pan-London workforce data
     :param input: should specify the input file location, including file name and suffix, and be usable by a Path function
     :param la_code: should be a three-letter string for the local authority depositing the file
     :param output: should specify the path to the output folder
+    :param no_csv: if True only the LA's partition of the pan-London data store is updated and the pan-London csv file is not written
+    :param chunksize: if given the pan-London data is read and written this number of records, or one LA, at a time, rather than all at once
     :return: None
     """
 
     # Configuration
     config = pan_config.Config()
 
-    # Read file and match type
-    csww_df = pan_process.read_file(input)
+    # Match file type and read file
     column_names = config["column_names"]
-    table_name = pan_process.match_load_file(csww_df, column_names)
+    table_name = pan_process.match_load_file(
+        pan_process.read_header(input), column_names
+    )
+    dtypes = config["dtypes"]
+    dates = config["dates"]
+    csww_df = pan_process.read_file(input, table_name, dtypes=dtypes, dates=dates)
 
     # Remove unwanted datasets and merge wanted with existing output
     pan_data_kept = config["pan_data_kept"]
     if table_name in pan_data_kept:
         la_name = flip_dict(config["data_codes"])[la_code]
-        csww_df = pan_process.merge_agg_files(output, table_name, csww_df, la_name)
-        pan_process.export_pan_file(output, table_name, csww_df)
+        pan_process.save_la_partition(
+            output,
+            table_name,
+            csww_df,
+            la_name,
+            dtypes=dtypes,
+            dates=dates,
+            chunksize=chunksize,
+        )
+        if not no_csv and chunksize:
+            pan_process.export_pan_store(output, table_name)
+        elif not no_csv:
+            csww_df = pan_process.read_pan_store(output, table_name)
+            pan_process.export_pan_file(output, table_name, csww_df)
@@ -1,11 +1,15 @@
+import logging
 from typing import Iterator
-import tablib
+import pandas as pd
 from more_itertools import peekable
 
 from sfdata_stream_parser import events
 from sfdata_stream_parser.collectors import xml_collector
 
 
+log = logging.getLogger(__name__)
+
+
 class CSWWEvent(events.ParseEvent):
     pass
 
@@ -106,6 +110,28 @@ __EXPORT_HEADERS_LALEVELVAC = [
     "NoAgencyHeadcount",
 ]
 
+__DATE_COLUMNS = [
+    "PersonBirthDate",
+    "RoleStartDate",
+    "RoleEndDate",
+]
+
+__CATEGORY_COLUMNS = [
+    "AgencyWorker",
+    "GenderCurrent",
+    "Ethnicity",
+    "QualLevel",
+    "StepUpGrad",
+    "OrgRole",
+    "StartOrigin",
+    "LeaverDestination",
+    "ReasonLeave",
+    "FrontlineGrad",
+    "Absat30Sept",
+    "ReasonAbsence",
+    "CFKSSstatus",
+]
+
 
 def _maybe_list(value):
     if value is None:
@@ -121,18 +147,53 @@ def event_to_records(event) -> Iterator[dict]:
         yield from (item,)
 
 
+def _to_column(header, values):
+    """
+    Build a typed column from a buffer of cleaned values: datetime64 for dates, categorical for codes and
+    object for everything else. Blank values become NaT in date columns. A date column with a value datetime64
+    cannot hold, e.g. a RoleEndDate of 2999-12-31, is kept as an object column of the values as they are
+
+    :param header: The column name
+    :param values: A list of cleaned values for the column
+    :return: A pandas Series
+    """
+    if header in __DATE_COLUMNS:
+        try:
+            return pd.Series(pd.to_datetime(values), name=header)
+        except ValueError as error:  # Includes OutOfBoundsDatetime
+            log.warning(f"Keeping {header} as an object column: {error}")
+            return pd.Series(values, name=header, dtype=object)
+    if header in __CATEGORY_COLUMNS:
+        try:
+            return pd.Series(pd.Categorical(values), name=header)
+        except TypeError:  # Raised if an element is repeated, giving a list of values
+            pass
+    return pd.Series(values, name=header, dtype=object)
+
+
+def _to_dataframe(columns):
+    return pd.DataFrame(
+        {header: _to_column(header, values) for header, values in columns.items()}
+    )
+
+
 def export_table(stream):
-    data_worker = tablib.Dataset(headers=__EXPORT_HEADERS_CSWWWORKER)
-    data_lalevel = tablib.Dataset(headers=__EXPORT_HEADERS_LALEVELVAC)
+    """
+    Collect the CSWWWorker and LALevelVacancies records into column buffers and build a typed DataFrame for each
+
+    :param stream: An iterator of events from message_collector
+    :return: A DataFrame of worker records and a DataFrame of LA level records
+    """
+    data_worker = {k: [] for k in __EXPORT_HEADERS_CSWWWORKER}
+    data_lalevel = {k: [] for k in __EXPORT_HEADERS_LALEVELVAC}
     for event in stream:
         if isinstance(event, CSWWEvent):
-            for record in event_to_records(event):
-                data_worker.append(
-                    [record.get(k, "") for k in __EXPORT_HEADERS_CSWWWORKER]
-                )
+            columns = data_worker
         elif isinstance(event, LALevelEvent):
-            for record in event_to_records(event):
-                data_lalevel.append(
-                    [record.get(k, "") for k in __EXPORT_HEADERS_LALEVELVAC]
-                )
-    return data_worker, data_lalevel
+            columns = data_lalevel
+        else:
+            continue
+        for record in event_to_records(event):
+            for k, values in columns.items():
+                values.append(record.get(k, ""))
+    return _to_dataframe(data_worker), _to_dataframe(data_lalevel)
@@ -1,16 +1,16 @@
 from pathlib import Path
 import pandas as pd
 import logging
-import hashlib
-from typing import Dict
-from decouple import config
 
 from liiatools.datasets.shared_functions import converters, common
+from liiatools.datasets.shared_functions.pseudonymise import swe_pseudonymiser
 
 log = logging.getLogger(__name__)
 
 
 def convert_to_dataframe(data):
+    if isinstance(data, pd.DataFrame):
+        return data
     data = data.export("df")
     return data
 
@@ -36,9 +36,14 @@ def add_la_name(data, la_name):
 def degrade_dob(data):
     if "PersonBirthDate" in data:
         if data["PersonBirthDate"] is not None:
-            data["PersonBirthDate"] = data["PersonBirthDate"].apply(
-                lambda row: converters.to_month_only_dob(row)
-            )
+            if pd.api.types.is_datetime64_any_dtype(data["PersonBirthDate"]):
+                data["PersonBirthDate"] = (
+                    data["PersonBirthDate"].dt.to_period("M").dt.to_timestamp()
+                )
+            else:
+                data["PersonBirthDate"] = data["PersonBirthDate"].apply(
+                    lambda row: converters.to_month_only_dob(row)
+                )
     return data
 
 
@@ -48,9 +53,7 @@ def degrade_SWENo(data):
     """
     if "SWENo" in data:
         if data["SWENo"] is not None:
-            data["SWENo"] = data["SWENo"].apply(
-                lambda row: swe_hash(row) if row else row
-            )
+            data["SWENo"] = swe_pseudonymiser().hash_series(data["SWENo"])
     return data
 
 
@@ -60,17 +63,7 @@ def swe_hash(swe_num):
     :param swe_num: SWE number to be converted
     :return: Hash code version of SWE number
     """
-
-    private_string = config("sec_str", default="")
-
-    private_key = swe_num + private_string
-
-    # Preparing plain text (SWENo) to hash it
-    plaintext = private_key.encode()
-
-    hash_algorithm = hashlib.sha3_256(plaintext)
-
-    return hash_algorithm.hexdigest()
+    return swe_pseudonymiser().hash(swe_num)
 
 
 def add_fields(input_year, data, la_name):
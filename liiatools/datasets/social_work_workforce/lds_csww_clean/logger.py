@@ -1,4 +1,3 @@
-from collections import Counter
 from datetime import datetime
 import logging
 import os
@@ -7,6 +6,13 @@ from sfdata_stream_parser import events
 from sfdata_stream_parser.filters.generic import streamfilter, pass_event
 from sfdata_stream_parser.checks import type_check
 
+from liiatools.datasets.shared_functions.logger import (
+    ErrorCounter,
+    format_error_counts,
+    error_counts_record,
+    LogSink,
+)
+
 log = logging.getLogger(__name__)
 
 
@@ -16,15 +22,19 @@ class ErrorTable(events.ParseEvent):
 
 def create_formatting_error_list(stream):
     """
-    Create a list of the column headers for cells with formatting errors (event.error = 1) for each table
+    Count the names of nodes with formatting errors (event.formatting_error = 1), keeping the numbers of the
+    first few workers with each error as examples
 
     :param stream: A filtered list of event objects
     :return: An updated list of event objects with error counts
     """
     formatting_error_list = None
+    worker_number = 0
     for event in stream:
+        if isinstance(event, events.StartElement) and event.tag == "CSWWWorker":
+            worker_number += 1
         if isinstance(event, events.StartElement) and event.tag == "LALevelVacancies":
-            formatting_error_list = []
+            formatting_error_list = ErrorCounter()
         elif isinstance(event, events.EndElement) and event.tag == "Message":
             yield ErrorTable.from_event(
                 event,
@@ -34,7 +44,7 @@ def create_formatting_error_list(stream):
         elif formatting_error_list is not None and isinstance(event, events.TextNode):
             try:
                 if event.formatting_error == "1":
-                    formatting_error_list.append(event.schema.name)
+                    formatting_error_list.add(event.schema.name, row=worker_number)
             except AttributeError:  # Raised in case there is no event.formatting_error
                 pass
         yield event
@@ -66,16 +76,19 @@ def blank_error_check(event):
 
 def create_blank_error_list(stream):
     """
-    Create a list of the column headers for cells with blank fields that should not be blank (event.blank_error = 1)
-    for each table
+    Count the names of nodes with blank fields that should not be blank (event.blank_error = 1), keeping the numbers
+    of the first few workers with each error as examples
 
     :param stream: A filtered list of event objects
     :return: An updated list of event objects
     """
     blank_error_list = None
+    worker_number = 0
     for event in stream:
+        if isinstance(event, events.StartElement) and event.tag == "CSWWWorker":
+            worker_number += 1
         if isinstance(event, events.StartElement) and event.tag == "LALevelVacancies":
-            blank_error_list = []
+            blank_error_list = ErrorCounter()
         elif isinstance(event, events.EndElement) and event.tag == "Message":
             blank_error_list = None
         elif isinstance(event, ErrorTable):
@@ -84,7 +97,7 @@ def create_blank_error_list(stream):
         elif blank_error_list is not None and isinstance(event, events.TextNode):
             try:
                 if event.blank_error == "1":
-                    blank_error_list.append(event.schema.name)
+                    blank_error_list.add(event.schema.name, row=worker_number)
             except AttributeError:  # Raised in case there is no event.blank_error
                 pass
         yield event
@@ -114,7 +127,8 @@ def create_validation_error_list(stream):
 def save_errors_la(stream, la_log_dir, filename):
     """
     Count the error events and save them as a text file in the Local Authority Logs directory
-    only save the error events if there is at least one error in said event
+    only save the error events if there is at least one error in said event. The log entries are buffered and
+    written once the whole file has been read, or if processing stops early
 
     :param stream: A filtered list of event objects
     :param la_log_dir: Location to save the gathered error logs
@@ -122,56 +136,61 @@ def save_errors_la(stream, la_log_dir, filename):
     :return: An updated list of event objects
     """
     start_time = f"{datetime.now():%Y-%m-%dT%H%M%SZ}"
-    for event in stream:
-        try:
-            if isinstance(event, ErrorTable) and (
-                event.formatting_error_list is not None
-                and event.blank_error_list is not None
-                and event.validation_error_list is not None
-            ):
-                if (
-                    event.formatting_error_list
-                    or event.blank_error_list
-                    or event.validation_error_list
+    sink = LogSink()
+    try:
+        for event in stream:
+            try:
+                if isinstance(event, ErrorTable) and (
+                    event.formatting_error_list is not None
+                    and event.blank_error_list is not None
+                    and event.validation_error_list is not None
                 ):
-                    with open(
-                        f"{os.path.join(la_log_dir, filename)}_error_log_{start_time}.txt",
-                        "a",
-                    ) as f:
-                        f.write("\n")
+                    if (
+                        event.formatting_error_list
+                        or event.blank_error_list
+                        or event.validation_error_list
+                    ):
+                        text = [""]
+                        record = {"filename": filename}
                         if event.formatting_error_list:
-                            f.write(
+                            text.append(
                                 "Number of cells that have been made blank "
                                 "because they could not be formatted correctly"
                             )
-                            f.write("\n")
-                            counter_dict = Counter(event.formatting_error_list)
-                            f.write(
-                                str(counter_dict)[9:-2]
-                            )  # Remove "Counter({" and "})" from string
-                            f.write("\n")
+                            text.append(
+                                format_error_counts(event.formatting_error_list)
+                            )
+                            record["formatting_error"] = error_counts_record(
+                                event.formatting_error_list
+                            )
                         if event.blank_error_list:
-                            f.write(
+                            text.append(
                                 "Number of blank cells that should have contained data"
                             )
-                            f.write("\n")
-                            blank_counter_dict = Counter(event.blank_error_list)
-                            f.write(
-                                str(blank_counter_dict)[9:-2]
-                            )  # Remove "Counter({" and "})" from string
-                            f.write("\n")
+                            text.append(format_error_counts(event.blank_error_list))
+                            record["blank_error"] = error_counts_record(
+                                event.blank_error_list
+                            )
                         if event.validation_error_list:
                             event.validation_error_list = list(
                                 dict.fromkeys(event.validation_error_list)
                             )  # Remove duplicate information from list but
                             # keep order
-                            for item in event.validation_error_list:
-                                f.write(item)
-                                f.write("\n")
-        except AttributeError:
-            pass
+                            text.extend(event.validation_error_list)
+                            record["validation_error"] = event.validation_error_list
+                        sink.write(
+                            f"{os.path.join(la_log_dir, filename)}_error_log_{start_time}.txt",
+                            "\n".join(text) + "\n",
+                            record=record,
+                        )
+            except AttributeError:
+                pass
 
-        yield event
+            if isinstance(event, ErrorTable):
+                sink.flush()
+            yield event
+    finally:
+        sink.flush()
 
 
 def log_errors(stream):
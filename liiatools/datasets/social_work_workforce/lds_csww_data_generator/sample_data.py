@@ -1,12 +1,14 @@
 import random
 import string
-from datetime import date, datetime, timedelta
-import pytz
+from datetime import date, datetime, time, timedelta
 
 from sfdata_stream_parser.events import StartElement, EndElement, TextNode
 
 from liiatools.datasets.social_work_workforce.lds_csww_clean.schema import Schema
 
+DEFAULT_SCHEMA_YEAR = 2022
+DEFAULT_YEAR = 2022
+
 
 def TextElement(tag: str, text):
     """
@@ -28,16 +30,37 @@ def generate_sample_csww_file(**options):
     :return: stream of generators containing information required to create an XML file
     """
     yield StartElement(tag="Message")
-    yield from generate_sample_header(**options)
+    for section in generate_sample_sections(**options):
+        yield from section
+    yield EndElement(tag="Message")
 
-    yield StartElement(tag="LALevelVacancies")
-    yield from generate_la_level_vacancies()
-    yield EndElement(tag="LALevelVacancies")
 
-    for worker in range(random.randint(1, 50)):
-        yield from generate_csww_worker()
+def generate_sample_sections(workers=None, seed=None, **opts):
+    """
+    Generate the <Header>, <LALevelVacancies> and <CSWWWorker> sections of a sample file one at a time, so that
+    each section can be written out before the next one is generated
+
+    All random values are drawn from a generator seeded with the given seed and all dates are relative to the
+    reference date of the census year, so the same options always produce the same file
 
-    yield EndElement(tag="Message")
+    :param workers: The number of <CSWWWorker> elements to generate (default: a random number between 1 and 50)
+    :param seed: Seed for the random number generator (default: unseeded)
+    :param opts: Optional lea (three digit LEA code) and year (census year, default: DEFAULT_YEAR) to use in the
+        header
+    :return: generator of event streams, one per section
+    """
+    rng = random.Random(seed)
+    year = int(opts.get("year", DEFAULT_YEAR))
+    opts = {**opts, "year": year, "rng": rng, "reference_date": date(year, 9, 30)}
+    configuration = Configuration(rng=rng)
+
+    yield generate_sample_header(**opts)
+    yield generate_la_level_vacancies(**opts)
+
+    if workers is None:
+        workers = rng.randint(1, 50)
+    for worker in range(workers):
+        yield generate_csww_worker(configuration, **opts)
 
 
 def generate_sample_header(**opts):
@@ -46,12 +69,15 @@ def generate_sample_header(**opts):
 
     :return: stream of generators containing <Header> information required to create an XML file
     """
+    rng = opts.get("rng", random)
+    reference_date = opts.get("reference_date", date.today())
+
     yield StartElement(tag="Header")
     yield StartElement(tag="CollectionDetails")
     yield from TextElement(tag="Collection", text="CSWW")
-    yield from TextElement(tag="Year", text=opts.get("year", date.today().year))
+    yield from TextElement(tag="Year", text=opts.get("year", reference_date.year))
     yield from TextElement(
-        tag="ReferenceDate", text=opts.get("year", date.today().strftime("%Y-%m-%d"))
+        tag="ReferenceDate", text=reference_date.strftime("%Y-%m-%d")
     )
     yield EndElement(tag="CollectionDetails")
     yield StartElement(tag="Source")
@@ -59,41 +85,44 @@ def generate_sample_header(**opts):
     if opts.get("lea"):
         yield from TextElement(tag="LEA", text=opts["lea"])
     else:
-        yield from TextElement(tag="LEA", text=f"{random.randint(100, 999):03}")
+        yield from TextElement(tag="LEA", text=f"{rng.randint(100, 999):03}")
 
     yield from TextElement(tag="SoftwareCode", text=__name__)
     yield from TextElement(
         tag="DateTime",
-        text=datetime.now().astimezone(pytz.UTC).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        text=datetime.combine(reference_date, time()).strftime("%Y-%m-%dT%H:%M:%SZ"),
     )
 
     yield EndElement(tag="Source")
     yield EndElement(tag="Header")
 
 
-def generate_la_level_vacancies():
+def generate_la_level_vacancies(**opts):
     """
     Generate information for the <LALevelVacancies> XML element
 
     :return: stream of generators containing <LALevelVacancies> information required to create an XML file
     """
-    yield from TextElement(
-        tag="NumberOfVacancies", text=round(random.uniform(0, 100), 2)
-    )
-    yield from TextElement(tag="NoAgencyFTE", text=round(random.uniform(0, 100), 2))
-    yield from TextElement(tag="NoAgencyHeadcount", text=random.randint(0, 100))
+    rng = opts.get("rng", random)
+
+    yield StartElement(tag="LALevelVacancies")
+    yield from TextElement(tag="NumberOfVacancies", text=round(rng.uniform(0, 100), 2))
+    yield from TextElement(tag="NoAgencyFTE", text=round(rng.uniform(0, 100), 2))
+    yield from TextElement(tag="NoAgencyHeadcount", text=rng.randint(0, 100))
+    yield EndElement(tag="LALevelVacancies")
 
 
-def random_chance_0_1(prob_0=0.25, prob_1=0.75):
+def random_chance_0_1(prob_0=0.25, prob_1=0.75, rng=random):
     """
     Create a random value of 0 or 1 using given probabilities of each occurring
 
     :param prob_0: probability of 0 occurring (default is 0.25)
     :param prob_1: probability of 1 occurring (default is 0.75)
+    :param rng: random number generator to use (default is the random module)
     :return: integer of 0 or 1
     """
     assert prob_0 + prob_1 == 1
-    return random.choices([0, 1], [prob_0, prob_1])[0]
+    return rng.choices([0, 1], [prob_0, prob_1])[0]
 
 
 def generate_csww_worker(configuration=None, **opts):
@@ -106,38 +135,36 @@ def generate_csww_worker(configuration=None, **opts):
     if not configuration:
         configuration = Configuration()
 
+    rng = opts.get("rng", configuration.rng)
     if opts.get("seed"):
-        random.seed(opts["seed"])
+        rng.seed(opts["seed"])
+    today = opts.get("reference_date", date.today())
 
-    dob = opts.get(
-        "dob", date.today() - timedelta(days=random.uniform(365 * 18, 365 * 66))
-    )
+    dob = opts.get("dob", today - timedelta(days=rng.uniform(365 * 18, 365 * 66)))
 
     agency_worker = configuration.random_agencyworker
 
-    role_start_date = dob + timedelta(days=random.uniform(365 * 18, 365 * 50))
-    if role_start_date > date.today():
-        role_start_date = date.today()
+    role_start_date = dob + timedelta(days=rng.uniform(365 * 18, 365 * 50))
+    if role_start_date > today:
+        role_start_date = today
 
-    role_end_date_count = (
-        random.choices([0, 1])[0] if role_start_date < date.today() else 0
-    )
-    role_end_date = role_start_date + timedelta(days=random.uniform(365 * 18, 365 * 50))
-    if role_end_date > date.today():
-        role_end_date = date.today()
+    role_end_date_count = rng.choices([0, 1])[0] if role_start_date < today else 0
+    role_end_date = role_start_date + timedelta(days=rng.uniform(365 * 18, 365 * 50))
+    if role_end_date > today:
+        role_end_date = today
 
     yield StartElement(tag="CSWWWorker")
     yield from TextElement(tag="AgencyWorker", text=agency_worker)
     yield from TextElement(
         tag="SWENo",
-        text=f"{''.join(random.choices(string.ascii_letters, k=2))}"
-        f"{random.randint(1000000000, 9999999999)}",
+        text=f"{''.join(rng.choices(string.ascii_letters, k=2))}"
+        f"{rng.randint(1000000000, 9999999999)}",
     )
 
-    text = 0 if role_end_date_count == 1 else round(random.uniform(0, 1), 6)
+    text = 0 if role_end_date_count == 1 else round(rng.uniform(0, 1), 6)
     yield from TextElement(tag="FTE", text=text)
 
-    if agency_worker == 0:
+    if str(agency_worker) == "0":
         yield from TextElement(tag="PersonBirthDate", text=dob.strftime("%Y-%m-%d"))
         yield from TextElement(tag="GenderCurrent", text=configuration.random_gender)
         yield from TextElement(tag="Ethnicity", text=configuration.random_ethnicity)
@@ -157,38 +184,36 @@ def generate_csww_worker(configuration=None, **opts):
                 tag="LeaverDestination", text=configuration.random_leaver
             )
             yield from TextElement(tag="ReasonLeave", text=configuration.random_reason)
-        yield from TextElement(tag="FTE30", text=round(random.uniform(0, 1), 6))
-        yield from TextElement(tag="Cases30", text=random.randint(0, 100))
-        yield from TextElement(
-            tag="WorkingDaysLost", text=round(random.uniform(0, 100), 2)
-        )
+        yield from TextElement(tag="FTE30", text=round(rng.uniform(0, 1), 6))
+        yield from TextElement(tag="Cases30", text=rng.randint(0, 100))
         yield from TextElement(
-            tag="ContractWeeks", text=round(random.uniform(0, 500), 1)
+            tag="WorkingDaysLost", text=round(rng.uniform(0, 100), 2)
         )
+        yield from TextElement(tag="ContractWeeks", text=round(rng.uniform(0, 500), 1))
         yield from TextElement(tag="FrontlineGrad", text=configuration.random_yesno)
 
     else:
-        if random_chance_0_1() == 1:
+        if random_chance_0_1(rng=rng) == 1:
             yield from TextElement(tag="PersonBirthDate", text=dob.strftime("%Y-%m-%d"))
-        if random_chance_0_1() == 1:
+        if random_chance_0_1(rng=rng) == 1:
             yield from TextElement(
                 tag="GenderCurrent", text=configuration.random_gender
             )
-        if random_chance_0_1() == 1:
+        if random_chance_0_1(rng=rng) == 1:
             yield from TextElement(tag="Ethnicity", text=configuration.random_ethnicity)
-        if random_chance_0_1() == 1:
+        if random_chance_0_1(rng=rng) == 1:
             yield from TextElement(tag="QualInst", text="Institution Name")
-        if random_chance_0_1() == 1:
+        if random_chance_0_1(rng=rng) == 1:
             yield from TextElement(tag="QualLevel", text=configuration.random_qual)
-        if random_chance_0_1() == 1:
+        if random_chance_0_1(rng=rng) == 1:
             yield from TextElement(tag="StepUpGrad", text=configuration.random_yesno)
-        if random_chance_0_1() == 1:
+        if random_chance_0_1(rng=rng) == 1:
             yield from TextElement(tag="OrgRole", text=configuration.random_role)
-        if random_chance_0_1() == 1:
+        if random_chance_0_1(rng=rng) == 1:
             yield from TextElement(
                 tag="RoleStartDate", text=role_start_date.strftime("%Y-%m-%d")
             )
-        if random_chance_0_1() == 1:
+        if random_chance_0_1(rng=rng) == 1:
             yield from TextElement(tag="StartOrigin", text=configuration.random_origin)
         if role_end_date_count == 1:
             yield from TextElement(
@@ -198,37 +223,39 @@ def generate_csww_worker(configuration=None, **opts):
                 tag="LeaverDestination", text=configuration.random_leaver
             )
             yield from TextElement(tag="ReasonLeave", text=configuration.random_reason)
-        if random_chance_0_1() == 1:
-            yield from TextElement(tag="FTE30", text=round(random.uniform(0, 1), 6))
-        if random_chance_0_1() == 1:
-            yield from TextElement(tag="Cases30", text=random.randint(0, 100))
-        if random_chance_0_1() == 1:
+        if random_chance_0_1(rng=rng) == 1:
+            yield from TextElement(tag="FTE30", text=round(rng.uniform(0, 1), 6))
+        if random_chance_0_1(rng=rng) == 1:
+            yield from TextElement(tag="Cases30", text=rng.randint(0, 100))
+        if random_chance_0_1(rng=rng) == 1:
             yield from TextElement(
-                tag="WorkingDaysLost", text=round(random.uniform(0, 100), 2)
+                tag="WorkingDaysLost", text=round(rng.uniform(0, 100), 2)
             )
-        if random_chance_0_1() == 1:
+        if random_chance_0_1(rng=rng) == 1:
             yield from TextElement(
-                tag="ContractWeeks", text=round(random.uniform(0, 500), 1)
+                tag="ContractWeeks", text=round(rng.uniform(0, 500), 1)
             )
-        if random_chance_0_1() == 1:
+        if random_chance_0_1(rng=rng) == 1:
             yield from TextElement(tag="FrontlineGrad", text=configuration.random_yesno)
 
-    if random_chance_0_1(0.8, 0.2) == 1:
+    if random_chance_0_1(0.8, 0.2, rng) == 1:
         yield from TextElement(tag="Absat30Sept", text=configuration.random_yesno)
         yield from TextElement(tag="ReasonAbsence", text=configuration.random_absence)
 
-    if random_chance_0_1(0.5, 0.5) == 1:
+    if random_chance_0_1(0.5, 0.5, rng) == 1:
         yield from TextElement(tag="CFKSSstatus", text=configuration.random_cfkss)
 
     yield EndElement(tag="CSWWWorker")
 
 
 class Configuration:
-    def __init__(self, schema=None):
+    def __init__(self, schema=None, rng=random):
         if schema:
             self._schema = schema
         else:
-            self._schema = Schema().schema
+            self._schema = Schema(DEFAULT_SCHEMA_YEAR).schema
+        self.rng = rng
+        self._enumerations = {}
 
     def __getattr__(self, item: str):
         """
@@ -237,12 +264,16 @@ class Configuration:
         :param item: name of element we want to get a random value from
         :return: random value from a given element
         """
+        if item.startswith("_"):
+            raise AttributeError(f"{item} not found.")
         if item.startswith("random_"):
             values = getattr(self, item[7:])
             if values is not None:
-                return random.choice(values)
+                return self.rng.choice(values)
         else:
-            value = self._schema.types[f"{item}type"]
-            if value is not None:
-                return value.enumeration
+            if item not in self._enumerations:
+                value = self._schema.types[f"{item}type"]
+                self._enumerations[item] = value.enumeration if value else None
+            if self._enumerations[item] is not None:
+                return self._enumerations[item]
         raise AttributeError(f"{item} not found.")
@@ -1,5 +1,10 @@
 from collections import Counter
 
+from liiatools.datasets.social_work_workforce.lds_csww_clean.parse import (
+    etree,
+    to_xml,
+)
+
 
 def consume(stream) -> Counter:
     """
@@ -7,3 +12,23 @@ def consume(stream) -> Counter:
     """
     stream_types = [type(ev) for ev in stream]
     return Counter(stream_types)
+
+
+def write_xml(sections, output, root: str = "Message"):
+    """
+    Write a stream of sections to an XML file incrementally. Each section is built into an element and written
+    out before the next one is generated, so memory use does not grow with the number of sections
+
+    :param sections: An iterator of event streams, each containing one complete element
+    :param output: Location and name of the XML file to write
+    :param root: Tag of the root element wrapping the sections (default Message)
+    :return: .xml file in desired location
+    """
+    with etree.xmlfile(output, encoding="utf-8") as xf:
+        xf.write_declaration()
+        with xf.element(root):
+            xf.write("\n")
+            for section in sections:
+                builder = etree.TreeBuilder()
+                consume(to_xml(section, builder))
+                xf.write(builder.close(), pretty_print=True)
@@ -2,15 +2,23 @@ from pathlib import Path
 import pandas as pd
 import logging
 
+from liiatools.datasets.shared_functions import process as common_process
+
 log = logging.getLogger(__name__)
 
 
-def read_file(file):
+def read_header(file):
+    """
+    Reads only the column headers of the csv file so the file type can be matched before the file is read
+    """
+    return common_process.read_header(file)
+
+
+def read_file(file, table_name=None, dtypes=None, dates=None):
     """
-    Reads the csv file as a pandas DataFrame
+    Reads the csv file as a pandas DataFrame, with the column types and dates configured for the file type
     """
-    filepath = Path(file)
-    csww_df = pd.read_csv(filepath, index_col=None)
+    csww_df = common_process.read_file(file, table_name, dtypes=dtypes, dates=dates)
     return csww_df
 
 
@@ -23,14 +31,14 @@ def match_load_file(csww_df, column_names):
             return table_name
 
 
-def merge_la_files(output, csww_df, table_name):
+def merge_la_files(output, csww_df, table_name, dtypes=None, dates=None):
     """
     Looks for existing file of the same type and merges with new file if found
     """
     old_file = Path(output, f"CSWW_{table_name}_merged.csv")
     if old_file.is_file():
-        old_df = pd.read_csv(old_file, index_col=None)
-        merged_df = pd.concat([csww_df, old_df], axis=0)
+        old_df = read_file(old_file, table_name, dtypes=dtypes, dates=dates)
+        merged_df = common_process.concat_dfs([csww_df, old_df])
     else:
         merged_df = csww_df
     return merged_df
@@ -40,20 +48,15 @@ def convert_datetimes(csww_df, dates, table_name):
     """
     Ensures that all date fields have been parsed as dates
     """
-    for date_field in dates[table_name]:
-        csww_df[date_field] = pd.to_datetime(csww_df[date_field], format="%Y/%m/%d")
-    return csww_df
+    return common_process.convert_datetimes(csww_df, dates, table_name)
 
 
 def deduplicate(csww_df, table_name, sort_order, dedup):
     """
-    Sorts and removes duplicate records from merged files following schema
+    Sorts and removes duplicate records from merged files following schema. Where duplicate records have the same
+    sort order values the one that comes first, i.e. from the new file, is kept
     """
-    csww_df = csww_df.sort_values(
-        sort_order[table_name], ascending=False, ignore_index=True
-    )
-    csww_df = csww_df.drop_duplicates(subset=dedup[table_name], keep="first")
-    return csww_df
+    return common_process.deduplicate(csww_df, table_name, sort_order, dedup)
 
 
 def remove_old_data(csww_df, num_of_years, new_year_start_month, as_at_date):
@@ -66,14 +69,9 @@ def remove_old_data(csww_df, num_of_years, new_year_start_month, as_at_date):
     :param as_at_date: The reference date against which we are checking the valid range
     :return: Dataframe with older years removed
     """
-    current_year = pd.to_datetime(as_at_date).year
-    current_month = pd.to_datetime(as_at_date).month
-
-    if current_month < new_year_start_month:
-        earliest_allowed_year = current_year - num_of_years
-    else:
-        earliest_allowed_year = current_year - num_of_years + 1  # roll forward one year
-
+    earliest_allowed_year = common_process.earliest_allowed_year(
+        num_of_years, new_year_start_month, as_at_date
+    )
     csww_df = csww_df[csww_df["YEAR"] >= earliest_allowed_year]
     return csww_df
 
@@ -95,3 +93,105 @@ def export_la_file(output, table_name, csww_df):
     """
     output_path = Path(output, f"CSWW_{table_name}_merged.csv")
     csww_df.to_csv(output_path, index=False)
+
+
+def merge_la_store(
+    output,
+    csww_df,
+    table_name,
+    sort_order,
+    dedup,
+    num_of_years,
+    new_year_start_month,
+    as_at_date,
+    dtypes=None,
+    dates=None,
+):
+    """
+    Merges the new file into the LA's store of the merged file, comparing only the new records with an index of
+    the existing ones, and de-duplicates and removes old data with the same result as merge_la_files,
+    deduplicate and remove_old_data
+
+    :param output: Location of the LA output folder
+    :param csww_df: Dataframe of the new file
+    :param table_name: The file type
+    :param sort_order: Dictionary of file type to the columns to sort by
+    :param dedup: Dictionary of file type to the columns that identify duplicate records
+    :param num_of_years: The number of years to go back
+    :param new_year_start_month: The month which signifies start of a new year for data retention policy
+    :param as_at_date: The reference date against which we are checking the valid range
+    :param dtypes: Dictionary of file type to column types
+    :param dates: Dictionary of file type to date fields
+    :return: Dataframe of the merged, de-duplicated records
+    """
+    earliest_allowed_year = common_process.earliest_allowed_year(
+        num_of_years, new_year_start_month, as_at_date
+    )
+    return common_process.merge_la_store(
+        output,
+        csww_df,
+        table_name,
+        "CSWW",
+        sort_order,
+        dedup,
+        year_column="YEAR",
+        earliest_year=earliest_allowed_year,
+        dtypes=dtypes,
+        dates=dates,
+    )
+
+
+def merge_la_chunked(
+    output,
+    csww_df,
+    table_name,
+    sort_order,
+    dedup,
+    num_of_years,
+    new_year_start_month,
+    as_at_date,
+    chunksize,
+    dtypes=None,
+    dates=None,
+):
+    """
+    Merges the new file with the existing merged file a chunk at a time, de-duplicating, removing old data and
+    writing the merged file as it goes, with the same result as merge_la_files, deduplicate, remove_old_data and
+    export_la_file
+
+    :param output: Location of the LA output folder
+    :param csww_df: Dataframe of the new file
+    :param table_name: The file type
+    :param sort_order: Dictionary of file type to the columns to sort by
+    :param dedup: Dictionary of file type to the columns that identify duplicate records
+    :param num_of_years: The number of years to go back
+    :param new_year_start_month: The month which signifies start of a new year for data retention policy
+    :param as_at_date: The reference date against which we are checking the valid range
+    :param chunksize: The number of records of the merged file to read at a time
+    :param dtypes: Dictionary of file type to column types
+    :param dates: Dictionary of file type to date fields
+    :return: The number of records written to the merged file
+    """
+    earliest_allowed_year = common_process.earliest_allowed_year(
+        num_of_years, new_year_start_month, as_at_date
+    )
+    return common_process.merge_la_chunked(
+        output,
+        csww_df,
+        table_name,
+        "CSWW",
+        sort_order,
+        dedup,
+        year_column="YEAR",
+        earliest_year=earliest_allowed_year,
+        chunksize=chunksize,
+        dtypes=dtypes,
+        dates=dates,
+    )
+
+
+def mark_la_store(output, table_name):
+    """
+    Records the merged file just written from the LA's store
+    """
+    common_process.mark_la_store(output, table_name, "CSWW")
@@ -1,16 +1,23 @@
 from pathlib import Path
 import logging
-import pandas as pd
+
+from liiatools.datasets.shared_functions import process as common_process
 
 log = logging.getLogger(__name__)
 
 
-def read_file(file):
+def read_header(file):
+    """
+    Reads only the column headers of the csv file so the file type can be matched before the file is read
+    """
+    return common_process.read_header(file)
+
+
+def read_file(file, table_name=None, dtypes=None, dates=None):
     """
-    Reads the csv file as a pandas DataFrame
+    Reads the csv file as a pandas DataFrame, with the column types and dates configured for the file type
     """
-    filepath = Path(file)
-    csww_df = pd.read_csv(filepath, index_col=None)
+    csww_df = common_process.read_file(file, table_name, dtypes=dtypes, dates=dates)
     return csww_df
 
 
@@ -23,31 +30,41 @@ def match_load_file(csww_df, column_names):
             return table_name
 
 
-def _merge_dfs(csww_df, old_df, la_name):
+def export_pan_file(output, table_name, csww_df):
     """
-    Deletes existing data for new LA from pan file
-    Merges new LA data to pan file
+    Writes file to output directory
     """
-    old_df = old_df.drop(old_df[old_df["LA"] == la_name].index)
-    csww_df = pd.concat([csww_df, old_df], axis=0, ignore_index=True)
-    return csww_df
+    output_path = Path(output, f"pan_London_CSWW_{table_name}.csv")
+    csww_df.to_csv(output_path, index=False)
 
 
-def merge_agg_files(output, table_name, csww_df, la_name):
+def save_la_partition(
+    output, table_name, csww_df, la_name, dtypes=None, dates=None, chunksize=None
+):
     """
-    Checks if pan file exists
-    Passes old and new file to function to be merged
+    Writes the new LA data to its own partition of the pan-London data store, replacing only that LA's data
     """
-    output_file = Path(output, f"pan_London_CSWW_{table_name}.csv")
-    if output_file.is_file():
-        old_df = pd.read_csv(output_file, index_col=None)
-        csww_df = _merge_dfs(csww_df, old_df, la_name)
-    return csww_df
+    common_process.save_la_partition(
+        output,
+        table_name,
+        csww_df,
+        la_name,
+        "CSWW",
+        dtypes=dtypes,
+        dates=dates,
+        chunksize=chunksize,
+    )
 
 
-def export_pan_file(output, table_name, csww_df):
+def read_pan_store(output, table_name):
     """
-    Writes file to output directory
+    Reads every LA partition of the pan-London data store as a single DataFrame
     """
-    output_path = Path(output, f"pan_London_CSWW_{table_name}.csv")
-    csww_df.to_csv(output_path, index=False)
+    return common_process.read_pan_store(output, table_name, "CSWW")
+
+
+def export_pan_store(output, table_name):
+    """
+    Writes the pan-London file from the data store one LA partition at a time
+    """
+    common_process.export_pan_store(output, table_name, "CSWW")
@@ -8,6 +8,9 @@ from liiatools.datasets.annex_a.lds_annexa_clean.configuration import (
     _match_column_name,
     match_property_config_to_cell,
     convert_column_header_to_match,
+    create_column_plan,
+    apply_column_plan,
+    HeaderMatchCache,
 )
 
 list_1_columns = [
@@ -234,3 +237,78 @@ def test_match_property_config_to_cell():
         {"code": "d) Neither", "name": "Neither", "regex": ["/d\\).*/i"]},
     ]
     assert stream[1] == events.Cell(column_header="Gender", sheet_name="List 0")
+
+
+def test_create_column_plan():
+    column_plan = create_column_plan(
+        ["Child ID", "random_column", "Gender"],
+        "List 1",
+        sheet_config=cfg["datasources"],
+        cell_config=cfg["data_config"],
+    )
+    assert column_plan[0] == {
+        "column_header": "Child Unique ID",
+        "other_config": cfg["datasources"]["List 1"]["Child Unique ID"],
+    }
+    assert column_plan[1] == {"column_header": "Unknown"}
+    assert column_plan[2] == {
+        "column_header": "Gender",
+        "category_config": cfg["data_config"]["List 1"]["Gender"],
+        "other_config": cfg["datasources"]["List 1"]["Gender"],
+    }
+
+    column_plan = create_column_plan(
+        ["Child ID", "Gender"],
+        None,
+        sheet_config=cfg["datasources"],
+        cell_config=cfg["data_config"],
+    )
+    assert column_plan == [{"column_header": "Child ID"}, {"column_header": "Gender"}]
+
+
+def test_apply_column_plan():
+    stream = apply_column_plan(
+        [
+            events.StartTable(sheet_name="List 1", column_headers=["Child ID", "Sex"]),
+            events.Cell(column_index=0, value="1"),
+            events.Cell(column_index=1, value="F"),
+            events.EndTable(),
+            events.Cell(column_index=0, value="2"),
+        ],
+        sheet_config=cfg["datasources"],
+        cell_config=cfg["data_config"],
+    )
+    stream = list(stream)
+    assert stream[1].column_header == "Child Unique ID"
+    assert stream[1].other_config == cfg["datasources"]["List 1"]["Child Unique ID"]
+    assert stream[2].column_header == "Unknown"
+    assert not hasattr(stream[2], "category_config")
+    assert not hasattr(stream[4], "column_header")
+
+
+def test_add_sheet_name_cached(tmp_path):
+    cache_file = tmp_path / "header_cache.json"
+    cache = HeaderMatchCache(cfg["datasources"], cache_file=cache_file)
+    columns = list_1_columns + ["Extra column"]
+    stream = add_sheet_name(
+        [
+            events.StartTable(column_headers=columns),
+            events.StartTable(column_headers=[c.upper() for c in columns]),
+            events.StartTable(column_headers=["a", "b"]),
+        ],
+        config=cfg["datasources"],
+        cache=cache,
+    )
+    stream = list(stream)
+    assert stream[0].sheet_name == "List 1"
+    assert stream[0].extra_columns == ["Extra column"]
+    assert stream[1].sheet_name == "List 1"
+    assert stream[1].extra_columns == ["EXTRA COLUMN"]
+    assert not hasattr(stream[2], "sheet_name")
+
+    reloaded = HeaderMatchCache(cfg["datasources"], cache_file=cache_file)
+    assert reloaded.match(columns) == ("List 1", list_1_columns, [7])
+    assert reloaded.match(["a", "b"]) is None
+
+    other_config = HeaderMatchCache({"List 1": {}}, cache_file=cache_file)
+    assert other_config.match(columns) == ("List 1", [], [0, 1, 2, 3, 4, 5, 6, 7])
@@ -111,3 +111,83 @@ def test_create_tables():
 
     data = stream[6].data.export("df")
     assert data.shape == (2, 3)
+
+
+def test_create_table_rows():
+    stream = file_creator.create_table_rows(
+        [
+            events.StartTable(matched_column_headers=["header_one", "header_two"]),
+            file_creator.RowEvent(
+                filter=0, row={"header_one": "value_one", "header_two": "value_two"}
+            ),
+            file_creator.RowEvent(
+                filter=1, row={"header_one": "value_one", "header_two": "value_two"}
+            ),
+            events.EndTable(),
+            events.StartTable(),
+            file_creator.RowEvent(filter=0, row={"header_one": "value_one"}),
+            events.EndTable(),
+        ],
+        la_name="Barnet",
+    )
+    stream = list(stream)
+    assert stream[0].table_headers == ["header_one", "header_two", "LA"]
+    assert stream[1].table_row == ["value_one", "value_two", "Barnet"]
+    assert not hasattr(stream[2], "table_row")
+    assert not hasattr(stream[4], "table_headers")
+    assert not hasattr(stream[5], "table_row")
+
+
+def test_save_tables_streamed_rows(tmp_path):
+    def table(sheet_name):
+        return [
+            events.StartTable(sheet_name=sheet_name, table_headers=["Name", "LA"]),
+            file_creator.RowEvent(table_row=["Kenneth", "Barnet"]),
+            file_creator.RowEvent(filter=1, row={"Name": None}),
+            events.EndTable(),
+        ]
+
+    sheets = [f"List {i}" for i in range(1, 12)]
+    stream = [events.StartContainer()]
+    for sheet_name in sheets:
+        stream += table(sheet_name)
+    stream += [events.EndContainer(filename="complete")]
+    stream += [events.StartContainer()]
+    for sheet_name in sheets[:10]:
+        stream += table(sheet_name)
+    stream += [events.EndContainer(filename="incomplete")]
+    list(file_creator.save_tables(stream, str(tmp_path)))
+
+    assert [p.name for p in tmp_path.iterdir()] == ["complete_clean.xlsx"]
+    data = tablib.Databook().load(
+        (tmp_path / "complete_clean.xlsx").read_bytes(), "xlsx"
+    )
+    assert [sheet.title for sheet in data.sheets()] == sheets
+    assert data.sheets()[0].dict == [{"Name": "Kenneth", "LA": "Barnet"}]
+
+
+def test_save_tables_duplicate_match(tmp_path):
+    def table(sheet_name):
+        return [
+            events.StartTable(sheet_name=sheet_name, table_headers=["Name", "LA"]),
+            file_creator.RowEvent(table_row=[sheet_name, "Barnet"]),
+            events.EndTable(),
+        ]
+
+    sheets = [f"List {i}" for i in range(1, 12)]
+    stream = [events.StartContainer()]
+    for sheet_name in sheets + ["List 1"]:
+        stream += table(sheet_name)
+    stream += [events.EndContainer(filename="extra")]
+    stream += [events.StartContainer()]
+    for sheet_name in sheets[:10] + ["List 1"]:
+        stream += table(sheet_name)
+    stream += [events.EndContainer(filename="missing")]
+    list(file_creator.save_tables(stream, str(tmp_path)))
+
+    assert [p.name for p in tmp_path.iterdir()] == ["missing_clean.xlsx"]
+    data = tablib.Databook().load(
+        (tmp_path / "missing_clean.xlsx").read_bytes(), "xlsx"
+    )
+    assert [sheet.title for sheet in data.sheets()] == sheets[:10]
+    assert data.sheets()[0].dict == [{"Name": "List 1", "LA": "Barnet"}]
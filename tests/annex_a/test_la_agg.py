@@ -1,4 +1,7 @@
+from datetime import datetime
+
 import pandas as pd
+from openpyxl import load_workbook
 
 from liiatools.datasets.annex_a.lds_annexa_la_agg import (
     configuration,
@@ -107,3 +110,87 @@ def test_remove_old_data():
     output_dict_6 = process.remove_old_data(test_dict_6, index_date_1)
     output_df_6 = output_dict_6["List 9"]
     assert output_df_6.shape[0] == 0
+
+
+def test_merge_la_files_store(tmp_path):
+    old_dict = {"List 2": pd.DataFrame({"Column 1": ["b"]})}
+    process.save_store(tmp_path, old_dict)
+    new_dict = {"List 2": pd.DataFrame({"Column 1": ["a"]})}
+    output = process.merge_la_files(tmp_path, new_dict)
+    assert output["List 2"].equals(pd.DataFrame({"Column 1": ["a", "b"]}))
+
+
+def test_merge_la_files_same_deposit_twice(tmp_path):
+    dedup = {"List 1": ["Child Unique ID", "Date of Contact"]}
+    for _ in range(2):
+        new_dict = {
+            "List 1": pd.DataFrame(
+                {
+                    "Child Unique ID": [1234, "A1"],
+                    "Date of Contact": pd.to_datetime(["2020-01-01", "2020-01-02"]),
+                },
+            )
+        }
+        output = process.merge_la_files(tmp_path, new_dict)
+        output = process.deduplicate(output, dedup)
+        process.save_store(tmp_path, output)
+    assert output["List 1"]["Child Unique ID"].tolist() == [1234, "A1"]
+
+    process.export_file(tmp_path, output)
+    worksheet = load_workbook(tmp_path / "AnnexA_merged.xlsx")["List 1"]
+    assert worksheet["A2"].value == 1234
+
+
+def test_add_stored_lists(tmp_path):
+    old_dict = {
+        "List 1": pd.DataFrame({"Column 1": ["a"]}),
+        "List 2": pd.DataFrame({"Column 1": ["b"]}),
+    }
+    process.save_store(tmp_path, old_dict)
+    new_dict = {"List 2": pd.DataFrame({"Column 1": ["c", "b"]})}
+    output = process.merge_la_files(tmp_path, new_dict)
+    assert list(output) == ["List 2"]
+    output = process.add_stored_lists(tmp_path, output)
+    assert list(output) == ["List 1", "List 2"]
+    assert output["List 1"].equals(old_dict["List 1"])
+    assert output["List 2"]["Column 1"].tolist() == ["c", "b", "b"]
+
+
+def test_remove_old_data_cutoff():
+    today = pd.Timestamp("2024-02-29 12:00")
+    test_df = pd.DataFrame(
+        {"Date 1": pd.to_datetime(["2018-02-28", "2018-03-01", "2018-03-02", None])}
+    )
+    index_date = {"List 1": {"ref_date": "Date 1", "years": 6}}
+    output_dict = process.remove_old_data({"List 1": test_df}, index_date, today=today)
+    assert output_dict["List 1"]["Date 1"].tolist() == [
+        pd.Timestamp("2018-03-02"),
+        pd.NaT,
+    ]
+
+
+def test_convert_datetimes():
+    dates = {"List 1": ["Date 1", "Date 2"]}
+    test_df = pd.DataFrame(
+        {
+            "Date 1": ["01/02/2020", None],
+            "Date 2": pd.to_datetime(["2020-02-01", None]),
+        }
+    )
+    output_df = process.convert_datetimes({"List 1": test_df}, dates)["List 1"]
+    assert output_df.dtypes.tolist() == ["datetime64[ns]", "datetime64[ns]"]
+    assert output_df["Date 1"].equals(output_df["Date 2"].rename("Date 1"))
+
+
+def test_export_file(tmp_path):
+    test_df = pd.DataFrame(
+        {
+            "Child Unique ID": ["a", "b"],
+            "Date of Birth": pd.to_datetime(["2020-02-01", None]),
+        }
+    )
+    process.export_file(tmp_path, {"List 1": test_df})
+    worksheet = load_workbook(tmp_path / "AnnexA_merged.xlsx")["List 1"]
+    assert worksheet["B2"].value == datetime(2020, 2, 1)
+    assert worksheet["B2"].number_format == "YYYY-MM-DD"
+    assert worksheet["B3"].value is None
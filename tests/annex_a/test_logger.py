@@ -38,11 +38,7 @@ def test_create_error_list():
         error_name="blank_error",
     )
     stream = list(stream)
-    assert stream[5].blank_error_list == [
-        "Child Unique ID",
-        "Child Unique ID",
-        "Gender",
-    ]
+    assert stream[5].blank_error_list == {"Child Unique ID": 2, "Gender": 1}
 
     stream = logger.create_error_list(
         [
@@ -56,11 +52,7 @@ def test_create_error_list():
         error_name="formatting_error",
     )
     stream = list(stream)
-    assert stream[5].formatting_error_list == [
-        "Child Unique ID",
-        "Child Unique ID",
-        "Gender",
-    ]
+    assert stream[5].formatting_error_list == {"Child Unique ID": 2, "Gender": 1}
 
 
 def test_inherit_error():
@@ -216,3 +208,25 @@ def test_blank_error_check():
     assert stream[2].value == ""
     assert stream[2].blank_error == "1"
     assert not hasattr(stream[3], "blank_error")
+
+
+def test_create_error_list_example_rows():
+    stream = logger.create_error_list(
+        [
+            events.StartTable(),
+            events.StartRow(row_index=1),
+            events.Cell(column_header="Child Unique ID", blank_error="1"),
+            events.EndRow(),
+            events.StartRow(row_index=2),
+            events.Cell(column_header="Child Unique ID"),
+            events.EndRow(),
+            events.StartRow(row_index=3),
+            events.Cell(column_header="Child Unique ID", blank_error="1"),
+            events.EndRow(),
+            logger.ErrorTable(),
+        ],
+        error_name="blank_error",
+    )
+    stream = list(stream)
+    assert stream[-2].blank_error_list == {"Child Unique ID": 2}
+    assert stream[-2].blank_error_list.example_rows == {"Child Unique ID": [2, 4]}
@@ -24,16 +24,42 @@ def test_data_minimisation():
     assert len(output_df_2.columns) == 1
 
 
-def test_merge_dfs():
-    new_df_1 = {"LA": ["a"]}
-    new_dict_1 = {"List 1": pd.DataFrame(new_df_1)}
-    old_df = {"LA": ["b"]}
-    old_dict = {"List 1": pd.DataFrame(old_df)}
-    assert_df = {"LA": ["a", "b"]}
-    assert_dict = {"List 1": pd.DataFrame(assert_df)}
-    output_1 = process._merge_dfs(new_dict_1, old_dict, "a")
-    assert output_1["List 1"].equals(assert_dict["List 1"])
-    new_df_2 = {"LA": ["b"]}
-    new_dict_2 = {"List 1": pd.DataFrame(new_df_2)}
-    output_2 = process._merge_dfs(new_dict_2, old_dict, "b")
-    assert output_2["List 1"].equals(assert_dict["List 1"]) == False
+def test_save_la_partitions(tmp_path):
+    process.save_la_partitions(
+        tmp_path, {"List 1": pd.DataFrame({"LA": ["b"], "ID": ["1"]})}, "b"
+    )
+    process.save_la_partitions(
+        tmp_path, {"List 1": pd.DataFrame({"LA": ["a"], "ID": ["2"]})}, "a"
+    )
+    process.save_la_partitions(
+        tmp_path, {"List 1": pd.DataFrame({"LA": ["b"], "ID": ["3"]})}, "b"
+    )
+    store_dir = tmp_path / "pan_London_Annex_A" / "List 1"
+    assert sorted(file.name for file in store_dir.iterdir()) == [
+        "a.parquet",
+        "b.parquet",
+    ]
+    output = process.read_pan_store(tmp_path)
+    assert output["List 1"].equals(pd.DataFrame({"LA": ["a", "b"], "ID": ["2", "3"]}))
+
+
+def test_save_la_partitions_from_pan_file(tmp_path):
+    old_dict = {
+        "List 1": pd.DataFrame(
+            {"LA": ["a", "b", None], "Date": ["01/02/2020", None, "03/02/2020"]}
+        ),
+        "List 2": pd.DataFrame({"LA": ["b"], "Date": ["02/02/2020"]}),
+    }
+    process.export_file(tmp_path, old_dict)
+    new_dict = {"List 1": pd.DataFrame({"LA": ["b"], "Date": [pd.NaT]})}
+    dates = {"List 1": ["Date"], "List 2": ["Date"]}
+    process.save_la_partitions(tmp_path, new_dict, "b", dates=dates)
+    output = process.read_pan_store(tmp_path)
+    assert list(output) == ["List 1", "List 2"]
+    assert output["List 1"]["LA"].tolist() == [None, "a", "b"]
+    assert output["List 1"]["Date"].tolist() == [
+        pd.Timestamp("2020-02-03"),
+        pd.Timestamp("2020-02-01"),
+        pd.NaT,
+    ]
+    assert output["List 2"]["Date"].tolist() == [pd.Timestamp("2020-02-02")]
@@ -0,0 +1,46 @@
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+from liiatools.datasets.annex_a.lds_annexa_clean import (
+    configuration as clean_config,
+    file_creator,
+    logger,
+    pipeline,
+)
+
+SAMPLE = str(Path(__file__).parents[2] / "liiatools/spec/annex_a/samples/Annex_A.xlsx")
+
+
+def _save(stream, output):
+    output.mkdir()
+    errors = []
+    for event in file_creator.save_tables(stream, output=str(output)):
+        if isinstance(event, logger.ErrorTable):
+            errors.append(
+                (
+                    event.get("sheet_name"),
+                    event.get("formatting_error_list"),
+                    event.get("blank_error_list"),
+                )
+            )
+    workbook = load_workbook(output / "Annex_A_clean.xlsx")
+    sheets = {
+        worksheet.title: list(worksheet.iter_rows(values_only=True))
+        for worksheet in workbook.worksheets
+    }
+    return sheets, errors
+
+
+def test_clean_workbook_parallel(tmp_path):
+    config = clean_config.Config()
+    args = (SAMPLE, config, "BAR", "Barnet", "Annex_A")
+
+    serial = _save(pipeline.clean_workbook(*args), tmp_path / "serial")
+    parallel = _save(
+        pipeline.clean_workbook_parallel(*args, processes=2), tmp_path / "parallel"
+    )
+
+    assert len(serial[0]) == 11
+    assert serial[0]["List 1"][0][0] == "Child Unique ID"
+    assert parallel == serial
@@ -29,3 +29,23 @@ def test_parse_regex():
 
     string = "/.*whi.*british.*/m"
     assert regex.parse_regex(string) == re.compile(".*whi.*british.*", re.MULTILINE)
+
+
+def test_to_pattern():
+    pattern = re.compile(".*unknown.*", re.IGNORECASE)
+    assert regex.to_pattern(pattern) is pattern
+    assert regex.to_pattern("/.*unknown.*/i") == pattern
+
+
+def test_compile_config_regex():
+    shared = ["/.*fem.*/i", "/b\\).*/i"]
+    config = {
+        "List 1": {"Gender": [{"code": "b) Female", "regex": shared}]},
+        "List 2": {"Child Unique ID": {"regex": ["/.*child.*id.*/i"]}},
+    }
+    registry = regex.compile_config_regex(config)
+
+    assert registry["/.*fem.*/i"] == re.compile(".*fem.*", re.IGNORECASE)
+    assert registry["/.*child.*id.*/i"] == re.compile(".*child.*id.*", re.IGNORECASE)
+    assert regex.to_pattern("/b\\).*/i") is registry["/b\\).*/i"]
+    assert config["List 1"]["Gender"][0]["regex"] == ["/.*fem.*/i", "/b\\).*/i"]
@@ -1,3 +1,7 @@
+import json
+import pickle
+from collections import Counter
+
 from liiatools.datasets.shared_functions import logger
 
 from sfdata_stream_parser import events
@@ -66,7 +70,7 @@ def test_create_blank_error_list():
     events_with_blank_error_list = list(logger.create_blank_error_list(stream))
     for event in events_with_blank_error_list:
         if isinstance(event, logger.ErrorTable) and event.as_dict() != {}:
-            assert event.blank_error_list == ["some_header"]
+            assert event.blank_error_list == {"some_header": 1}
 
     stream = (
         events.StartTable(),
@@ -79,10 +83,7 @@ def test_create_blank_error_list():
     events_with_blank_error_list = list(logger.create_blank_error_list(stream))
     for event in events_with_blank_error_list:
         if isinstance(event, logger.ErrorTable) and event.as_dict() != {}:
-            assert event.blank_error_list == [
-                "some_header",
-                "some_header_2",
-            ]
+            assert event.blank_error_list == {"some_header": 1, "some_header_2": 1}
 
 
 def test_create_below_zero_error_list():
@@ -100,7 +101,7 @@ def test_create_below_zero_error_list():
     )
     for event in events_with_below_zero_error_list:
         if isinstance(event, logger.ErrorTable) and event.as_dict() != {}:
-            assert event.below_zero_error_list == ["some_header"]
+            assert event.below_zero_error_list == {"some_header": 1}
 
     stream = (
         events.StartTable(),
@@ -115,10 +116,7 @@ def test_create_below_zero_error_list():
     )
     for event in events_with_below_zero_error_list:
         if isinstance(event, logger.ErrorTable) and event.as_dict() != {}:
-            assert event.below_zero_error_list == [
-                "some_header",
-                "some_header_2",
-            ]
+            assert event.below_zero_error_list == {"some_header": 1, "some_header_2": 1}
 
 
 def test_create_file_match_error():
@@ -138,3 +136,70 @@ def test_create_file_match_error():
         "file titled 'test_file.csv' which contains column headers "
         "['column_1', 'column_2'] so no output has been produced"
     )
+
+
+def test_error_counter():
+    error_counter = logger.ErrorCounter(sample_size=2)
+    for column, row in [("AGE", 2), ("CHILD", 3), ("CHILD", 4), ("CHILD", 5)]:
+        error_counter.add(column, row=row)
+    error_counter.add("DOB")
+
+    assert error_counter == {"AGE": 1, "CHILD": 3, "DOB": 1}
+    assert error_counter.example_rows == {"AGE": [2], "CHILD": [3, 4]}
+    assert pickle.loads(pickle.dumps(error_counter)).example_rows == {
+        "AGE": [2],
+        "CHILD": [3, 4],
+    }
+
+
+def test_format_error_counts():
+    error_list = ["AGE", "CHILD", "DOB", "CHILD"]
+    error_counter = logger.ErrorCounter()
+    for column in error_list:
+        error_counter.add(column)
+
+    assert logger.format_error_counts(error_counter) == "'CHILD': 2, 'AGE': 1, 'DOB': 1"
+    assert logger.format_error_counts(error_counter) == str(Counter(error_list))[9:-2]
+
+
+def test_create_blank_error_list_example_rows():
+    stream = (
+        events.StartTable(),
+        events.Cell(header="some_header", r_ix=0, blank_error="1"),
+        events.Cell(header="some_header", r_ix=3, blank_error="1"),
+        logger.ErrorTable(),
+    )
+    for event in logger.create_blank_error_list(stream):
+        if isinstance(event, logger.ErrorTable) and event.as_dict() != {}:
+            assert event.blank_error_list.example_rows == {"some_header": [2, 5]}
+
+
+def test_log_sink(tmp_path):
+    log_file = tmp_path / "test_file_error_log.txt"
+    sink = logger.LogSink(jsonl=True)
+    sink.write(log_file, "List 1\n", record={"sheet_name": "List 1"})
+    sink.write(log_file, "Missing sheet\n")
+    assert not log_file.exists()
+
+    sink.flush()
+    sink.write(log_file, "List 2\n", record={"sheet_name": "List 2"})
+    sink.flush(log_file)
+
+    assert log_file.read_text() == "List 1\nMissing sheet\nList 2\n"
+    assert [
+        json.loads(line)
+        for line in (tmp_path / "test_file_error_log.jsonl").read_text().splitlines()
+    ] == [{"sheet_name": "List 1"}, {"sheet_name": "List 2"}]
+
+
+def test_log_sink_flushes_on_error(tmp_path):
+    log_file = tmp_path / "test_file_error_log.txt"
+    try:
+        with logger.LogSink(jsonl=False) as sink:
+            sink.write(log_file, "List 1\n", record={"sheet_name": "List 1"})
+            raise ValueError
+    except ValueError:
+        pass
+
+    assert log_file.read_text() == "List 1\n"
+    assert not (tmp_path / "test_file_error_log.jsonl").exists()
@@ -24,3 +24,23 @@ from sfdata_stream_parser import events
 #     stream = list(stream)
 #     for e in stream:
 #         print(e, "---", e.as_dict())
+
+
+def test_parse_xlsx():
+    sample = Path(__file__).parents[2] / "liiatools/spec/annex_a/samples/Annex_A.xlsx"
+    stream = list(parse.parse_xlsx(str(sample), la_code="BAR", filename="Annex_A"))
+
+    assert isinstance(stream[0], events.StartContainer)
+    assert isinstance(stream[-1], events.EndContainer)
+    for event in stream:
+        if isinstance(event, (events.Cell, events.StartRow, events.EndRow)):
+            assert not hasattr(event, "filename")
+        else:
+            assert event.filename == "Annex_A"
+            assert event.la_code == "BAR"
+
+    tables = [event for event in stream if isinstance(event, events.StartTable)]
+    assert tables[0].name == "List 1"
+    assert len(tables) == 11
+    first_cell = next(event for event in stream if isinstance(event, events.Cell))
+    assert first_cell.value == "Child Unique ID"
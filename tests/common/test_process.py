@@ -1,6 +1,10 @@
+import shutil
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import datetime
 from liiatools.datasets.shared_functions import process
+from liiatools.datasets.shared_functions.store import store_tables
 
 
 def test_match_load_file():
@@ -62,7 +66,7 @@ def test_remove_old_data():
         num_of_years=7,
         new_year_start_month=1,
         as_at_date=datetime.datetime(2023, 7, 15),
-        year_column="YEAR"
+        year_column="YEAR",
     )
     assert len(output_df_1) == 6
     output_df_2 = process.remove_old_data(
@@ -70,18 +74,317 @@ def test_remove_old_data():
         num_of_years=7,
         new_year_start_month=1,
         as_at_date=datetime.datetime(2024, 1, 15),
-        year_column="YEAR"
+        year_column="YEAR",
     )
     assert len(output_df_2) == 5
 
 
-def test_merge_dfs():
-    new_df_1 = pd.DataFrame({"LA": ["a"]})
-    old_df = pd.DataFrame({"LA": ["b"]})
-    assert_df = pd.DataFrame({"LA": ["a", "b"]})
-    output_1 = process._merge_dfs(new_df_1, old_df, "a")
-    assert output_1.equals(assert_df)
-    new_df_2 = pd.DataFrame({"LA": ["b"]})
-    output_2 = process._merge_dfs(new_df_2, old_df, "b")
-    assert output_2.equals(new_df_2)
-    assert output_2.equals(assert_df) is False
+def test_read_file(tmp_path):
+    test_file = tmp_path / "test.csv"
+    test_file.write_text("CHILD,SEX,LS,DOB\n0123,1,C2,2020-01-02\n0456,,V2,\n")
+    dtypes = {"Header": {"CHILD": "str", "SEX": "Int64", "LS": "category"}}
+    dates = {"Header": ["DOB"]}
+
+    header = process.read_header(test_file)
+    assert list(header.columns) == ["CHILD", "SEX", "LS", "DOB"]
+    assert len(header) == 0
+
+    untyped = process.read_file(test_file)
+    assert untyped["CHILD"].tolist() == [123, 456]
+
+    output = process.read_file(test_file, "Header", dtypes=dtypes, dates=dates)
+    assert output["CHILD"].tolist() == ["0123", "0456"]
+    assert str(output["SEX"].dtype) == "Int64"
+    assert output["SEX"].isna().tolist() == [False, True]
+    assert output["LS"].dtype == "category"
+    assert output["DOB"].tolist()[0] == pd.Timestamp("2020-01-02")
+    assert pd.isna(output["DOB"][1])
+
+
+def test_concat_dfs():
+    new_df = pd.DataFrame({"LA": pd.Categorical(["a"]), "YEAR": [2022]})
+    old_df = pd.DataFrame({"LA": pd.Categorical(["b", "c"]), "YEAR": [2021, 2021]})
+    output = process.concat_dfs([new_df, old_df], ignore_index=True)
+    assert output["LA"].dtype == "category"
+    assert list(output["LA"].cat.categories) == ["a", "b", "c"]
+    assert output["LA"].tolist() == ["a", "b", "c"]
+    assert output.index.tolist() == [0, 1, 2]
+    assert new_df["LA"].cat.categories.tolist() == ["a"]
+
+
+def test_save_la_partition(tmp_path):
+    pd.DataFrame(
+        {"CHILD": ["01", "02", "03"], "LA": ["b", "a", "b"], "YEAR": [2021] * 3}
+    ).to_csv(tmp_path / "pan_London_SSDA903_Header.csv", index=False)
+    dtypes = {"Header": {"CHILD": "str", "LA": "category"}}
+
+    new_df = pd.DataFrame({"CHILD": ["04"], "LA": ["a"], "YEAR": [2022]})
+    process.save_la_partition(tmp_path, "Header", new_df, "a", "SSDA903", dtypes=dtypes)
+    store_dir = tmp_path / "pan_London_SSDA903_Header"
+    assert store_tables(store_dir) == ["a", "b"]
+
+    output = process.read_pan_store(tmp_path, "Header", "SSDA903")
+    assert output["CHILD"].tolist() == ["04", "01", "03"]
+    assert output["LA"].tolist() == ["a", "b", "b"]
+
+    new_df = pd.DataFrame({"CHILD": ["05"], "LA": ["b"], "YEAR": [2022]})
+    process.save_la_partition(tmp_path, "Header", new_df, "b", "SSDA903")
+    output = process.read_pan_store(tmp_path, "Header", "SSDA903")
+    assert output["CHILD"].tolist() == ["04", "05"]
+
+
+def test_save_la_partition_missing_la(tmp_path):
+    pd.DataFrame(
+        {"CHILD": ["01", "02", "03"], "LA": ["b", None, "c"], "YEAR": [2021] * 3}
+    ).to_csv(tmp_path / "pan_London_SSDA903_Header.csv", index=False)
+    dtypes = {"Header": {"CHILD": "str", "LA": "category"}}
+
+    new_df = pd.DataFrame({"CHILD": ["04"], "LA": ["a"], "YEAR": [2022]})
+    for chunksize in [None, 1]:
+        output = tmp_path / str(chunksize)
+        output.mkdir()
+        shutil.copy(tmp_path / "pan_London_SSDA903_Header.csv", output)
+        process.save_la_partition(
+            output, "Header", new_df, "a", "SSDA903", dtypes=dtypes, chunksize=chunksize
+        )
+        store_dir = output / "pan_London_SSDA903_Header"
+        assert store_tables(store_dir) == [process.MISSING_LA, "a", "b", "c"]
+        output_df = process.read_pan_store(output, "Header", "SSDA903")
+        assert sorted(output_df["CHILD"]) == ["01", "02", "03", "04"]
+
+
+def test_save_la_partition_types(tmp_path):
+    dtypes = {"Header": {"CHILD": "str", "LA": "category", "YEAR": "Int64"}}
+    dates = {"Header": ["DOB"]}
+    for la in ["a", "b"]:
+        new_df = pd.DataFrame(
+            {"CHILD": ["01"], "LA": [la], "YEAR": [None], "DOB": ["2020-01-01"]}
+        ).astype(dtypes["Header"])
+        new_df = process.convert_datetimes(new_df, dates, "Header")
+        process.save_la_partition(tmp_path, "Header", new_df, la, "SSDA903")
+
+    schema = pq.read_schema(tmp_path / "pan_London_SSDA903_Header" / "a.parquet")
+    assert schema.field("CHILD").type == pa.string()
+    output = process.read_pan_store(tmp_path, "Header", "SSDA903")
+    assert output.dtypes.astype(str).tolist() == [
+        "object",
+        "category",
+        "Int64",
+        "datetime64[ns]",
+    ]
+    assert output["LA"].cat.categories.tolist() == ["a", "b"]
+    assert output["YEAR"].isna().all()
+
+
+def test_deduplicate_keeps_new_record_on_ties():
+    test_df = pd.DataFrame(
+        {"CHILD": ["1", "2", "1", "2"], "YEAR": [2021] * 4, "Answer": list("abcd")}
+    )
+    output = process.deduplicate(
+        test_df, "Table", {"Table": ["YEAR"]}, {"Table": ["CHILD"]}
+    )
+    assert output["Answer"].tolist() == ["a", "b"]
+
+
+def test_merge_la_store(tmp_path):
+    sort_order = {"Header": ["MC_DOB", "YEAR"]}
+    dedup = {"Header": ["CHILD", "YEAR"]}
+    dtypes = {"Header": {"CHILD": "str"}}
+    dates = {"Header": ["MC_DOB"]}
+    deposits = [
+        pd.DataFrame(
+            {
+                "CHILD": ["1", "2", "3", "4"],
+                "MC_DOB": ["2020-01-01", None, "2019-01-01", None],
+                "YEAR": [2021, 2021, 2019, 2016],
+            }
+        ),
+        pd.DataFrame(
+            {
+                "CHILD": ["2", "1", "5"],
+                "MC_DOB": ["2020-05-01", None, None],
+                "YEAR": [2021, 2021, 2022],
+            }
+        ),
+        pd.DataFrame(
+            {"CHILD": ["5", "3"], "MC_DOB": [None, None], "YEAR": [2022, 2019]}
+        ),
+    ]
+
+    full_dir = tmp_path / "full"
+    full_dir.mkdir()
+    for number, new_df in enumerate(deposits):
+        full_df = process.merge_la_files(
+            full_dir, new_df.copy(), "Header", "SSDA903", dtypes=dtypes, dates=dates
+        )
+        full_df = process.convert_datetimes(full_df, dates, "Header")
+        full_df = process.deduplicate(full_df, "Header", sort_order, dedup)
+        full_df = full_df[full_df["YEAR"] >= 2018].reset_index(drop=True)
+        process.export_la_file(full_dir, "Header", full_df, "SSDA903")
+
+        output = process.merge_la_store(
+            tmp_path,
+            new_df.copy(),
+            "Header",
+            "SSDA903",
+            sort_order,
+            dedup,
+            year_column="YEAR",
+            earliest_year=2018,
+            dtypes=dtypes,
+            dates=dates,
+        )
+        pd.testing.assert_frame_equal(output, full_df)
+        process.export_la_file(tmp_path, "Header", output, "SSDA903")
+        process.mark_la_store(tmp_path, "Header", "SSDA903")
+
+    assert output["CHILD"].tolist() == ["2", "1", "3", "5"]
+    store_dir = tmp_path / "SSDA903_Header_merged"
+    assert store_tables(store_dir) == ["2019", "2021", "2022", "index", "stamp"]
+
+
+def test_merge_la_store_int_and_float_key(tmp_path):
+    sort_order = {"LALevelVacancies": ["YEAR"]}
+    dedup = {"LALevelVacancies": ["NumberOfVacancies", "LA", "YEAR"]}
+    deposits = [
+        pd.DataFrame({"NumberOfVacancies": [1.5, 2.0], "LA": "a", "YEAR": 2022}),
+        pd.DataFrame({"NumberOfVacancies": [2], "LA": "a", "YEAR": 2022}),
+    ]
+    for new_df in deposits:
+        output = process.merge_la_store(
+            tmp_path,
+            new_df,
+            "LALevelVacancies",
+            "CSWW",
+            sort_order,
+            dedup,
+            year_column="YEAR",
+            earliest_year=2018,
+        )
+        process.export_la_file(tmp_path, "LALevelVacancies", output, "CSWW")
+        process.mark_la_store(tmp_path, "LALevelVacancies", "CSWW")
+    assert output["NumberOfVacancies"].tolist() == [2.0, 1.5]
+
+
+def test_key_hashes_ignore_column_types():
+    keys = [
+        pd.DataFrame({"FTE": [1, 2], "LA": ["a", "b"]}),
+        pd.DataFrame({"FTE": [1.0, 2.0], "LA": pd.Categorical(["a", "b"])}),
+        pd.DataFrame({"FTE": pd.array([1, 2], dtype="Int64"), "LA": ["a", "b"]}),
+        pd.DataFrame({"FTE": pd.Categorical([1, 2]), "LA": ["a", "b"]}),
+    ]
+    hashes = [process._key_hashes(df, ["FTE", "LA"]).tolist() for df in keys]
+    assert all(key_hashes == hashes[0] for key_hashes in hashes)
+
+
+def test_merge_la_chunked(tmp_path):
+    sort_order = {"Header": ["MC_DOB", "YEAR"]}
+    dedup = {"Header": ["CHILD", "YEAR"]}
+    dtypes = {"Header": {"CHILD": "str"}}
+    dates = {"Header": ["MC_DOB"]}
+    deposits = [
+        pd.DataFrame(
+            {
+                "CHILD": ["1", "2", "3", "4"],
+                "MC_DOB": ["2020-01-01", None, "2019-01-01", None],
+                "YEAR": [2021, 2021, 2019, 2016],
+            }
+        ),
+        pd.DataFrame(
+            {
+                "CHILD": ["2", "1", "5", "6"],
+                "MC_DOB": ["2020-05-01", None, None, "2019-01-01"],
+                "YEAR": [2021, 2021, 2022, 2019],
+            }
+        ),
+        pd.DataFrame(
+            {"CHILD": ["5", "3"], "MC_DOB": [None, None], "YEAR": [2022, 2019]}
+        ),
+    ]
+
+    full_dir = tmp_path / "full"
+    full_dir.mkdir()
+    for new_df in deposits:
+        full_df = process.merge_la_files(
+            full_dir, new_df.copy(), "Header", "SSDA903", dtypes=dtypes, dates=dates
+        )
+        full_df = process.convert_datetimes(full_df, dates, "Header")
+        full_df = process.deduplicate(full_df, "Header", sort_order, dedup)
+        full_df = full_df[full_df["YEAR"] >= 2018]
+        full_df = process.convert_dates(full_df, dates, "Header")
+        process.export_la_file(full_dir, "Header", full_df, "SSDA903")
+
+        written = process.merge_la_chunked(
+            tmp_path,
+            new_df.copy(),
+            "Header",
+            "SSDA903",
+            sort_order,
+            dedup,
+            year_column="YEAR",
+            earliest_year=2018,
+            chunksize=2,
+            dtypes=dtypes,
+            dates=dates,
+        )
+        assert written == len(full_df)
+        assert (tmp_path / "SSDA903_Header_merged.csv").read_text() == (
+            full_dir / "SSDA903_Header_merged.csv"
+        ).read_text()
+
+    output = pd.read_csv(tmp_path / "SSDA903_Header_merged.csv", dtype=str)
+    assert output["CHILD"].tolist() == ["2", "1", "6", "3", "5"]
+    assert not (tmp_path / "SSDA903_Header_merged.csv.tmp").exists()
+
+
+def test_merge_la_chunked_unsorted(tmp_path):
+    merged_file = tmp_path / "SSDA903_Header_merged.csv"
+    pd.DataFrame({"CHILD": ["1", "2", "3"], "YEAR": [2021, 2019, 2020]}).to_csv(
+        merged_file, index=False
+    )
+    new_df = pd.DataFrame({"CHILD": ["4"], "YEAR": [2022]})
+    try:
+        process.merge_la_chunked(
+            tmp_path,
+            new_df,
+            "Header",
+            "SSDA903",
+            {"Header": ["YEAR"]},
+            {"Header": ["CHILD"]},
+            year_column="YEAR",
+            earliest_year=2018,
+            chunksize=2,
+        )
+    except ValueError:
+        pass
+    else:
+        assert False, "Expected a ValueError for an unsorted merged file"
+    assert pd.read_csv(merged_file)["CHILD"].tolist() == [1, 2, 3]
+    assert not (tmp_path / "SSDA903_Header_merged.csv.tmp").exists()
+
+
+def test_export_pan_store(tmp_path):
+    pd.DataFrame(
+        {
+            "CHILD": ["01", "02", "03", "04", "05"],
+            "LA": ["b", "a", "b", "c", "a"],
+            "YEAR": [2021] * 5,
+        }
+    ).to_csv(tmp_path / "pan_London_SSDA903_Header.csv", index=False)
+    dtypes = {"Header": {"CHILD": "str", "LA": "category"}}
+
+    new_df = pd.DataFrame({"CHILD": ["06"], "LA": ["a"], "YEAR": [2022]})
+    process.save_la_partition(
+        tmp_path, "Header", new_df, "a", "SSDA903", dtypes=dtypes, chunksize=2
+    )
+    store_dir = tmp_path / "pan_London_SSDA903_Header"
+    assert store_tables(store_dir) == ["a", "b", "c"]
+
+    process.export_pan_store(tmp_path, "Header", "SSDA903")
+    output = pd.read_csv(tmp_path / "pan_London_SSDA903_Header.csv", dtype=str)
+    assert output["CHILD"].tolist() == ["06", "01", "03", "04"]
+    assert output["LA"].tolist() == ["a", "b", "b", "c"]
+    assert sorted(file.name for file in tmp_path.iterdir()) == [
+        "pan_London_SSDA903_Header",
+        "pan_London_SSDA903_Header.csv",
+    ]
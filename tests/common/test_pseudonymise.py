@@ -0,0 +1,31 @@
+import hashlib
+import pandas as pd
+from liiatools.datasets.shared_functions.pseudonymise import Pseudonymiser
+
+
+def test_hash():
+    pseudonymiser = Pseudonymiser(secret="secret")
+    expected = hashlib.sha3_256("AB1234567890secret".encode()).hexdigest()
+    assert pseudonymiser.hash("AB1234567890") == expected
+    assert pseudonymiser.hash("AB1234567890") == expected
+
+
+def test_hash_series():
+    pseudonymiser = Pseudonymiser(secret="secret")
+    series = pd.Series(["AB1", "", None, "AB1", "CD2"])
+    hashed = pseudonymiser.hash_series(series)
+    assert hashed[0] == pseudonymiser.hash("AB1")
+    assert hashed[1] == ""
+    assert hashed[2] is None
+    assert hashed[3] == hashed[0]
+    assert hashed[4] == pseudonymiser.hash("CD2")
+
+
+def test_hash_values():
+    pseudonymiser = Pseudonymiser(secret="secret")
+    lookup = pseudonymiser.hash_values(["AB1", "CD2", "AB1"])
+    assert lookup == {
+        "AB1": pseudonymiser.hash("AB1"),
+        "CD2": pseudonymiser.hash("CD2"),
+    }
+    assert Pseudonymiser(secret="other").hash("AB1") != lookup["AB1"]
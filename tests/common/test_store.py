@@ -0,0 +1,65 @@
+import datetime
+
+import pandas as pd
+
+from liiatools.datasets.shared_functions import store
+
+
+def test_write_and_read_store(tmp_path):
+    frames = {
+        "List 10": pd.DataFrame({"Date": pd.to_datetime(["2020-01-01", None])}),
+        "List 2": pd.DataFrame({"ID": ["a", "b"], "Count": [1, None]}),
+    }
+    store.write_store(tmp_path / "store", frames)
+    assert sorted(p.name for p in (tmp_path / "store").iterdir()) == [
+        "List 10.parquet",
+        "List 2.parquet",
+    ]
+
+    read = store.read_store(tmp_path / "store")
+    assert list(read) == ["List 2", "List 10"]
+    assert read["List 10"].equals(frames["List 10"])
+    assert read["List 2"].equals(frames["List 2"])
+    assert read["List 10"]["Date"].dtype == "datetime64[ns]"
+
+
+def test_read_and_remove_some_tables(tmp_path):
+    frames = {
+        name: pd.DataFrame({"a": [i]}) for i, name in enumerate(["2020", "index"])
+    }
+    store.write_store(tmp_path, frames)
+    assert store.store_tables(tmp_path) == ["2020", "index"]
+    assert list(store.read_store(tmp_path, ["index"])) == ["index"]
+
+    store.remove_from_store(tmp_path, ["2020", "2021"])
+    assert store.store_tables(tmp_path) == ["index"]
+
+
+def test_write_store_mixed_column(tmp_path):
+    values = [
+        1234,
+        "1234",
+        None,
+        2.5,
+        True,
+        pd.Timestamp("2020-01-02"),
+        datetime.date(2020, 1, 3),
+    ]
+    frames = {"List 1": pd.DataFrame({"ID": values, "Count": [1, 2.5] + [None] * 5})}
+    store.write_store(tmp_path, frames)
+    read = store.read_store(tmp_path)["List 1"]
+    assert list(read.columns) == ["ID", "Count"]
+    assert [type(value) for value in read["ID"]] == [
+        int,
+        str,
+        float,
+        float,
+        bool,
+        pd.Timestamp,
+        datetime.date,
+    ]
+    assert read["ID"].tolist()[:2] == [1234, "1234"]
+    assert pd.isna(read["ID"][2])
+    assert read["ID"].tolist()[3:] == values[3:]
+    assert read["Count"].tolist()[:2] == [1.0, 2.5]
+    assert frames["List 1"]["ID"].tolist()[:2] == [1234, "1234"]
@@ -21,10 +21,7 @@ def test_create_formatting_error_list():
     )
     for event in events_with_formatting_error_list:
         if isinstance(event, logger.ErrorTable):
-            assert event.formatting_error_list == [
-                "some_header",
-                "some_header",
-            ]
+            assert event.formatting_error_list == {"some_header": 2}
 
     stream = (
         events.StartTable(),
@@ -38,10 +35,10 @@ def test_create_formatting_error_list():
     )
     for event in events_with_formatting_error_list:
         if isinstance(event, logger.ErrorTable):
-            assert event.formatting_error_list == [
-                "some_header",
-                "some_other_header",
-            ]
+            assert event.formatting_error_list == {
+                "some_header": 1,
+                "some_other_header": 1,
+            }
 
     stream = (
         events.StartTable(),
@@ -56,7 +53,7 @@ def test_create_formatting_error_list():
     )
     for event in events_with_formatting_error_list:
         if isinstance(event, logger.ErrorTable):
-            assert event.formatting_error_list == ["some_header"]
+            assert event.formatting_error_list == {"some_header": 1}
 
 
 def test_create_extra_column_error():
@@ -1,7 +1,11 @@
+from datetime import datetime
+from pathlib import Path
+
 import pandas as pd
 
 from liiatools.datasets.s903.lds_ssda903_episodes_fix.process import (
     create_previous_and_next_episode,
+    format_datetime,
     add_latest_year_and_source_for_la,
     _is_the_same,
     _is_next_episode_duplicate,
@@ -18,40 +22,85 @@ from liiatools.datasets.s903.lds_ssda903_episodes_fix.process import (
     _stage2_rule_to_apply,
     _update_dec_stage2,
     _update_episode_source_stage2,
+    stage_1,
+    stage_2,
+    latest_year_for_la,
+    fix_episodes,
+    child_fingerprints,
+    changed_children,
+    fix_episodes_incremental,
+)
+
+SAMPLE_INPUT = (
+    Path(__file__).parents[2]
+    / "liiatools/spec/s903/samples/SSDA903_episodes_for_testing_fixes_INPUT.csv"
 )
 
 
 def test_create_previous_and_next_episode():
     data = pd.DataFrame(
         {
-            "CHILD": ["123", "123", "123"],
-            "DECOM": ["2016-07-26", "2016-08-22", "2016-09-13"],
-            "RNE": ["S", "L", "P"],
-            "YEAR": [2016, 2016, 2016],
+            "CHILD": ["123", "123", "123", "456"],
+            "DECOM": pd.to_datetime(
+                ["2016-07-26", "2016-08-22", "2016-09-13", "2016-10-01"]
+            ),
+            "RNE": ["S", "L", "P", "B"],
+            "YEAR": [2016, 2016, 2016, 2017],
         }
     )
 
     columns = ["DECOM", "RNE", "YEAR"]
 
     data_with_previous_next_episode = create_previous_and_next_episode(data, columns)
-    assert data_with_previous_next_episode["DECOM_previous"].tolist() == [
-        None,
+    assert data_with_previous_next_episode["DECOM_previous"].astype(str).tolist() == [
+        "NaT",
         "2016-07-26",
         "2016-08-22",
+        "NaT",
     ]
-    assert data_with_previous_next_episode["DECOM_next"].tolist() == [
+    assert data_with_previous_next_episode["DECOM_next"].astype(str).tolist() == [
         "2016-08-22",
         "2016-09-13",
-        None,
+        "NaT",
+        "NaT",
     ]
-    assert data_with_previous_next_episode["RNE_previous"].tolist() == [None, "S", "L"]
-    assert data_with_previous_next_episode["RNE_next"].tolist() == ["L", "P", None]
-    assert data_with_previous_next_episode["YEAR_previous"].tolist() == [
-        None,
+    assert data_with_previous_next_episode["RNE_previous"].fillna("").tolist() == [
+        "",
+        "S",
+        "L",
+        "",
+    ]
+    assert data_with_previous_next_episode["RNE_next"].fillna("").tolist() == [
+        "L",
+        "P",
+        "",
+        "",
+    ]
+    assert data_with_previous_next_episode["YEAR_previous"].fillna(0).tolist() == [
+        0,
+        2016,
+        2016,
+        0,
+    ]
+    assert data_with_previous_next_episode["YEAR_next"].fillna(0).tolist() == [
         2016,
         2016,
+        0,
+        0,
     ]
-    assert data_with_previous_next_episode["YEAR_next"].tolist() == [2016, 2016, None]
+
+
+def test_format_datetime():
+    data = pd.DataFrame(
+        {
+            "DECOM": ["2016-07-26", "2016-08-22"],
+            "DEC": pd.to_datetime(["2016-08-22", None]),
+        }
+    )
+
+    data = format_datetime(data, ["DECOM", "DEC"])
+    assert data["DECOM"].tolist() == [datetime(2016, 7, 26), datetime(2016, 8, 22)]
+    assert data["DEC"].isnull().tolist() == [False, True]
 
 
 def test_add_latest_year_and_source_for_la():
@@ -76,6 +125,26 @@ def test_add_latest_year_and_source_for_la():
         "Original",
     ]
 
+    data = pd.DataFrame({"LA": ["BAD", "NEW"], "YEAR": [2019, 2021]})
+    year_latest = pd.Series({"BAD": 2020, "NEW": 2022})
+    data_with_latest_year_and_source_for_la = add_latest_year_and_source_for_la(
+        data, year_latest=year_latest
+    )
+    assert data_with_latest_year_and_source_for_la["YEAR_latest"].tolist() == [
+        2020,
+        2022,
+    ]
+
+
+def test_latest_year_for_la():
+    data = pd.DataFrame(
+        {
+            "LA": ["BAD", "BAD", "NEW", "NEW"],
+            "YEAR": [2019, 2020, 2022, 2021],
+        }
+    )
+    assert latest_year_for_la(data).to_dict() == {"BAD": 2020, "NEW": 2022}
+
 
 def test_add_stage1_rule_identifier_columns():
     data = pd.DataFrame(
@@ -762,7 +831,7 @@ def test__stage1_rule_to_apply():
             ],
         }
     )
-    data["Rule_to_apply"] = data.apply(_stage1_rule_to_apply, axis=1)
+    data["Rule_to_apply"] = _stage1_rule_to_apply(data)
     assert data["Rule_to_apply"].tolist() == [
         None,
         "RULE_3",
@@ -793,7 +862,7 @@ def test__update_dec_stage1():
     data[["DEC", "DECOM_next"]] = data[["DEC", "DECOM_next"]].apply(
         pd.to_datetime, format="%Y-%m-%d"
     )
-    data["DEC"] = data.apply(_update_dec_stage1, axis=1)
+    data["DEC"] = _update_dec_stage1(data)
     assert data["DEC"].astype(str).tolist() == [
         "NaT",
         "2020-11-11",
@@ -812,7 +881,7 @@ def test__update_rec_stage1():
             "Rule_to_apply": [None, None, "RULE_1", "RULE_1A", "RULE_2"],
         }
     )
-    data["updated_REC"] = data.apply(_update_rec_stage1, axis=1)
+    data["updated_REC"] = _update_rec_stage1(data)
     assert data["updated_REC"].tolist() == [
         None,
         "E41",
@@ -847,7 +916,7 @@ def test__update_reason_place_change_stage1():
             ],
         }
     )
-    data["REASON_PLACE_CHANGE"] = data.apply(_update_reason_place_change_stage1, axis=1)
+    data["REASON_PLACE_CHANGE"] = _update_reason_place_change_stage1(data)
     assert data["REASON_PLACE_CHANGE"].tolist() == [
         "CAREPL",
         "CAREPL",
@@ -867,7 +936,7 @@ def test__update_episode_source_stage1():
             "Rule_to_apply": [None, "RULE_1"],
         }
     )
-    data["Episode_source"] = data.apply(_update_episode_source_stage1, axis=1)
+    data["Episode_source"] = _update_episode_source_stage1(data)
     assert data["Episode_source"].tolist() == [
         "Original",
         "RULE_1",
@@ -884,7 +953,7 @@ def test_overlaps_next_episode():
             "DECOM_next": [None, "2022-02-02", "2021-01-01", "2021-01-01"],
         }
     )
-    data["test_result"] = data.apply(_overlaps_next_episode, axis=1)
+    data["test_result"] = _overlaps_next_episode(data)
     assert data["test_result"].tolist() == [
         False,
         False,
@@ -904,7 +973,7 @@ def test__has_x1_gap_before_next_episode():
             "REC": ["E43", "X1", "X1", "X1"],
         }
     )
-    data["test_result"] = data.apply(_has_x1_gap_before_next_episode, axis=1)
+    data["test_result"] = _has_x1_gap_before_next_episode(data)
     assert data["test_result"].tolist() == [
         False,
         False,
@@ -920,7 +989,7 @@ def test__stage2_rule_to_apply():
             "Has_X1_gap_before_next_episode": [False, False, True],
         }
     )
-    data["test_result"] = data.apply(_stage2_rule_to_apply, axis=1)
+    data["test_result"] = _stage2_rule_to_apply(data)
     assert data["test_result"].tolist() == [
         None,
         "RULE_4",
@@ -936,7 +1005,7 @@ def test__update_dec_stage2():
             "Rule_to_apply": [None, "RULE_4", "RULE_5"],
         }
     )
-    data["test_result"] = data.apply(_update_dec_stage2, axis=1)
+    data["test_result"] = _update_dec_stage2(data)
     assert data["test_result"].tolist() == [
         "2021-01-01",
         "2022-11-11",
@@ -951,9 +1020,102 @@ def test__update_episode_source_stage2():
             "Rule_to_apply": [None, "RULE_4", "RULE_5"],
         }
     )
-    data["test_result"] = data.apply(_update_episode_source_stage2, axis=1)
+    data["test_result"] = _update_episode_source_stage2(data)
     assert data["test_result"].tolist() == [
         "Original",
         "RULE_4",
         "RULE_1 | RULE_5",
     ]
+
+
+def test_stage_1_and_stage_2():
+    data = pd.read_csv(SAMPLE_INPUT, index_col=None)
+    data = stage_2(stage_1(data))
+    episode_source = data.groupby("CHILD")["Episode_source"].agg(set).to_dict()
+    assert episode_source == {
+        "NORULE_BAD": {"Original"},
+        "NORULE_NEW": {"Original"},
+        "NORULE_SUT": {"Original"},
+        "RULE1A_BAD": {"Original", "RULE_1A"},
+        "RULE1_BAD": {"Original", "RULE_1"},
+        "RULE2_BAD": {"RULE_2"},
+        "RULE3A_BAD": {"Original"},
+        "RULE3_BAD": {"Original"},
+        "RULE4_BAD": {"Original", "RULE_4"},
+        "RULE5_BAD": {"Original", "RULE_5"},
+    }
+    assert len(data) == 20
+    rule_1a = data[data["Episode_source"] == "RULE_1A"].iloc[0]
+    assert (str(rule_1a["DEC"].date()), rule_1a["REC"]) == ("2017-03-31", "E99")
+
+
+def test_fix_episodes():
+    data = pd.read_csv(SAMPLE_INPUT, index_col=None)
+    serial = fix_episodes(data)
+    parallel = fix_episodes(data, processes=3)
+    pd.testing.assert_frame_equal(parallel, serial)
+
+
+def test_child_fingerprints():
+    data = pd.DataFrame(
+        {
+            "CHILD": ["1", "2", "1"],
+            "DECOM": ["2020-01-01", "2020-01-01", "2021-01-01"],
+        }
+    )
+    fingerprints = child_fingerprints(data)
+    assert fingerprints.index.tolist() == ["1", "2"]
+
+    reordered = child_fingerprints(data.iloc[[1, 0, 2]])
+    assert changed_children(reordered, fingerprints).tolist() == []
+
+    swapped = child_fingerprints(data.iloc[[2, 1, 0]])
+    assert changed_children(swapped, fingerprints).tolist() == ["1"]
+
+    data.loc[1, "DECOM"] = "2020-01-02"
+    data.loc[3] = ["3", "2020-01-01"]
+    assert changed_children(child_fingerprints(data), fingerprints).tolist() == [
+        "2",
+        "3",
+    ]
+
+
+def test_child_fingerprints_missing_child():
+    data = pd.DataFrame(
+        {
+            "CHILD": ["1", None, "2", None],
+            "DECOM": ["2020-01-01", "2020-01-01", "2021-01-01", "2021-01-01"],
+        }
+    )
+    fingerprints = child_fingerprints(data)
+    assert fingerprints.index.tolist()[:2] == ["1", "2"]
+    assert pd.isna(fingerprints.index[2])
+    assert len(fingerprints) == 3
+
+    data.loc[3, "DECOM"] = "2021-01-02"
+    changed = changed_children(child_fingerprints(data), fingerprints)
+    assert len(changed) == 1 and pd.isna(changed[0])
+
+    categorical = data.astype({"CHILD": "category"})
+    assert child_fingerprints(categorical).index.tolist()[:2] == ["1", "2"]
+
+
+def test_fix_episodes_incremental(caplog):
+    data = pd.read_csv(SAMPLE_INPUT, index_col=None)
+    fixed, state = fix_episodes_incremental(data)
+    pd.testing.assert_frame_equal(fixed, fix_episodes(data))
+
+    caplog.set_level("INFO")
+    fixed, state = fix_episodes_incremental(data, previous=state)
+    pd.testing.assert_frame_equal(fixed, fix_episodes(data))
+    assert "Fixing episodes of 0 of 10 children" in caplog.text
+
+    data.loc[data["CHILD"] == "NORULE_NEW", "DEC"] = None
+    fixed, state = fix_episodes_incremental(data, previous=state)
+    pd.testing.assert_frame_equal(fixed, fix_episodes(data))
+    assert "Fixing episodes of 1 of 10 children" in caplog.text
+
+    data.loc[data["YEAR"] == 2022, "YEAR"] = 2023
+    fixed, state = fix_episodes_incremental(data, previous=state)
+    pd.testing.assert_frame_equal(fixed, fix_episodes(data))
+    assert "Fixing episodes of 9 of 10 children" in caplog.text
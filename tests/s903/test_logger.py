@@ -21,10 +21,7 @@ def test_create_formatting_error_list():
     )
     for event in events_with_formatting_error_list:
         if isinstance(event, logger.ErrorTable):
-            assert event.formatting_error_list == [
-                "some_header",
-                "some_header",
-            ]
+            assert event.formatting_error_list == {"some_header": 2}
 
     stream = (
         events.StartTable(table_name="AD1"),
@@ -38,10 +35,10 @@ def test_create_formatting_error_list():
     )
     for event in events_with_formatting_error_list:
         if isinstance(event, logger.ErrorTable):
-            assert event.formatting_error_list == [
-                "some_header",
-                "some_other_header",
-            ]
+            assert event.formatting_error_list == {
+                "some_header": 1,
+                "some_other_header": 1,
+            }
 
     stream = (
         events.StartTable(table_name="AD1"),
@@ -56,7 +53,7 @@ def test_create_formatting_error_list():
     )
     for event in events_with_formatting_error_list:
         if isinstance(event, logger.ErrorTable):
-            assert event.formatting_error_list == ["some_header"]
+            assert event.formatting_error_list == {"some_header": 1}
 
 
 def test_create_extra_column_error():
@@ -115,3 +112,28 @@ def test_save_errors_la(mock_save):
         f"{Path(la_log_dir, 'test_file')}_error_log_{start_time}.txt", "a"
     )
     # mock_save.write.assert_called_once_with(f"test_file_{start_time}")
+
+
+def test_save_errors_la_on_error(tmp_path):
+    def stream():
+        yield events.StartContainer()
+        yield logger.ErrorTable(
+            filename="test_file",
+            formatting_error_list={"CHILD": 2},
+            blank_error_list={},
+            below_zero_error_list={},
+            table_name="Header",
+        )
+        raise ValueError
+
+    try:
+        list(logger.save_errors_la(stream(), str(tmp_path)))
+    except ValueError:
+        pass
+
+    (log_file,) = tmp_path.glob("test_file_error_log_*.txt")
+    assert log_file.read_text() == (
+        "Header\n"
+        "Number of cells that have been made blank because they could not be formatted correctly\n"
+        "'CHILD': 2\n"
+    )
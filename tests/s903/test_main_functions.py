@@ -0,0 +1,119 @@
+import shutil
+from pathlib import Path
+
+from liiatools.datasets.s903 import s903_main_functions
+
+SAMPLE = (
+    Path(__file__).parents[2] / "liiatools/spec/s903/samples/SSDA903_2020_episodes.csv"
+)
+HEADER = (
+    "CHILD,SEX,DOB,ETHNIC,UPN,MOTHER,MC_DOB\n"
+    "689661,1,01/03/2005,WBRI,A123456789012,,\n"
+    "249901,2,15/06/2010,MWBC,B123456789012,1,01/01/2009\n"
+)
+
+
+def _dirs(root):
+    dirs = {name: root / name for name in ["input", "log", "la", "pan", "suff"]}
+    for path in dirs.values():
+        path.mkdir(parents=True)
+    shutil.copy(SAMPLE, dirs["input"])
+    Path(dirs["input"], "SSDA903_2020_header.csv").write_text(HEADER)
+    return dirs
+
+
+def _read(folder):
+    return {
+        file.name: file.read_text()
+        for file in sorted(Path(folder).glob("*.csv"))
+        if "error_log" not in file.name
+    }
+
+
+def test_run_all(tmp_path):
+    chain = _dirs(tmp_path / "chain")
+    for table in ["episodes", "header"]:
+        s903_main_functions.cleanfile(
+            str(chain["input"] / f"SSDA903_2020_{table}.csv"),
+            "BAR",
+            str(chain["log"]),
+            str(chain["la"]),
+        )
+        s903_main_functions.la_agg(
+            str(chain["la"] / f"SSDA903_2020_{table}_clean.csv"), str(chain["la"])
+        )
+    s903_main_functions.episodes_fix(
+        str(chain["la"] / "SSDA903_Episodes_merged.csv"), str(chain["la"])
+    )
+    s903_main_functions.pan_agg(
+        str(chain["la"] / "SSDA903_episodes_fixed.csv"), "BAR", str(chain["pan"])
+    )
+    s903_main_functions.pan_agg(
+        str(chain["la"] / "SSDA903_Header_merged.csv"), "BAR", str(chain["pan"])
+    )
+    for table in ["Episodes", "Header"]:
+        s903_main_functions.sufficiency_output(
+            str(chain["pan"] / f"pan_London_SSDA903_{table}.csv"), str(chain["suff"])
+        )
+
+    run_all = _dirs(tmp_path / "run_all")
+    s903_main_functions.run_all(
+        sorted(str(file) for file in run_all["input"].glob("*.csv")),
+        "BAR",
+        str(run_all["log"]),
+        str(run_all["la"]),
+        str(run_all["pan"]),
+        str(run_all["suff"]),
+    )
+
+    merged = {
+        name: text for name, text in _read(chain["la"]).items() if "_merged" in name
+    }
+    assert _read(run_all["la"]) == merged
+    assert list(_read(run_all["pan"])) == [
+        "pan_London_SSDA903_Episodes.csv",
+        "pan_London_SSDA903_Header.csv",
+    ]
+    assert _read(run_all["pan"]) == _read(chain["pan"])
+    assert list(_read(run_all["suff"])) == ["pan_London_SSDA903_Header.csv"]
+    assert _read(run_all["suff"]) == _read(chain["suff"])
+
+
+def _episodes_2021(input):
+    """Writes the sample Episodes as a 2021 file, with the same episodes for one child and new ones for another"""
+    text = SAMPLE.read_text().replace("249901", "249902")
+    Path(input, "SSDA903_2021_episodes.csv").write_text(text)
+
+
+def test_run_all_two_years(tmp_path):
+    chain = _dirs(tmp_path / "chain")
+    _episodes_2021(chain["input"])
+    for year in ["2020", "2021"]:
+        s903_main_functions.cleanfile(
+            str(chain["input"] / f"SSDA903_{year}_episodes.csv"),
+            "BAR",
+            str(chain["log"]),
+            str(chain["la"]),
+        )
+        s903_main_functions.la_agg(
+            str(chain["la"] / f"SSDA903_{year}_episodes_clean.csv"), str(chain["la"])
+        )
+
+    for incremental in [False, True]:
+        run_all = _dirs(tmp_path / f"run_all_{incremental}")
+        _episodes_2021(run_all["input"])
+        s903_main_functions.run_all(
+            [
+                str(run_all["input"] / "SSDA903_2020_episodes.csv"),
+                str(run_all["input"] / "SSDA903_2021_episodes.csv"),
+            ],
+            "BAR",
+            str(run_all["log"]),
+            str(run_all["la"]),
+            str(run_all["pan"]),
+            str(run_all["suff"]),
+            incremental=incremental,
+        )
+        merged = _read(run_all["la"])["SSDA903_Episodes_merged.csv"]
+        assert merged == _read(chain["la"])["SSDA903_Episodes_merged.csv"]
+        assert len(merged.splitlines()) == 8
@@ -1,4 +1,5 @@
 import pandas as pd
+import pytest
 
 from liiatools.datasets.s903.lds_ssda903_sufficiency import process
 
@@ -25,3 +26,63 @@ def test_minimise():
     table_name_2 = "dataset 2"
     output_2 = process.data_min(test_df_1, minimise, table_name_2)
     assert output_2.shape[1] == 2
+
+
+def test_kept_columns():
+    column_names = {"dataset 1": ["Column 1", "Column 2", "Column 3"]}
+    minimise = {"dataset 1": ["Column 2"]}
+    assert process.kept_columns(column_names, minimise, "dataset 1") == [
+        "Column 1",
+        "Column 3",
+    ]
+    assert process.kept_columns(column_names, {}, "dataset 1") == [
+        "Column 1",
+        "Column 2",
+        "Column 3",
+    ]
+
+
+def test_export_suff_chunks(tmp_path):
+    input = tmp_path / "pan_London_SSDA903_Header.csv"
+    input.write_text(
+        "CHILD,UPN,MOTHER,YEAR\n"
+        "1_BAR,A1,1,2020\n"
+        "2_BAR,A2,,2021\n"
+        '"3,_BAR",A3,NA,2022\n'
+    )
+    output = tmp_path / "suff"
+    output.mkdir()
+
+    columns = ["CHILD", "MOTHER", "YEAR"]
+    chunks = process.read_suff_chunks(input, columns, chunksize=2)
+    process.export_suff_chunks(output, "Header", chunks, columns)
+    assert (output / "pan_London_SSDA903_Header.csv").read_text() == (
+        "CHILD,MOTHER,YEAR\n" "1_BAR,1,2020\n" "2_BAR,,2021\n" '"3,_BAR",NA,2022\n'
+    )
+    assert list(output.iterdir()) == [output / "pan_London_SSDA903_Header.csv"]
+
+    input.write_text("CHILD,UPN,MOTHER,YEAR\n")
+    chunks = process.read_suff_chunks(input, columns)
+    process.export_suff_chunks(output, "Header", chunks, columns)
+    assert (
+        output / "pan_London_SSDA903_Header.csv"
+    ).read_text() == "CHILD,MOTHER,YEAR\n"
+
+    columns = ["YEAR", "CHILD"]
+    input.write_text("CHILD,UPN,YEAR\n1_BAR,A1,2020\n")
+    chunks = process.read_suff_chunks(input, columns)
+    process.export_suff_chunks(output, "Header", chunks, columns)
+    assert (
+        output / "pan_London_SSDA903_Header.csv"
+    ).read_text() == "YEAR,CHILD\n2020,1_BAR\n"
+
+    def failing_chunks():
+        yield pd.DataFrame({"YEAR": [2021], "CHILD": ["2_BAR"]})
+        raise ValueError("bad chunk")
+
+    with pytest.raises(ValueError):
+        process.export_suff_chunks(output, "Header", failing_chunks(), columns)
+    assert list(output.iterdir()) == [output / "pan_London_SSDA903_Header.csv"]
+    assert (
+        output / "pan_London_SSDA903_Header.csv"
+    ).read_text() == "YEAR,CHILD\n2020,1_BAR\n"
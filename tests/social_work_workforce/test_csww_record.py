@@ -1,4 +1,6 @@
 import unittest
+from datetime import date
+import pandas as pd
 from sfdata_stream_parser.events import StartElement, EndElement, TextNode
 from liiatools.datasets.social_work_workforce.lds_csww_clean.csww_record import (
     text_collector,
@@ -6,6 +8,7 @@ from liiatools.datasets.social_work_workforce.lds_csww_clean.csww_record import
     CSWWEvent,
     LALevelEvent,
     HeaderEvent,
+    export_table,
 )
 
 
@@ -71,3 +74,44 @@ class TestRecord(unittest.TestCase):
         self.assertEqual(
             test_events[2].record, {"ID": "100", "SWENo": "AB123456789", "Agency": "0"}
         )
+
+    def test_export_table(self):
+        # test that export_table builds typed DataFrames for the worker and LA level records
+        test_stream = [
+            CSWWEvent(
+                record={
+                    "AgencyWorker": "0",
+                    "SWENo": "AB123456789",
+                    "PersonBirthDate": date(1980, 5, 17),
+                }
+            ),
+            CSWWEvent(record={"AgencyWorker": "1", "SWENo": "CD123456789"}),
+            LALevelEvent(record={"NumberOfVacancies": 100}),
+        ]
+        data_worker, data_lalevel = export_table(test_stream)
+        self.assertEqual(len(data_worker), 2)
+        self.assertEqual(list(data_worker["SWENo"]), ["AB123456789", "CD123456789"])
+        self.assertEqual(data_worker["AgencyWorker"].dtype, "category")
+        self.assertEqual(data_worker["PersonBirthDate"].dtype, "datetime64[ns]")
+        self.assertEqual(data_worker["PersonBirthDate"][0], pd.Timestamp(1980, 5, 17))
+        self.assertTrue(pd.isna(data_worker["PersonBirthDate"][1]))
+        self.assertEqual(data_worker["QualInst"][1], "")
+        self.assertEqual(len(data_lalevel), 1)
+        self.assertEqual(data_lalevel["NumberOfVacancies"][0], 100)
+
+    def test_export_table_out_of_range_date(self):
+        # test that a date datetime64 cannot hold keeps its column as object values, rather than failing
+        test_stream = [
+            CSWWEvent(
+                record={"SWENo": "AB123456789", "RoleEndDate": date(2999, 12, 31)}
+            ),
+            CSWWEvent(record={"SWENo": "CD123456789", "RoleEndDate": date(2020, 1, 1)}),
+            CSWWEvent(record={"SWENo": "EF123456789"}),
+        ]
+        with self.assertLogs(level="WARNING"):
+            data_worker, _ = export_table(test_stream)
+        self.assertEqual(data_worker["RoleEndDate"].dtype, object)
+        self.assertEqual(
+            list(data_worker["RoleEndDate"]), [date(2999, 12, 31), date(2020, 1, 1), ""]
+        )
+        self.assertEqual(data_worker["PersonBirthDate"].dtype, "datetime64[ns]")
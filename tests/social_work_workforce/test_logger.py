@@ -16,10 +16,7 @@ def test_create_formatting_error_list():
     )
     for event in events_with_formatting_error_count:
         if isinstance(event, logger.ErrorTable):
-            assert event.formatting_error_count == [
-                "some_header",
-                "some_header",
-            ]
+            assert event.formatting_error_count == {"some_header": 2}
 
     stream = (
         events.StartTable(table_name="AD1"),
@@ -33,10 +30,10 @@ def test_create_formatting_error_list():
     )
     for event in events_with_formatting_error_count:
         if isinstance(event, logger.ErrorTable):
-            assert event.formatting_error_count == [
-                "some_header",
-                "some_other_header",
-            ]
+            assert event.formatting_error_count == {
+                "some_header": 1,
+                "some_other_header": 1,
+            }
 
     stream = (
         events.StartTable(table_name="AD1"),
@@ -51,7 +48,7 @@ def test_create_formatting_error_list():
     )
     for event in events_with_formatting_error_count:
         if isinstance(event, logger.ErrorTable):
-            assert event.formatting_error_count == ["some_header"]
+            assert event.formatting_error_count == {"some_header": 1}
 
 
 def test_blank_error_check():
@@ -94,10 +91,7 @@ def test_create_blank_error_list():
     events_with_blank_error_list = list(logger.create_blank_error_list(mock_stream))
     for event in events_with_blank_error_list:
         if isinstance(event, logger.ErrorTable) and event.as_dict() != {}:
-            assert event.blank_error_list == [
-                "some_header",
-                "some_header_2",
-            ]
+            assert event.blank_error_list == {"some_header": 1, "some_header_2": 1}
 
 
 def test_create_validation_error_list():
@@ -0,0 +1,39 @@
+from liiatools.datasets.social_work_workforce.lds_csww_data_generator.sample_data import (
+    generate_sample_sections,
+)
+from liiatools.datasets.social_work_workforce.lds_csww_data_generator.stream import (
+    write_xml,
+)
+from liiatools.datasets.social_work_workforce.lds_csww_clean.parse import etree
+
+
+def test_generate_sample_sections():
+    sections = list(generate_sample_sections(workers=5, seed=1, lea="301", year=2022))
+    assert len(sections) == 7
+
+
+def test_write_xml(tmp_path):
+    options = {"workers": 10, "seed": 1, "lea": "301", "year": 2022}
+    write_xml(generate_sample_sections(**options), tmp_path / "sample_1.xml")
+    write_xml(generate_sample_sections(**options), tmp_path / "sample_2.xml")
+    assert (tmp_path / "sample_1.xml").read_bytes() == (
+        tmp_path / "sample_2.xml"
+    ).read_bytes()
+
+    root = etree.parse(str(tmp_path / "sample_1.xml")).getroot()
+    assert root.tag == "Message"
+    assert root.findtext("Header/Source/LEA") == "301"
+    assert root.findtext("Header/CollectionDetails/ReferenceDate") == "2022-09-30"
+    assert len(root.findall("CSWWWorker")) == 10
+
+
+def test_write_xml_default_year(tmp_path):
+    options = {"workers": 10, "seed": 1, "lea": "301"}
+    write_xml(generate_sample_sections(**options), tmp_path / "sample_1.xml")
+    write_xml(generate_sample_sections(**options), tmp_path / "sample_2.xml")
+    assert (tmp_path / "sample_1.xml").read_bytes() == (
+        tmp_path / "sample_2.xml"
+    ).read_bytes()
+
+    root = etree.parse(str(tmp_path / "sample_1.xml")).getroot()
+    assert root.findtext("Header/CollectionDetails/ReferenceDate") == "2022-09-30"
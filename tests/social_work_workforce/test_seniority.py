@@ -0,0 +1,78 @@
+import pandas as pd
+
+from liiatools.datasets.social_work_workforce.SWFtools.analysis import seniority
+
+
+def test_lea_name():
+    assert seniority.lea_name("301") == "Barking and Dagenham"
+    assert seniority.lea_name(311) == "Havering"
+    assert seniority.lea_name("BAD") == "Barking and Dagenham"
+    assert seniority.lea_name("hav") == "Havering"
+    assert seniority.lea_name(" Havering ") == "Havering"
+
+
+def test_growth_table_long():
+    wide = pd.DataFrame(
+        {"LEAName": ["311", "BAD"], "2020": [100, 200], "2021": [110, 220]}
+    )
+    output = seniority.growth_table_long(wide)
+    assert output.to_dict("list") == {
+        "LEAName": ["Havering", "Barking and Dagenham"] * 2,
+        "Year": [2020, 2020, 2021, 2021],
+        "Population": [100, 200, 110, 220],
+    }
+
+    long = pd.DataFrame(
+        {"LEAName": ["301"], "Year": ["2020"], "Population": [200], "Other": [1]}
+    )
+    output = seniority.growth_table_long(long)
+    assert output.to_dict("list") == {
+        "LEAName": ["Barking and Dagenham"],
+        "Year": [2020],
+        "Population": [200],
+    }
+
+
+def test_forecast_fte():
+    # The growth table lists the LEAs in a different order to the FTE table, and by code rather than name
+    growth = seniority.growth_table_long(
+        pd.DataFrame(
+            {
+                "LEAName": ["HAV", "BAD"],
+                "2020": [100, 200],
+                "2021": [110, 180],
+                "2022": [121, 300],
+            }
+        )
+    )
+    df = pd.DataFrame(
+        {
+            "LEAName": ["Barking and Dagenham", "Havering", "Newham"],
+            "SeniorityCode": [1, 2, 1],
+            "FTESum": [10.0, 20.0, 5.0],
+        }
+    )
+    output = seniority.forecast_fte(df, growth, base_year=2020, horizon=2)
+
+    assert list(output.columns) == ["LEAName", "SeniorityCode", "2020", "2021", "2022"]
+    assert output["LEAName"].tolist() == ["Barking and Dagenham", "Havering", "Newham"]
+    # Chained growth, e.g. Havering 20 * 110 / 100 * 121 / 110 = 20 * 121 / 100
+    assert output["2020"].tolist()[:2] == [10.0, 20.0]
+    assert output["2021"].tolist()[:2] == [9.0, 22.0]
+    assert output["2022"].tolist()[:2] == [15.0, 24.2]
+    # Newham has no population data
+    assert output.loc[2, ["2021", "2022"]].isna().all()
+    assert output.loc[2, "2020"] == 5.0
+
+
+def test_forecast_fte_duplicate_growth_rows():
+    growth = pd.DataFrame(
+        {
+            "LEAName": ["Havering", "Havering", "Havering", "Havering"],
+            "Year": [2020, 2021, 2020, 2021],
+            "Population": [100, 150, 100, 150],
+        }
+    )
+    df = pd.DataFrame({"LEAName": ["Havering"], "FTESum": [10.0]})
+    output = seniority.forecast_fte(df, growth, base_year=2020, horizon=1)
+    assert output["2021"].tolist() == [15.0]
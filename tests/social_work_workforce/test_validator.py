@@ -0,0 +1,164 @@
+import lxml.etree as etree
+
+from liiatools.datasets.social_work_workforce.SWFtools.dataprocessing.validation import (
+    validator,
+)
+from liiatools.datasets.social_work_workforce.SWFtools.dataprocessing.validation.validation_error import (
+    ERROR_CAUSE,
+)
+
+WORKER = """<CSWWWorker>
+  <AgencyWorker>0</AgencyWorker>
+  <SWENo>AB1234567890</SWENo>
+  <FTE>{fte}</FTE>
+  <PersonBirthDate>1990-01-01</PersonBirthDate>
+  <GenderCurrent>1</GenderCurrent>
+  <Ethnicity>{ethnicity}</Ethnicity>
+  <QualInst>Institution Name</QualInst>
+  <QualLevel>2</QualLevel>
+  <StepUpGrad>0</StepUpGrad>
+  <OrgRole>1</OrgRole>
+  <RoleStartDate>2020-01-01</RoleStartDate>
+  <StartOrigin>1</StartOrigin>{leaver}
+  <FTE30>0.5</FTE30>
+  <Cases30>10</Cases30>
+  <WorkingDaysLost>1.5</WorkingDaysLost>
+  <ContractWeeks>10</ContractWeeks>
+  <FrontlineGrad>0</FrontlineGrad>
+</CSWWWorker>"""
+
+LEAVER = """
+  <RoleEndDate>2022-09-30</RoleEndDate>
+  <LeaverDestination>1</LeaverDestination>
+  <ReasonLeave>1</ReasonLeave>"""
+
+
+def _worker(fte="0.5", ethnicity="WBRI", leaver="", remove=()):
+    xml = WORKER.format(fte=fte, ethnicity=ethnicity, leaver=leaver)
+    lines = [
+        line
+        for line in xml.split("\n")
+        if not any(f"<{tag}>" in line for tag in remove)
+    ]
+    return "\n".join(lines)
+
+
+# Workers with known errors, each reported the same way by the previous implementation
+FIXTURE = [
+    _worker(),
+    _worker(fte="0", leaver=LEAVER),
+    _worker(fte="0.8", leaver=LEAVER),
+    _worker(remove=["GenderCurrent", "QualInst"]),
+    _worker(leaver="\n  <ReasonLeave>1</ReasonLeave>"),
+    _worker(ethnicity="XXXX"),
+    _worker(remove=["RoleStartDate"]),
+]
+
+
+def _validate(workers):
+    message = etree.fromstring(f"<Message>\n{chr(10).join(workers)}\n</Message>")
+    errors = []
+    data = [
+        validator.get_valid_worker_data(worker, errors)
+        for worker in message.iter("CSWWWorker")
+    ]
+    return data, [str(error) for error in errors]
+
+
+def test_get_valid_worker_data():
+    data, errors = _validate(FIXTURE)
+
+    assert [worker is not None for worker in data] == [
+        True,
+        True,
+        False,
+        False,
+        False,
+        False,
+        False,
+    ]
+    assert data[0]["SWENo"] == "AB1234567890"
+    assert data[0]["FTE"] == "0.5"
+    assert data[1]["RoleEndDate"] == "2022-09-30"
+
+    # The messages and counts of the previous implementation, except that the leaver FTE error now gives the
+    # line of the leaver's own FTE tag rather than the first FTE tag in the document (line 5)
+    assert errors == [
+        "[Tag 'FTE' on line 46]: FTE must be 0 for leavers",
+        "[Tag 'CSWWWorker' on line 65]: Not formatted as expected",
+        "[Tag 'GenderCurrent' on line 65]: Mandatory tag for non-agency worker missing",
+        "[Tag 'QualInst' on line 65]: Mandatory tag for non-agency worker missing",
+        "[Tag 'ReasonLeave' on line 82]: Unexpected value present, should not be present for leavers",
+        "[Tag 'Ethnicity' on line 108]: Invalid value",
+        "[Tag 'RoleStartDate' on line 121]: Mandatory tag for non-agency worker missing",
+        "[Tag 'StartOrigin' on line 121]: Missing tag",
+    ]
+
+
+def test_compiled_worker_schema():
+    message = etree.fromstring(f"<Message>\n{chr(10).join(FIXTURE)}\n</Message>")
+    for worker in message.iter("CSWWWorker"):
+        detailed_errors = list(validator.WORKER_SCHEMA.iter_errors(worker))
+        assert validator.WORKER_SCHEMA_COMPILED.validate(worker) == (
+            detailed_errors == []
+        )
+
+
+def test_leaver_missing_tags():
+    # The previous implementation raised a TypeError for these leavers
+    leaver = "\n  <RoleEndDate>2022-09-30</RoleEndDate>"
+    data, errors = _validate(
+        [
+            _worker(fte="0", leaver=leaver),
+            _worker(
+                fte="0", leaver=leaver + "\n  <LeaverDestination>1</LeaverDestination>"
+            ),
+        ]
+    )
+    assert data == [None, None]
+    assert errors == [
+        "[Tag 'ReasonLeave' on line 2]: Missing tag",
+        "[Tag 'LeaverDestination' on line 2]: Missing tag",
+        "[Tag 'ReasonLeave' on line 22]: Missing tag",
+    ]
+
+
+def test_missing_agency_worker_and_fte():
+    # The previous implementation raised a KeyError for these workers
+    data, errors = _validate(
+        [
+            _worker(remove=["AgencyWorker"]),
+            _worker(fte="0", leaver=LEAVER, remove=["FTE"]),
+        ]
+    )
+    assert data[0] is None
+    assert "FTE" not in data[1]
+    assert errors == ["[Tag 'CSWWWorker' on line 2]: Not formatted as expected"]
+
+
+def test_worker_rules():
+    def failed(children):
+        return [
+            (rule.tag, rule.cause)
+            for rule in validator.WORKER_RULES
+            if rule.fails({tag: etree.Element(tag) for tag in children} | children)
+        ]
+
+    agency = etree.Element("AgencyWorker")
+    agency.text = "1"
+    fte = etree.Element("FTE")
+    fte.text = "0.5"
+
+    assert failed({"AgencyWorker": agency}) == []
+    assert failed({"AgencyWorker": agency, "RoleStartDate": None}) == [
+        ("StartOrigin", ERROR_CAUSE.MISSING_TAG)
+    ]
+    assert failed({"AgencyWorker": agency, "RoleEndDate": None, "FTE": fte}) == [
+        ("FTE", ERROR_CAUSE.LEAVER_FTE),
+        ("ReasonLeave", ERROR_CAUSE.MISSING_TAG),
+        ("LeaverDestination", ERROR_CAUSE.MISSING_TAG),
+    ]
+    assert failed({"AgencyWorker": agency, "ReasonLeave": None}) == [
+        ("ReasonLeave", ERROR_CAUSE.LEAVER_UNEXPECTED)
+    ]
+    assert [tag for tag, cause in failed({})] == [*validator.NON_AGENCY_MANDATORY_TAG]